@@ -0,0 +1,117 @@
+"""exam_conflicts_table
+
+Revision ID: 7a2c9e4d1b6f
+Revises: 6fc4d1f2a3b4
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2c9e4d1b6f'
+down_revision: Union[str, Sequence[str], None] = '6fc4d1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Weighted conflict graph computed by Postgres (exam_a < exam_b, weight = shared students)
+    op.create_table('exam_conflicts',
+    sa.Column('exam_a', sa.Integer(), nullable=False),
+    sa.Column('exam_b', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['exam_a'], ['exams.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['exam_b'], ['exams.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('exam_a', 'exam_b'),
+    sa.CheckConstraint('exam_a < exam_b', name='ck_exam_conflicts_ordered')
+    )
+    op.create_index('ix_exam_conflicts_exam_b', 'exam_conflicts', ['exam_b'])
+
+    # 2. Full rebuild: enrollments self-join grouped by exam pair
+    op.execute("""
+    CREATE OR REPLACE FUNCTION refresh_exam_conflicts()
+    RETURNS VOID AS $$
+    BEGIN
+        DELETE FROM exam_conflicts;
+        INSERT INTO exam_conflicts (exam_a, exam_b, weight)
+        SELECT e1.id, e2.id, COUNT(*)
+        FROM enrollments en1
+        JOIN enrollments en2 ON en1.student_id = en2.student_id AND en1.module_id <> en2.module_id
+        JOIN exams e1 ON e1.module_id = en1.module_id
+        JOIN exams e2 ON e2.module_id = en2.module_id
+        WHERE e1.id < e2.id
+        GROUP BY e1.id, e2.id;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+    # 3. Incremental maintenance (statement-level, so bulk enrollment inserts stay cheap).
+    # Pairs where both rows belong to the same statement are counted once (n.id < other.id).
+    op.execute("""
+    CREATE OR REPLACE FUNCTION exam_conflicts_on_enroll()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO exam_conflicts (exam_a, exam_b, weight)
+        SELECT LEAST(e1.id, e2.id), GREATEST(e1.id, e2.id), COUNT(*)
+        FROM new_rows n
+        JOIN exams e1 ON e1.module_id = n.module_id
+        JOIN enrollments en2 ON en2.student_id = n.student_id AND en2.module_id <> n.module_id
+        JOIN exams e2 ON e2.module_id = en2.module_id
+        WHERE n.id < en2.id OR NOT EXISTS (SELECT 1 FROM new_rows n2 WHERE n2.id = en2.id)
+        GROUP BY 1, 2
+        ON CONFLICT (exam_a, exam_b) DO UPDATE SET weight = exam_conflicts.weight + EXCLUDED.weight;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION exam_conflicts_on_unenroll()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        WITH removed AS (
+            SELECT LEAST(e1.id, e2.id) AS a, GREATEST(e1.id, e2.id) AS b, COUNT(*) AS w
+            FROM old_rows o
+            JOIN exams e1 ON e1.module_id = o.module_id
+            JOIN (
+                SELECT id, student_id, module_id, FALSE AS gone FROM enrollments
+                UNION ALL
+                SELECT id, student_id, module_id, TRUE AS gone FROM old_rows
+            ) en2 ON en2.student_id = o.student_id AND en2.module_id <> o.module_id
+            JOIN exams e2 ON e2.module_id = en2.module_id
+            WHERE NOT en2.gone OR o.id < en2.id
+            GROUP BY 1, 2
+        )
+        UPDATE exam_conflicts c SET weight = c.weight - r.w
+        FROM removed r
+        WHERE c.exam_a = r.a AND c.exam_b = r.b;
+        DELETE FROM exam_conflicts WHERE weight <= 0;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_exam_conflicts_enroll
+    AFTER INSERT ON enrollments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION exam_conflicts_on_enroll();
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_exam_conflicts_unenroll
+    AFTER DELETE ON enrollments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION exam_conflicts_on_unenroll();
+    """)
+
+    op.execute("SELECT refresh_exam_conflicts()")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_exam_conflicts_unenroll ON enrollments")
+    op.execute("DROP TRIGGER IF EXISTS trg_exam_conflicts_enroll ON enrollments")
+    op.execute("DROP FUNCTION IF EXISTS exam_conflicts_on_unenroll()")
+    op.execute("DROP FUNCTION IF EXISTS exam_conflicts_on_enroll()")
+    op.execute("DROP FUNCTION IF EXISTS refresh_exam_conflicts()")
+    op.drop_index('ix_exam_conflicts_exam_b', table_name='exam_conflicts')
+    op.drop_table('exam_conflicts')
@@ -0,0 +1,36 @@
+"""professor_unavailability
+
+Revision ID: 8b4e1f7c2d3a
+Revises: 7a2c9e4d1b6f
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e1f7c2d3a'
+down_revision: Union[str, Sequence[str], None] = '7a2c9e4d1b6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('professor_unavailability',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professor_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('slot', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['professor_id'], ['professors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('professor_id', 'date', 'slot', name='uq_professor_unavailability')
+    )
+    op.create_index(op.f('ix_professor_unavailability_id'), 'professor_unavailability', ['id'], unique=False)
+    op.create_index(op.f('ix_professor_unavailability_professor_id'), 'professor_unavailability', ['professor_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_professor_unavailability_professor_id'), table_name='professor_unavailability')
+    op.drop_index(op.f('ix_professor_unavailability_id'), table_name='professor_unavailability')
+    op.drop_table('professor_unavailability')
@@ -0,0 +1,113 @@
+"""student_daily_exam_limit
+
+Revision ID: 9c5f2a8d4e1b
+Revises: 8b4e1f7c2d3a
+Create Date: 2026-10-19 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9c5f2a8d4e1b'
+down_revision: Union[str, Sequence[str], None] = '8b4e1f7c2d3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Scheduling rules shared by the engine and validate_timetable()
+    op.create_table('app_settings',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.execute("INSERT INTO app_settings (key, value) VALUES ('max_exams_per_student_day', '1')")
+
+    # 2. validate_timetable() reads the same per-student daily limit
+    op.execute("""
+    CREATE OR REPLACE FUNCTION validate_timetable() 
+    RETURNS TABLE(conflict_type TEXT, details TEXT) AS $$
+    DECLARE
+        max_per_day INT := COALESCE(
+            (SELECT value::INT FROM app_settings WHERE key = 'max_exams_per_student_day'), 1);
+    BEGIN
+        -- 1. Student Daily Limit (Max k exams per day)
+        RETURN QUERY
+        SELECT 'Student Daily Limit'::TEXT, 'Student ' || s.id || ' has more than ' || max_per_day || ' exams on ' || t.start_time::DATE
+        FROM timetable_entries t
+        JOIN exams e ON t.exam_id = e.id
+        JOIN modules m ON e.module_id = m.id
+        JOIN enrollments en ON m.id = en.module_id
+        JOIN students s ON en.student_id = s.id
+        GROUP BY s.id, t.start_time::DATE
+        HAVING COUNT(*) > max_per_day;
+
+        -- 1b. Never two exams in the same slot for one student
+        RETURN QUERY
+        SELECT 'Student Slot Clash'::TEXT, 'Student ' || s.id || ' has overlapping exams at ' || t.start_time
+        FROM timetable_entries t
+        JOIN exams e ON t.exam_id = e.id
+        JOIN enrollments en ON e.module_id = en.module_id
+        JOIN students s ON en.student_id = s.id
+        GROUP BY s.id, t.start_time
+        HAVING COUNT(*) > 1;
+
+        -- 2. Room Capacity
+        RETURN QUERY
+        SELECT 'Room Capacity'::TEXT, 'Room ' || t.room_id || ' exceeded at ' || t.start_time
+        FROM timetable_entries t
+        JOIN exams e ON t.exam_id = e.id
+        JOIN modules m ON e.module_id = m.id
+        JOIN rooms r ON t.room_id = r.id
+        JOIN (SELECT module_id, COUNT(*) as cnt FROM enrollments GROUP BY module_id) en_counts ON m.id = en_counts.module_id
+        WHERE en_counts.cnt > r.capacity;
+
+        -- 3. Professor Daily Limit (Max 3 exams per day)
+        RETURN QUERY
+        SELECT 'Supervisor Limit'::TEXT, 'Professor ' || t.supervisor_id || ' has >3 exams on ' || t.start_time::DATE
+        FROM timetable_entries t
+        GROUP BY t.supervisor_id, t.start_time::DATE
+        HAVING COUNT(*) > 3;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+    CREATE OR REPLACE FUNCTION validate_timetable() 
+    RETURNS TABLE(conflict_type TEXT, details TEXT) AS $$
+    BEGIN
+        -- 1. Student Daily Limit (Max 1 exam per day)
+        RETURN QUERY
+        SELECT 'Student Daily Limit'::TEXT, 'Student ' || s.id || ' has multiple exams on ' || t.start_time::DATE
+        FROM timetable_entries t
+        JOIN exams e ON t.exam_id = e.id
+        JOIN modules m ON e.module_id = m.id
+        JOIN enrollments en ON m.id = en.module_id
+        JOIN students s ON en.student_id = s.id
+        GROUP BY s.id, t.start_time::DATE
+        HAVING COUNT(*) > 1;
+
+        -- 2. Room Capacity
+        RETURN QUERY
+        SELECT 'Room Capacity'::TEXT, 'Room ' || t.room_id || ' exceeded at ' || t.start_time
+        FROM timetable_entries t
+        JOIN exams e ON t.exam_id = e.id
+        JOIN modules m ON e.module_id = m.id
+        JOIN rooms r ON t.room_id = r.id
+        JOIN (SELECT module_id, COUNT(*) as cnt FROM enrollments GROUP BY module_id) en_counts ON m.id = en_counts.module_id
+        WHERE en_counts.cnt > r.capacity;
+
+        -- 3. Professor Daily Limit (Max 3 exams per day)
+        RETURN QUERY
+        SELECT 'Supervisor Limit'::TEXT, 'Professor ' || t.supervisor_id || ' has >3 exams on ' || t.start_time::DATE
+        FROM timetable_entries t
+        GROUP BY t.supervisor_id, t.start_time::DATE
+        HAVING COUNT(*) > 3;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.drop_table('app_settings')
@@ -0,0 +1,37 @@
+"""seat_assignments
+
+Revision ID: a1d7e3b9c4f2
+Revises: 9c5f2a8d4e1b
+Create Date: 2026-10-19 12:10:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d7e3b9c4f2'
+down_revision: Union[str, Sequence[str], None] = '9c5f2a8d4e1b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Referencing timetable_entries.exam_id means TRUNCATE ... CASCADE in save_results clears the plan too
+    op.create_table('seat_assignments',
+    sa.Column('exam_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('seat_index', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['exam_id'], ['timetable_entries.exam_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+    sa.PrimaryKeyConstraint('exam_id', 'student_id')
+    )
+    # Per-room charts are read in seat order
+    op.create_index('ix_seat_assignments_room_chart', 'seat_assignments', ['room_id', 'exam_id', 'seat_index'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_seat_assignments_room_chart', table_name='seat_assignments')
+    op.drop_table('seat_assignments')
@@ -0,0 +1,37 @@
+"""unavailability_unique_whole_day
+
+Revision ID: a3e0f7b4c8d2
+Revises: f2c9d6e3a7b1
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e0f7b4c8d2'
+down_revision: Union[str, Sequence[str], None] = 'f2c9d6e3a7b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Whole-day rows (slot NULL) slipped through the unique constraint: keep the oldest of each
+    op.execute("""
+    DELETE FROM professor_unavailability u
+    USING professor_unavailability k
+    WHERE k.professor_id = u.professor_id AND k.date = u.date
+      AND u.slot IS NULL AND k.slot IS NULL AND k.id < u.id
+    """)
+    op.drop_constraint('uq_professor_unavailability', 'professor_unavailability', type_='unique')
+    op.execute("""
+    CREATE UNIQUE INDEX uq_professor_unavailability
+    ON professor_unavailability (professor_id, date, COALESCE(slot, -1))
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_professor_unavailability")
+    op.create_unique_constraint('uq_professor_unavailability', 'professor_unavailability',
+                                ['professor_id', 'date', 'slot'])
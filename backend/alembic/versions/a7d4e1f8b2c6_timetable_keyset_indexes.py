@@ -0,0 +1,37 @@
+"""timetable_keyset_indexes
+
+Revision ID: a7d4e1f8b2c6
+Revises: f6c3d9a5b7e1
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d4e1f8b2c6'
+down_revision: Union[str, Sequence[str], None] = 'f6c3d9a5b7e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GET /timetable pages by (start_time, id) inside the published generation.
+    # INCLUDE makes the page an index-only scan on the timetable side.
+    op.execute("""
+    CREATE INDEX ix_timetable_generations_keyset
+    ON timetable_generations (session_id, generation, start_time, id)
+    INCLUDE (exam_id, room_id, supervisor_id, end_time)
+    """)
+    # Professor view: own supervisions only
+    op.execute("""
+    CREATE INDEX ix_timetable_generations_supervisor
+    ON timetable_generations (session_id, generation, supervisor_id, start_time, id)
+    INCLUDE (exam_id, room_id, end_time)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_timetable_generations_supervisor")
+    op.execute("DROP INDEX IF EXISTS ix_timetable_generations_keyset")
@@ -0,0 +1,151 @@
+"""exam_sessions_partitioning
+
+Revision ID: b2e8f4c1d5a3
+Revises: a1d7e3b9c4f2
+Create Date: 2026-10-19 13:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2e8f4c1d5a3'
+down_revision: Union[str, Sequence[str], None] = 'a1d7e3b9c4f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Exam sessions (winter, resit, summer...)
+    op.create_table('exam_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False, server_default='summer'),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('is_current', sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_exam_sessions_id'), 'exam_sessions', ['id'], unique=False)
+    # At most one current session
+    op.execute("CREATE UNIQUE INDEX uq_exam_sessions_current ON exam_sessions (is_current) WHERE is_current")
+
+    # 2. Every new session gets its own timetable partition
+    op.execute("""
+    CREATE OR REPLACE FUNCTION create_timetable_partition()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS timetable_entries_s%s PARTITION OF timetable_entries FOR VALUES IN (%s)',
+            NEW.id, NEW.id);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+    # 3. Move the existing single timetable aside
+    op.drop_constraint('seat_assignments_exam_id_fkey', 'seat_assignments', type_='foreignkey')
+    op.execute("ALTER TABLE timetable_entries RENAME TO timetable_entries_legacy")
+    op.execute("ALTER SEQUENCE timetable_entries_id_seq RENAME TO timetable_entries_legacy_id_seq")
+    for ix in ['ix_timetable_entries_id', 'ix_timetable_exam_id', 'ix_timetable_room_id',
+               'ix_timetable_supervisor_id', 'ix_timetable_start_time', 'ix_timetable_upcoming']:
+        op.execute(f"DROP INDEX IF EXISTS {ix}")
+
+    # 4. Partitioned timetable: keys must include the partition column
+    op.execute("""
+    CREATE TABLE timetable_entries (
+        id SERIAL NOT NULL,
+        session_id INTEGER NOT NULL REFERENCES exam_sessions(id),
+        exam_id INTEGER REFERENCES exams(id),
+        room_id INTEGER REFERENCES rooms(id),
+        supervisor_id INTEGER REFERENCES professors(id),
+        start_time TIMESTAMP WITHOUT TIME ZONE,
+        end_time TIMESTAMP WITHOUT TIME ZONE,
+        status VARCHAR DEFAULT 'DRAFT',
+        PRIMARY KEY (session_id, id),
+        UNIQUE (session_id, exam_id)
+    ) PARTITION BY LIST (session_id)
+    """)
+    op.execute("CREATE INDEX ix_timetable_entries_id ON timetable_entries (id)")
+    op.execute("CREATE INDEX ix_timetable_exam_id ON timetable_entries (exam_id)")
+    op.execute("CREATE INDEX ix_timetable_room_id ON timetable_entries (room_id)")
+    op.execute("CREATE INDEX ix_timetable_supervisor_id ON timetable_entries (supervisor_id)")
+    op.execute("CREATE INDEX ix_timetable_start_time ON timetable_entries (start_time)")
+    op.execute("CREATE INDEX ix_timetable_upcoming ON timetable_entries (start_time) WHERE start_time >= '2026-01-01'")
+
+    op.execute("""
+    CREATE TRIGGER trg_exam_sessions_partition
+    AFTER INSERT ON exam_sessions
+    FOR EACH ROW EXECUTE FUNCTION create_timetable_partition();
+    """)
+
+    # 5. Default session holding the existing timetable (June 2026, the former hard-coded start)
+    op.execute("""
+    INSERT INTO exam_sessions (name, kind, start_date, is_current)
+    VALUES ('Session Juin 2026', 'summer', '2026-06-01', TRUE)
+    """)
+    op.execute("""
+    INSERT INTO timetable_entries (id, session_id, exam_id, room_id, supervisor_id, start_time, end_time, status)
+    SELECT l.id, s.id, l.exam_id, l.room_id, l.supervisor_id, l.start_time, l.end_time, l.status
+    FROM timetable_entries_legacy l, exam_sessions s
+    WHERE s.is_current
+    """)
+    op.execute("SELECT setval('timetable_entries_id_seq', COALESCE((SELECT MAX(id) FROM timetable_entries), 0) + 1, false)")
+    op.execute("DROP TABLE timetable_entries_legacy")
+
+    # 6. Seating plans follow the session of their timetable entry
+    op.add_column('seat_assignments', sa.Column('session_id', sa.Integer(), nullable=True))
+    op.execute("UPDATE seat_assignments SET session_id = (SELECT id FROM exam_sessions WHERE is_current)")
+    op.alter_column('seat_assignments', 'session_id', nullable=False)
+    op.drop_index('ix_seat_assignments_room_chart', table_name='seat_assignments')
+    op.drop_constraint('seat_assignments_pkey', 'seat_assignments', type_='primary')
+    op.create_primary_key('seat_assignments_pkey', 'seat_assignments', ['session_id', 'exam_id', 'student_id'])
+    op.create_foreign_key('seat_assignments_entry_fkey', 'seat_assignments', 'timetable_entries',
+                          ['session_id', 'exam_id'], ['session_id', 'exam_id'], ondelete='CASCADE')
+    op.create_index('ix_seat_assignments_room_chart', 'seat_assignments', ['session_id', 'room_id', 'exam_id', 'seat_index'])
+
+
+def downgrade() -> None:
+    # Keeps the current session only
+    op.drop_index('ix_seat_assignments_room_chart', table_name='seat_assignments')
+    op.drop_constraint('seat_assignments_entry_fkey', 'seat_assignments', type_='foreignkey')
+    op.execute("DELETE FROM seat_assignments WHERE session_id <> (SELECT id FROM exam_sessions WHERE is_current)")
+    op.drop_constraint('seat_assignments_pkey', 'seat_assignments', type_='primary')
+    op.create_primary_key('seat_assignments_pkey', 'seat_assignments', ['exam_id', 'student_id'])
+    op.drop_column('seat_assignments', 'session_id')
+
+    op.execute("""
+    CREATE TABLE timetable_entries_flat AS
+    SELECT t.id, t.exam_id, t.room_id, t.supervisor_id, t.start_time, t.end_time, t.status
+    FROM timetable_entries t JOIN exam_sessions s ON s.id = t.session_id
+    WHERE s.is_current
+    """)
+    op.execute("DROP TABLE timetable_entries CASCADE")
+    op.execute("ALTER TABLE timetable_entries_flat RENAME TO timetable_entries")
+    # The legacy sequence went away with timetable_entries_legacy in upgrade(), and the
+    # partitioned table's one with the CASCADE above: new SERIAL sequence, past the copied ids
+    op.execute("CREATE SEQUENCE timetable_entries_id_seq OWNED BY timetable_entries.id")
+    op.execute("ALTER TABLE timetable_entries ALTER COLUMN id SET DEFAULT nextval('timetable_entries_id_seq')")
+    op.execute("SELECT setval('timetable_entries_id_seq', COALESCE((SELECT MAX(id) FROM timetable_entries), 0) + 1, false)")
+    op.execute("ALTER TABLE timetable_entries ALTER COLUMN status SET DEFAULT 'DRAFT'")
+    op.execute("ALTER TABLE timetable_entries ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE timetable_entries ADD CONSTRAINT timetable_entries_exam_id_key UNIQUE (exam_id)")
+    op.execute("ALTER TABLE timetable_entries ADD FOREIGN KEY (exam_id) REFERENCES exams(id)")
+    op.execute("ALTER TABLE timetable_entries ADD FOREIGN KEY (room_id) REFERENCES rooms(id)")
+    op.execute("ALTER TABLE timetable_entries ADD FOREIGN KEY (supervisor_id) REFERENCES professors(id)")
+    op.create_index(op.f('ix_timetable_entries_id'), 'timetable_entries', ['id'], unique=False)
+    op.create_index('ix_timetable_exam_id', 'timetable_entries', ['exam_id'])
+    op.create_index('ix_timetable_room_id', 'timetable_entries', ['room_id'])
+    op.create_index('ix_timetable_supervisor_id', 'timetable_entries', ['supervisor_id'])
+    op.create_index('ix_timetable_start_time', 'timetable_entries', ['start_time'])
+    op.execute("CREATE INDEX ix_timetable_upcoming ON timetable_entries (start_time) WHERE start_time >= '2026-01-01'")
+    op.create_foreign_key('seat_assignments_exam_id_fkey', 'seat_assignments', 'timetable_entries',
+                          ['exam_id'], ['exam_id'], ondelete='CASCADE')
+    op.create_index('ix_seat_assignments_room_chart', 'seat_assignments', ['room_id', 'exam_id', 'seat_index'])
+
+    op.execute("DROP TRIGGER IF EXISTS trg_exam_sessions_partition ON exam_sessions")
+    op.execute("DROP FUNCTION IF EXISTS create_timetable_partition()")
+    op.execute("DROP INDEX IF EXISTS uq_exam_sessions_current")
+    op.drop_index(op.f('ix_exam_sessions_id'), table_name='exam_sessions')
+    op.drop_table('exam_sessions')
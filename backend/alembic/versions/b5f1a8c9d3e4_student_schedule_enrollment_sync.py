@@ -0,0 +1,102 @@
+"""student_schedule_enrollment_sync
+
+Revision ID: b5f1a8c9d3e4
+Revises: a3e0f7b4c8d2
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f1a8c9d3e4'
+down_revision: Union[str, Sequence[str], None] = 'a3e0f7b4c8d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Enrollments changed after save_results: add / remove the student's exam in every stored
+# generation (published or shadow), so /timetable/me, the iCal feed and the convocations follow.
+ADD_ROWS_SQL = """
+    INSERT INTO student_exam_schedule
+        (session_id, generation, student_id, exam_id, start_time, end_time, room_id, module_name, room_name)
+    SELECT DISTINCT t.session_id, t.generation, en.student_id, t.exam_id, t.start_time, t.end_time,
+           t.room_id, m.name, r.name
+    FROM {rows} en
+    JOIN exams e ON e.module_id = en.module_id
+    JOIN modules m ON m.id = e.module_id
+    JOIN timetable_generations t ON t.exam_id = e.id
+    LEFT JOIN rooms r ON r.id = t.room_id
+    WHERE t.start_time IS NOT NULL AND en.student_id IS NOT NULL
+    ON CONFLICT DO NOTHING;
+"""
+
+# Only once the student has no enrollment left in the module (duplicate rows are possible)
+REMOVE_ROWS_SQL = """
+    DELETE FROM student_exam_schedule s
+    USING {rows} o, exams e
+    WHERE e.module_id = o.module_id
+      AND s.student_id = o.student_id AND s.exam_id = e.id
+      AND NOT EXISTS (
+          SELECT 1 FROM enrollments en WHERE en.student_id = o.student_id AND en.module_id = o.module_id
+      );
+"""
+
+
+def _function(name: str, body: str) -> str:
+    return f"""
+    CREATE OR REPLACE FUNCTION {name}()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        {body}
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+
+
+def upgrade() -> None:
+    op.execute(_function("student_schedule_on_enroll", ADD_ROWS_SQL.format(rows="new_rows")))
+    op.execute(_function("student_schedule_on_unenroll", REMOVE_ROWS_SQL.format(rows="old_rows")))
+    op.execute(_function(
+        "student_schedule_on_enrollment_update",
+        REMOVE_ROWS_SQL.format(rows="old_rows") + ADD_ROWS_SQL.format(rows="new_rows"),
+    ))
+    op.execute("""
+    CREATE TRIGGER trg_student_schedule_enroll
+    AFTER INSERT ON enrollments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_schedule_on_enroll();
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_student_schedule_unenroll
+    AFTER DELETE ON enrollments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_schedule_on_unenroll();
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_student_schedule_enrollment_update
+    AFTER UPDATE ON enrollments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_schedule_on_enrollment_update();
+    """)
+
+    # Catch up with the enrollment changes made since the generations were saved
+    op.execute("""
+    DELETE FROM student_exam_schedule s
+    USING exams e
+    WHERE e.id = s.exam_id
+      AND NOT EXISTS (
+          SELECT 1 FROM enrollments en WHERE en.student_id = s.student_id AND en.module_id = e.module_id
+      )
+    """)
+    op.execute(ADD_ROWS_SQL.format(rows="enrollments"))
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_student_schedule_enrollment_update ON enrollments")
+    op.execute("DROP TRIGGER IF EXISTS trg_student_schedule_unenroll ON enrollments")
+    op.execute("DROP TRIGGER IF EXISTS trg_student_schedule_enroll ON enrollments")
+    op.execute("DROP FUNCTION IF EXISTS student_schedule_on_enrollment_update()")
+    op.execute("DROP FUNCTION IF EXISTS student_schedule_on_unenroll()")
+    op.execute("DROP FUNCTION IF EXISTS student_schedule_on_enroll()")
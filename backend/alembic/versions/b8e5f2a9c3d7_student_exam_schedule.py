@@ -0,0 +1,82 @@
+"""student_exam_schedule
+
+Revision ID: b8e5f2a9c3d7
+Revises: a7d4e1f8b2c6
+Create Date: 2026-10-19 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e5f2a9c3d7'
+down_revision: Union[str, Sequence[str], None] = 'a7d4e1f8b2c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. One row per (student, enrolled exam) of each generation, written by save_results.
+    # The covering primary key makes GET /timetable/me an index-only range scan.
+    op.execute("""
+    CREATE TABLE student_exam_schedule (
+        session_id INTEGER NOT NULL,
+        generation INTEGER NOT NULL,
+        student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+        exam_id INTEGER NOT NULL,
+        start_time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        end_time TIMESTAMP WITHOUT TIME ZONE,
+        room_id INTEGER,
+        module_name VARCHAR,
+        room_name VARCHAR,
+        CONSTRAINT student_exam_schedule_pkey
+            PRIMARY KEY (session_id, generation, student_id, start_time, exam_id)
+            INCLUDE (end_time, room_id, module_name, room_name),
+        CONSTRAINT student_exam_schedule_entry_fkey FOREIGN KEY (session_id, generation, exam_id)
+            REFERENCES timetable_generations (session_id, generation, exam_id) ON DELETE CASCADE
+    )
+    """)
+    op.execute("CREATE INDEX ix_student_exam_schedule_exam ON student_exam_schedule (session_id, generation, exam_id)")
+
+    # 2. Backfill existing generations
+    op.execute("""
+    INSERT INTO student_exam_schedule
+    SELECT t.session_id, t.generation, en.student_id, t.exam_id, t.start_time, t.end_time, t.room_id, m.name, r.name
+    FROM timetable_generations t
+    JOIN exams e ON e.id = t.exam_id
+    JOIN modules m ON m.id = e.module_id
+    JOIN enrollments en ON en.module_id = e.module_id
+    LEFT JOIN rooms r ON r.id = t.room_id
+    WHERE t.start_time IS NOT NULL
+    """)
+
+    # 3. Manual edits of an entry are mirrored into the projection
+    op.execute("""
+    CREATE OR REPLACE FUNCTION sync_student_exam_schedule()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE student_exam_schedule
+        SET start_time = NEW.start_time,
+            end_time = NEW.end_time,
+            room_id = NEW.room_id,
+            room_name = (SELECT name FROM rooms WHERE id = NEW.room_id)
+        WHERE session_id = NEW.session_id AND generation = NEW.generation AND exam_id = NEW.exam_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_student_exam_schedule_sync
+    AFTER UPDATE OF start_time, end_time, room_id ON timetable_generations
+    FOR EACH ROW
+    WHEN (OLD.start_time IS DISTINCT FROM NEW.start_time OR OLD.end_time IS DISTINCT FROM NEW.end_time
+          OR OLD.room_id IS DISTINCT FROM NEW.room_id)
+    EXECUTE FUNCTION sync_student_exam_schedule();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_student_exam_schedule_sync ON timetable_generations")
+    op.execute("DROP FUNCTION IF EXISTS sync_student_exam_schedule()")
+    op.execute("DROP TABLE IF EXISTS student_exam_schedule")
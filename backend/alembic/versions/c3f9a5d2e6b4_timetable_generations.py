@@ -0,0 +1,128 @@
+"""timetable_generations
+
+Revision ID: c3f9a5d2e6b4
+Revises: b2e8f4c1d5a3
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f9a5d2e6b4'
+down_revision: Union[str, Sequence[str], None] = 'b2e8f4c1d5a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Published rows only: an auto-updatable view (single relation, subquery in WHERE),
+# so readers and workflow UPDATEs keep using "timetable_entries" unchanged.
+PUBLISHED_VIEW = """
+CREATE VIEW timetable_entries AS
+SELECT t.id, t.session_id, t.generation, t.exam_id, t.room_id, t.supervisor_id,
+       t.start_time, t.end_time, t.status
+FROM timetable_generations t
+WHERE t.generation = (SELECT s.published_generation FROM exam_sessions s WHERE s.id = t.session_id)
+"""
+
+
+def upgrade() -> None:
+    # 1. Generation ids and the per-session publication pointer
+    op.execute("CREATE SEQUENCE timetable_generation_seq START 2")
+    op.add_column('exam_sessions', sa.Column('published_generation', sa.Integer(), nullable=True))
+    op.execute("UPDATE exam_sessions SET published_generation = 1")
+
+    # 2. Seat plans belong to a generation
+    op.drop_constraint('seat_assignments_entry_fkey', 'seat_assignments', type_='foreignkey')
+    op.drop_index('ix_seat_assignments_room_chart', table_name='seat_assignments')
+    op.add_column('seat_assignments', sa.Column('generation', sa.Integer(), nullable=False, server_default='1'))
+    op.alter_column('seat_assignments', 'generation', server_default=None)
+    op.drop_constraint('seat_assignments_pkey', 'seat_assignments', type_='primary')
+    op.create_primary_key('seat_assignments_pkey', 'seat_assignments', ['session_id', 'generation', 'exam_id', 'student_id'])
+
+    # 3. The partitioned table becomes the generation store (existing rows = generation 1)
+    op.execute("ALTER TABLE timetable_entries RENAME TO timetable_generations")
+    op.execute("""
+    DO $$
+    DECLARE s RECORD;
+    BEGIN
+        FOR s IN SELECT id FROM exam_sessions LOOP
+            EXECUTE format('ALTER TABLE IF EXISTS timetable_entries_s%s RENAME TO timetable_generations_s%s', s.id, s.id);
+        END LOOP;
+    END $$;
+    """)
+    op.execute("ALTER TABLE timetable_generations ADD COLUMN generation INTEGER NOT NULL DEFAULT 1")
+    op.execute("ALTER TABLE timetable_generations ALTER COLUMN generation DROP DEFAULT")
+    op.execute("ALTER TABLE timetable_generations DROP CONSTRAINT timetable_entries_session_id_exam_id_key")
+    op.execute("ALTER TABLE timetable_generations ADD CONSTRAINT uq_timetable_generation_exam UNIQUE (session_id, generation, exam_id)")
+
+    op.create_foreign_key('seat_assignments_entry_fkey', 'seat_assignments', 'timetable_generations',
+                          ['session_id', 'generation', 'exam_id'], ['session_id', 'generation', 'exam_id'],
+                          ondelete='CASCADE')
+    op.create_index('ix_seat_assignments_room_chart', 'seat_assignments',
+                    ['session_id', 'generation', 'room_id', 'exam_id', 'seat_index'])
+
+    op.execute("""
+    CREATE OR REPLACE FUNCTION create_timetable_partition()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS timetable_generations_s%s PARTITION OF timetable_generations FOR VALUES IN (%s)',
+            NEW.id, NEW.id);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+    # 4. Readers see the published generation only
+    op.execute(PUBLISHED_VIEW)
+
+
+def downgrade() -> None:
+    # Keeps the published generation only
+    op.execute("DROP VIEW timetable_entries")
+    op.drop_index('ix_seat_assignments_room_chart', table_name='seat_assignments')
+    op.drop_constraint('seat_assignments_entry_fkey', 'seat_assignments', type_='foreignkey')
+    op.execute("""
+    DELETE FROM timetable_generations t USING exam_sessions s
+    WHERE s.id = t.session_id AND t.generation IS DISTINCT FROM s.published_generation
+    """)
+    op.execute("""
+    DELETE FROM seat_assignments a USING exam_sessions s
+    WHERE s.id = a.session_id AND a.generation IS DISTINCT FROM s.published_generation
+    """)
+    op.drop_constraint('seat_assignments_pkey', 'seat_assignments', type_='primary')
+    op.create_primary_key('seat_assignments_pkey', 'seat_assignments', ['session_id', 'exam_id', 'student_id'])
+    op.drop_column('seat_assignments', 'generation')
+
+    op.execute("ALTER TABLE timetable_generations DROP CONSTRAINT uq_timetable_generation_exam")
+    op.execute("ALTER TABLE timetable_generations DROP COLUMN generation")
+    op.execute("ALTER TABLE timetable_generations ADD CONSTRAINT timetable_entries_session_id_exam_id_key UNIQUE (session_id, exam_id)")
+    op.execute("ALTER TABLE timetable_generations RENAME TO timetable_entries")
+    op.execute("""
+    DO $$
+    DECLARE s RECORD;
+    BEGIN
+        FOR s IN SELECT id FROM exam_sessions LOOP
+            EXECUTE format('ALTER TABLE IF EXISTS timetable_generations_s%s RENAME TO timetable_entries_s%s', s.id, s.id);
+        END LOOP;
+    END $$;
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION create_timetable_partition()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS timetable_entries_s%s PARTITION OF timetable_entries FOR VALUES IN (%s)',
+            NEW.id, NEW.id);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.create_foreign_key('seat_assignments_entry_fkey', 'seat_assignments', 'timetable_entries',
+                          ['session_id', 'exam_id'], ['session_id', 'exam_id'], ondelete='CASCADE')
+    op.create_index('ix_seat_assignments_room_chart', 'seat_assignments', ['session_id', 'room_id', 'exam_id', 'seat_index'])
+
+    op.drop_column('exam_sessions', 'published_generation')
+    op.execute("DROP SEQUENCE timetable_generation_seq")
@@ -0,0 +1,33 @@
+"""engine_checkpoints
+
+Revision ID: c6a2b9d0e4f5
+Revises: b5f1a8c9d3e4
+Create Date: 2026-10-20 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a2b9d0e4f5'
+down_revision: Union[str, Sequence[str], None] = 'b5f1a8c9d3e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Optimization checkpoints live in the database: the instance's /tmp is wiped on restart
+    op.create_table('engine_checkpoints',
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('phase', sa.String(length=16), nullable=False),
+    sa.Column('progress', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('engine_checkpoints')
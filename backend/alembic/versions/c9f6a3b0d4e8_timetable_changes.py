@@ -0,0 +1,117 @@
+"""timetable_changes
+
+Revision ID: c9f6a3b0d4e8
+Revises: b8e5f2a9c3d7
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f6a3b0d4e8'
+down_revision: Union[str, Sequence[str], None] = 'b8e5f2a9c3d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Change log of the published timetable; the id is the change version clients sync from.
+    # op: 'update' / 'delete' of one entry, 'reset' when another generation is published.
+    op.execute("""
+    CREATE TABLE timetable_changes (
+        id BIGSERIAL PRIMARY KEY,
+        session_id INTEGER NOT NULL REFERENCES exam_sessions(id) ON DELETE CASCADE,
+        generation INTEGER NOT NULL,
+        op VARCHAR(8) NOT NULL,
+        entry_id INTEGER,
+        exam_id INTEGER,
+        changed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+    )
+    """)
+    op.execute("CREATE INDEX ix_timetable_changes_session ON timetable_changes (session_id, id)")
+
+    # 2. Edits of published rows (manual moves, workflow approvals): one INSERT per statement,
+    # from the transition tables, so approving thousands of entries stays a single pass
+    op.execute("""
+    CREATE OR REPLACE FUNCTION log_timetable_updates()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO timetable_changes (session_id, generation, op, entry_id, exam_id)
+        SELECT n.session_id, n.generation, 'update', n.id, n.exam_id
+        FROM new_rows n
+        JOIN old_rows o ON o.session_id = n.session_id AND o.id = n.id
+        JOIN exam_sessions s ON s.id = n.session_id AND s.published_generation = n.generation
+        WHERE (o.exam_id, o.room_id, o.supervisor_id, o.start_time, o.end_time, o.status)
+              IS DISTINCT FROM (n.exam_id, n.room_id, n.supervisor_id, n.start_time, n.end_time, n.status)
+        ORDER BY n.id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_timetable_changes_update
+    AFTER UPDATE ON timetable_generations
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION log_timetable_updates();
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION log_timetable_deletes()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        -- Superseded generations (collect_generations) are not published: nothing logged
+        INSERT INTO timetable_changes (session_id, generation, op, entry_id, exam_id)
+        SELECT o.session_id, o.generation, 'delete', o.id, o.exam_id
+        FROM old_rows o
+        JOIN exam_sessions s ON s.id = o.session_id AND s.published_generation = o.generation
+        ORDER BY o.id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_timetable_changes_delete
+    AFTER DELETE ON timetable_generations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION log_timetable_deletes();
+    """)
+
+    # 3. Publishing / rolling back swaps the whole timetable: one marker, clients refetch
+    op.execute("""
+    CREATE OR REPLACE FUNCTION log_timetable_publish()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO timetable_changes (session_id, generation, op)
+        VALUES (NEW.id, NEW.published_generation, 'reset');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_timetable_changes_publish
+    AFTER UPDATE OF published_generation ON exam_sessions
+    FOR EACH ROW
+    WHEN (NEW.published_generation IS NOT NULL
+          AND OLD.published_generation IS DISTINCT FROM NEW.published_generation)
+    EXECUTE FUNCTION log_timetable_publish();
+    """)
+
+    # 4. Starting point: the current published generation of every session
+    op.execute("""
+    INSERT INTO timetable_changes (session_id, generation, op)
+    SELECT id, published_generation, 'reset' FROM exam_sessions
+    WHERE published_generation IS NOT NULL ORDER BY id
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_timetable_changes_publish ON exam_sessions")
+    op.execute("DROP TRIGGER IF EXISTS trg_timetable_changes_delete ON timetable_generations")
+    op.execute("DROP TRIGGER IF EXISTS trg_timetable_changes_update ON timetable_generations")
+    op.execute("DROP FUNCTION IF EXISTS log_timetable_publish()")
+    op.execute("DROP FUNCTION IF EXISTS log_timetable_deletes()")
+    op.execute("DROP FUNCTION IF EXISTS log_timetable_updates()")
+    op.drop_table('timetable_changes')
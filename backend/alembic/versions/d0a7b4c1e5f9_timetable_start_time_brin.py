@@ -0,0 +1,37 @@
+"""timetable_start_time_brin
+
+Revision ID: d0a7b4c1e5f9
+Revises: c9f6a3b0d4e8
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0a7b4c1e5f9'
+down_revision: Union[str, Sequence[str], None] = 'c9f6a3b0d4e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The literal-dated partial index stops helping once sessions move past its date, and the
+    # plain start_time btree duplicates ix_timetable_generations_keyset for per-session reads.
+    op.execute("DROP INDEX IF EXISTS ix_timetable_upcoming")
+    op.execute("DROP INDEX IF EXISTS ix_timetable_start_time")
+    # Time-only lookups across sessions: a session partition covers a few weeks and each
+    # generation is written in start_time order (save_results), so block ranges stay narrow.
+    # A few pages per partition instead of a btree entry per row.
+    op.execute("""
+    CREATE INDEX ix_timetable_generations_start_brin
+    ON timetable_generations USING brin (start_time)
+    WITH (pages_per_range = 16, autosummarize = on)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_timetable_generations_start_brin")
+    op.execute("CREATE INDEX ix_timetable_start_time ON timetable_generations (start_time)")
+    op.execute("CREATE INDEX ix_timetable_upcoming ON timetable_generations (start_time) WHERE start_time >= '2026-01-01'")
@@ -0,0 +1,106 @@
+"""dashboard_materialized_views
+
+Revision ID: d4a1b7e3f5c8
+Revises: c3f9a5d2e6b4
+Create Date: 2026-10-19 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a1b7e3f5c8'
+down_revision: Union[str, Sequence[str], None] = 'c3f9a5d2e6b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Dashboard aggregates per exam session, over the published timetable.
+# Each view has a unique index so it can be refreshed CONCURRENTLY
+# (see app/db/dashboard_views.py).
+VIEWS = [
+    ("mv_timetable_kpi", """
+    SELECT
+        s.id AS session_id,
+        COUNT(t.id) AS total_exams,
+        COUNT(t.id) FILTER (WHERE t.status IS NULL OR t.status NOT IN ('DEPT_APPROVED', 'FINAL_APPROVED')) AS draft_count,
+        COUNT(t.id) FILTER (WHERE t.status = 'DEPT_APPROVED') AS dept_approved_count,
+        COUNT(t.id) FILTER (WHERE t.status = 'FINAL_APPROVED') AS final_approved_count,
+        MAX(occ.avg_rate) AS occupancy_rate,
+        MAX(occ.avg_unused_seats) AS avg_unused_seats
+    FROM exam_sessions s
+    LEFT JOIN timetable_entries t ON t.session_id = s.id
+    LEFT JOIN (
+        SELECT
+            t.session_id,
+            AVG(CAST(en_counts.cnt AS NUMERIC) / r.capacity * 100) AS avg_rate,
+            AVG(r.capacity - en_counts.cnt) AS avg_unused_seats
+        FROM timetable_entries t
+        JOIN rooms r ON r.id = t.room_id
+        JOIN exams e ON e.id = t.exam_id
+        JOIN (SELECT module_id, COUNT(*) AS cnt FROM enrollments GROUP BY module_id) en_counts ON e.module_id = en_counts.module_id
+        WHERE r.capacity > 0
+        GROUP BY t.session_id
+    ) occ ON occ.session_id = s.id
+    GROUP BY s.id
+    """, ["session_id"]),
+    # Exams scheduled and exams in a same-day student clash, per program
+    ("mv_program_kpi", """
+    WITH conflicts AS (
+        SELECT t1.session_id, c.exam_a AS exam_id
+        FROM exam_conflicts c
+        JOIN timetable_entries t1 ON t1.exam_id = c.exam_a
+        JOIN timetable_entries t2 ON t2.session_id = t1.session_id AND t2.exam_id = c.exam_b
+        WHERE CAST(t1.start_time AS DATE) = CAST(t2.start_time AS DATE)
+        UNION
+        SELECT t1.session_id, c.exam_b
+        FROM exam_conflicts c
+        JOIN timetable_entries t1 ON t1.exam_id = c.exam_a
+        JOIN timetable_entries t2 ON t2.session_id = t1.session_id AND t2.exam_id = c.exam_b
+        WHERE CAST(t1.start_time AS DATE) = CAST(t2.start_time AS DATE)
+    )
+    SELECT
+        s.id AS session_id,
+        p.id AS program_id,
+        p.department_id,
+        p.name,
+        COUNT(t.id) AS exam_count,
+        COUNT(DISTINCT c.exam_id) AS conflict_count
+    FROM exam_sessions s
+    CROSS JOIN programs p
+    LEFT JOIN modules m ON m.program_id = p.id
+    LEFT JOIN exams e ON e.module_id = m.id
+    LEFT JOIN timetable_entries t ON t.session_id = s.id AND t.exam_id = e.id
+    LEFT JOIN conflicts c ON c.session_id = s.id AND c.exam_id = e.id
+    GROUP BY s.id, p.id
+    """, ["session_id", "program_id"]),
+    ("mv_room_usage", """
+    SELECT t.session_id, r.id AS room_id, r.name, COUNT(t.id) AS usage_count
+    FROM rooms r
+    JOIN timetable_entries t ON r.id = t.room_id
+    GROUP BY t.session_id, r.id
+    """, ["session_id", "room_id"]),
+    ("mv_exams_per_day", """
+    SELECT session_id, CAST(start_time AS DATE) AS day, COUNT(*) AS exam_count
+    FROM timetable_entries
+    GROUP BY session_id, CAST(start_time AS DATE)
+    """, ["session_id", "day"]),
+    ("mv_prof_load", """
+    SELECT t.session_id, pr.id AS professor_id, u.full_name, COUNT(t.id) AS load
+    FROM timetable_entries t
+    JOIN professors pr ON t.supervisor_id = pr.id
+    JOIN users u ON pr.user_id = u.id
+    GROUP BY t.session_id, pr.id, u.full_name
+    """, ["session_id", "professor_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, query, key in VIEWS:
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {query}")
+        op.execute(f"CREATE UNIQUE INDEX uq_{name} ON {name} ({', '.join(key)})")
+
+
+def downgrade() -> None:
+    for name, _, _ in reversed(VIEWS):
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
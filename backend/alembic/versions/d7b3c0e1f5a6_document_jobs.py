@@ -0,0 +1,48 @@
+"""document_jobs
+
+Revision ID: d7b3c0e1f5a6
+Revises: c6a2b9d0e4f5
+Create Date: 2026-10-20 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b3c0e1f5a6'
+down_revision: Union[str, Sequence[str], None] = 'c6a2b9d0e4f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Document jobs and their PDFs are shared by every API worker / instance
+    op.create_table('document_jobs',
+    sa.Column('job_id', sa.String(length=32), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('kinds', sa.String(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False, server_default='queued'),
+    sa.Column('total', sa.Integer(), nullable=True),
+    sa.Column('done', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['session_id'], ['exam_sessions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_table('document_files',
+    sa.Column('job_id', sa.String(length=32), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('content', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['document_jobs.job_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('job_id', 'path')
+    )
+    # PDF streams are already compressed: skip TOAST compression
+    op.execute("ALTER TABLE document_files ALTER COLUMN content SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_table('document_files')
+    op.drop_table('document_jobs')
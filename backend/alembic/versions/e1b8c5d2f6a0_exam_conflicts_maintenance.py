@@ -0,0 +1,213 @@
+"""exam_conflicts_maintenance
+
+Revision ID: e1b8c5d2f6a0
+Revises: d0a7b4c1e5f9
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b8c5d2f6a0'
+down_revision: Union[str, Sequence[str], None] = 'd0a7b4c1e5f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Pairs are now formed on exam ids, like the Python graph builder: two exams of the same
+# module share all of its students. Within one enrollment row the pair is counted once
+# (e1.id < e2.id); between two rows of the same statement, once (lower row id first).
+REFRESH_SQL = """
+    CREATE OR REPLACE FUNCTION refresh_exam_conflicts()
+    RETURNS VOID AS $$
+    BEGIN
+        DELETE FROM exam_conflicts;
+        INSERT INTO exam_conflicts (exam_a, exam_b, weight)
+        SELECT e1.id, e2.id, COUNT(*)
+        FROM enrollments en1
+        JOIN exams e1 ON e1.module_id = en1.module_id
+        JOIN enrollments en2 ON en2.student_id = en1.student_id
+        JOIN exams e2 ON e2.module_id = en2.module_id
+        WHERE e1.id < e2.id
+          AND (en1.id = en2.id OR en1.module_id <> en2.module_id)
+        GROUP BY e1.id, e2.id;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def _add_pairs(rows: str, others: str) -> str:
+    """Add the pairs brought by the enrollment rows `rows` to a state where `others` are the enrollments"""
+    return f"""
+        INSERT INTO exam_conflicts (exam_a, exam_b, weight)
+        SELECT LEAST(e1.id, e2.id), GREATEST(e1.id, e2.id), COUNT(*)
+        FROM {rows} n
+        JOIN exams e1 ON e1.module_id = n.module_id
+        JOIN ({others}) en2 ON en2.student_id = n.student_id
+        JOIN exams e2 ON e2.module_id = en2.module_id
+        WHERE e1.id <> e2.id
+          AND (n.id = en2.id AND e1.id < e2.id
+               OR n.id <> en2.id AND n.module_id <> en2.module_id
+                  AND (n.id < en2.id OR NOT EXISTS (SELECT 1 FROM {rows} n2 WHERE n2.id = en2.id)))
+        GROUP BY 1, 2
+        ON CONFLICT (exam_a, exam_b) DO UPDATE SET weight = exam_conflicts.weight + EXCLUDED.weight;
+    """
+
+
+def _remove_pairs(rows: str, remaining: str) -> str:
+    """Subtract the pairs of the removed enrollment rows `rows`; `remaining` are the enrollments left"""
+    return f"""
+        WITH removed AS (
+            SELECT LEAST(e1.id, e2.id) AS a, GREATEST(e1.id, e2.id) AS b, COUNT(*) AS w
+            FROM {rows} o
+            JOIN exams e1 ON e1.module_id = o.module_id
+            JOIN (
+                SELECT id, student_id, module_id, FALSE AS gone FROM ({remaining}) kept
+                UNION ALL
+                SELECT id, student_id, module_id, TRUE AS gone FROM {rows}
+            ) en2 ON en2.student_id = o.student_id
+            JOIN exams e2 ON e2.module_id = en2.module_id
+            WHERE e1.id <> e2.id
+              AND (o.id = en2.id AND en2.gone AND e1.id < e2.id
+                   OR o.id <> en2.id AND o.module_id <> en2.module_id AND (NOT en2.gone OR o.id < en2.id))
+            GROUP BY 1, 2
+        )
+        UPDATE exam_conflicts c SET weight = c.weight - r.w
+        FROM removed r
+        WHERE c.exam_a = r.a AND c.exam_b = r.b;
+        DELETE FROM exam_conflicts WHERE weight <= 0;
+    """
+
+
+def _function(name: str, body: str) -> str:
+    return f"""
+    CREATE OR REPLACE FUNCTION {name}()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        {body}
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+
+
+# New / moved exams: recompute their pairs from the enrollments of their module
+EXAM_PAIRS_SQL = """
+    INSERT INTO exam_conflicts (exam_a, exam_b, weight)
+    SELECT LEAST(x.id, y.id), GREATEST(x.id, y.id), COUNT(*)
+    FROM {exams} x
+    JOIN enrollments en1 ON en1.module_id = x.module_id
+    JOIN enrollments en2 ON en2.student_id = en1.student_id
+    JOIN exams y ON y.module_id = en2.module_id
+    WHERE x.id <> y.id
+      AND (en1.id = en2.id OR en1.module_id <> en2.module_id)
+      AND (x.id < y.id OR NOT EXISTS (SELECT 1 FROM {exams} x2 WHERE x2.id = y.id))
+    GROUP BY 1, 2
+    ON CONFLICT (exam_a, exam_b) DO UPDATE SET weight = exam_conflicts.weight + EXCLUDED.weight;
+"""
+MOVED_EXAMS = """
+    (SELECT n.id, n.module_id FROM new_rows n JOIN old_rows o ON o.id = n.id
+     WHERE o.module_id IS DISTINCT FROM n.module_id)
+"""
+
+
+def upgrade() -> None:
+    op.execute(REFRESH_SQL)
+
+    # Enrollments: INSERT and DELETE with the exam-id pairing, UPDATE = remove the old rows
+    # from the pre-update state, then add the new ones
+    op.execute(_function("exam_conflicts_on_enroll", _add_pairs("new_rows", "SELECT * FROM enrollments")))
+    op.execute(_function("exam_conflicts_on_unenroll", _remove_pairs("old_rows", "SELECT * FROM enrollments")))
+    op.execute(_function(
+        "exam_conflicts_on_enrollment_update",
+        _remove_pairs("old_rows", "SELECT * FROM enrollments WHERE id NOT IN (SELECT id FROM new_rows)")
+        + _add_pairs("new_rows", "SELECT * FROM enrollments"),
+    ))
+    op.execute("""
+    CREATE TRIGGER trg_exam_conflicts_enrollment_update
+    AFTER UPDATE ON enrollments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION exam_conflicts_on_enrollment_update();
+    """)
+
+    # Exams: created for a module that already has students (POST /manage/exams) or moved
+    # to another module. Deleted exams lose their pairs through the ON DELETE CASCADE.
+    op.execute(_function("exam_conflicts_on_exam_insert", EXAM_PAIRS_SQL.format(exams="new_rows")))
+    op.execute(_function("exam_conflicts_on_exam_update", f"""
+        DELETE FROM exam_conflicts c
+        USING {MOVED_EXAMS} m
+        WHERE c.exam_a = m.id OR c.exam_b = m.id;
+        {EXAM_PAIRS_SQL.format(exams=MOVED_EXAMS)}
+    """))
+    op.execute("""
+    CREATE TRIGGER trg_exam_conflicts_exam_insert
+    AFTER INSERT ON exams
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION exam_conflicts_on_exam_insert();
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_exam_conflicts_exam_update
+    AFTER UPDATE ON exams
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION exam_conflicts_on_exam_update();
+    """)
+
+    op.execute("SELECT refresh_exam_conflicts()")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_exam_conflicts_exam_update ON exams")
+    op.execute("DROP TRIGGER IF EXISTS trg_exam_conflicts_exam_insert ON exams")
+    op.execute("DROP TRIGGER IF EXISTS trg_exam_conflicts_enrollment_update ON enrollments")
+    op.execute("DROP FUNCTION IF EXISTS exam_conflicts_on_exam_update()")
+    op.execute("DROP FUNCTION IF EXISTS exam_conflicts_on_exam_insert()")
+    op.execute("DROP FUNCTION IF EXISTS exam_conflicts_on_enrollment_update()")
+    # Previous (module-based) pairing
+    op.execute("""
+    CREATE OR REPLACE FUNCTION refresh_exam_conflicts()
+    RETURNS VOID AS $$
+    BEGIN
+        DELETE FROM exam_conflicts;
+        INSERT INTO exam_conflicts (exam_a, exam_b, weight)
+        SELECT e1.id, e2.id, COUNT(*)
+        FROM enrollments en1
+        JOIN enrollments en2 ON en1.student_id = en2.student_id AND en1.module_id <> en2.module_id
+        JOIN exams e1 ON e1.module_id = en1.module_id
+        JOIN exams e2 ON e2.module_id = en2.module_id
+        WHERE e1.id < e2.id
+        GROUP BY e1.id, e2.id;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute(_function("exam_conflicts_on_enroll", """
+        INSERT INTO exam_conflicts (exam_a, exam_b, weight)
+        SELECT LEAST(e1.id, e2.id), GREATEST(e1.id, e2.id), COUNT(*)
+        FROM new_rows n
+        JOIN exams e1 ON e1.module_id = n.module_id
+        JOIN enrollments en2 ON en2.student_id = n.student_id AND en2.module_id <> n.module_id
+        JOIN exams e2 ON e2.module_id = en2.module_id
+        WHERE n.id < en2.id OR NOT EXISTS (SELECT 1 FROM new_rows n2 WHERE n2.id = en2.id)
+        GROUP BY 1, 2
+        ON CONFLICT (exam_a, exam_b) DO UPDATE SET weight = exam_conflicts.weight + EXCLUDED.weight;
+    """))
+    op.execute(_function("exam_conflicts_on_unenroll", """
+        WITH removed AS (
+            SELECT LEAST(e1.id, e2.id) AS a, GREATEST(e1.id, e2.id) AS b, COUNT(*) AS w
+            FROM old_rows o
+            JOIN exams e1 ON e1.module_id = o.module_id
+            JOIN (
+                SELECT id, student_id, module_id, FALSE AS gone FROM enrollments
+                UNION ALL
+                SELECT id, student_id, module_id, TRUE AS gone FROM old_rows
+            ) en2 ON en2.student_id = o.student_id AND en2.module_id <> o.module_id
+            JOIN exams e2 ON e2.module_id = en2.module_id
+            WHERE NOT en2.gone OR o.id < en2.id
+            GROUP BY 1, 2
+        )
+        UPDATE exam_conflicts c SET weight = c.weight - r.w
+        FROM removed r
+        WHERE c.exam_a = r.a AND c.exam_b = r.b;
+        DELETE FROM exam_conflicts WHERE weight <= 0;
+    """))
+    op.execute("SELECT refresh_exam_conflicts()")
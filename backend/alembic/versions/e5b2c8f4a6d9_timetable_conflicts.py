@@ -0,0 +1,150 @@
+"""timetable_conflicts
+
+Revision ID: e5b2c8f4a6d9
+Revises: d4a1b7e3f5c8
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b2c8f4a6d9'
+down_revision: Union[str, Sequence[str], None] = 'd4a1b7e3f5c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same-day pairs of conflicting exams of one generation, with program/department keys
+CONFLICT_ROWS_SQL = """
+    SELECT ta.session_id, ta.generation, c.exam_a, c.exam_b, c.weight, CAST(ta.start_time AS DATE),
+           ma.program_id, pa.department_id, mb.program_id, pb.department_id
+    FROM exam_conflicts c
+    JOIN timetable_generations ta ON ta.exam_id = c.exam_a
+    JOIN timetable_generations tb ON tb.session_id = ta.session_id AND tb.generation = ta.generation
+                                 AND tb.exam_id = c.exam_b
+    JOIN exams ea ON ea.id = c.exam_a
+    JOIN modules ma ON ma.id = ea.module_id
+    JOIN programs pa ON pa.id = ma.program_id
+    JOIN exams eb ON eb.id = c.exam_b
+    JOIN modules mb ON mb.id = eb.module_id
+    JOIN programs pb ON pb.id = mb.program_id
+    WHERE CAST(ta.start_time AS DATE) = CAST(tb.start_time AS DATE)
+"""
+
+PROGRAM_KPI_BEFORE = """
+    WITH conflicts AS (
+        SELECT t1.session_id, c.exam_a AS exam_id
+        FROM exam_conflicts c
+        JOIN timetable_entries t1 ON t1.exam_id = c.exam_a
+        JOIN timetable_entries t2 ON t2.session_id = t1.session_id AND t2.exam_id = c.exam_b
+        WHERE CAST(t1.start_time AS DATE) = CAST(t2.start_time AS DATE)
+        UNION
+        SELECT t1.session_id, c.exam_b
+        FROM exam_conflicts c
+        JOIN timetable_entries t1 ON t1.exam_id = c.exam_a
+        JOIN timetable_entries t2 ON t2.session_id = t1.session_id AND t2.exam_id = c.exam_b
+        WHERE CAST(t1.start_time AS DATE) = CAST(t2.start_time AS DATE)
+    )
+"""
+
+PROGRAM_KPI_AFTER = """
+    WITH published AS (
+        SELECT c.* FROM timetable_conflicts c
+        JOIN exam_sessions s ON s.id = c.session_id AND c.generation = s.published_generation
+    ),
+    conflicts AS (
+        SELECT session_id, exam_a AS exam_id FROM published
+        UNION
+        SELECT session_id, exam_b FROM published
+    )
+"""
+
+PROGRAM_KPI_SELECT = """
+    SELECT
+        s.id AS session_id,
+        p.id AS program_id,
+        p.department_id,
+        p.name,
+        COUNT(t.id) AS exam_count,
+        COUNT(DISTINCT c.exam_id) AS conflict_count
+    FROM exam_sessions s
+    CROSS JOIN programs p
+    LEFT JOIN modules m ON m.program_id = p.id
+    LEFT JOIN exams e ON e.module_id = m.id
+    LEFT JOIN timetable_entries t ON t.session_id = s.id AND t.exam_id = e.id
+    LEFT JOIN conflicts c ON c.session_id = s.id AND c.exam_id = e.id
+    GROUP BY s.id, p.id
+"""
+
+
+def _recreate_program_kpi(with_clause: str):
+    op.execute("DROP MATERIALIZED VIEW mv_program_kpi")
+    op.execute(f"CREATE MATERIALIZED VIEW mv_program_kpi AS {with_clause} {PROGRAM_KPI_SELECT}")
+    op.execute("CREATE UNIQUE INDEX uq_mv_program_kpi ON mv_program_kpi (session_id, program_id)")
+
+
+def upgrade() -> None:
+    # 1. Conflicts of each timetable generation (bulk-written by the engine in save_results)
+    op.create_table('timetable_conflicts',
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.Column('exam_a', sa.Integer(), nullable=False),
+    sa.Column('exam_b', sa.Integer(), nullable=False),
+    sa.Column('shared_students', sa.Integer(), nullable=False),
+    sa.Column('conflict_date', sa.Date(), nullable=False),
+    sa.Column('program_a', sa.Integer(), nullable=True),
+    sa.Column('department_a', sa.Integer(), nullable=True),
+    sa.Column('program_b', sa.Integer(), nullable=True),
+    sa.Column('department_b', sa.Integer(), nullable=True),
+    sa.CheckConstraint('exam_a < exam_b', name='ck_timetable_conflicts_ordered'),
+    sa.ForeignKeyConstraint(['session_id', 'generation', 'exam_a'],
+                            ['timetable_generations.session_id', 'timetable_generations.generation', 'timetable_generations.exam_id'],
+                            name='timetable_conflicts_exam_a_fkey', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['session_id', 'generation', 'exam_b'],
+                            ['timetable_generations.session_id', 'timetable_generations.generation', 'timetable_generations.exam_id'],
+                            name='timetable_conflicts_exam_b_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('session_id', 'generation', 'exam_a', 'exam_b')
+    )
+    op.create_index('ix_timetable_conflicts_exam_b', 'timetable_conflicts', ['session_id', 'generation', 'exam_b'])
+    op.create_index('ix_timetable_conflicts_date', 'timetable_conflicts', ['session_id', 'generation', 'conflict_date'])
+
+    # 2. Backfill existing generations
+    op.execute(f"INSERT INTO timetable_conflicts {CONFLICT_ROWS_SQL}")
+
+    # 3. Manual edits (rescheduling an entry) recompute that exam's conflicts only
+    op.execute(f"""
+    CREATE OR REPLACE FUNCTION sync_timetable_conflicts()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        DELETE FROM timetable_conflicts
+        WHERE session_id = OLD.session_id AND generation = OLD.generation
+          AND (exam_a = OLD.exam_id OR exam_b = OLD.exam_id);
+
+        INSERT INTO timetable_conflicts
+        {CONFLICT_ROWS_SQL}
+          AND ta.session_id = NEW.session_id AND ta.generation = NEW.generation
+          AND (c.exam_a = NEW.exam_id OR c.exam_b = NEW.exam_id);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_timetable_conflicts_sync
+    AFTER UPDATE OF start_time, exam_id ON timetable_generations
+    FOR EACH ROW
+    WHEN (OLD.start_time IS DISTINCT FROM NEW.start_time OR OLD.exam_id IS DISTINCT FROM NEW.exam_id)
+    EXECUTE FUNCTION sync_timetable_conflicts();
+    """)
+
+    # 4. Dashboard conflict counts read the persisted pairs
+    _recreate_program_kpi(PROGRAM_KPI_AFTER)
+
+
+def downgrade() -> None:
+    _recreate_program_kpi(PROGRAM_KPI_BEFORE)
+    op.execute("DROP TRIGGER IF EXISTS trg_timetable_conflicts_sync ON timetable_generations")
+    op.execute("DROP FUNCTION IF EXISTS sync_timetable_conflicts()")
+    op.drop_index('ix_timetable_conflicts_date', table_name='timetable_conflicts')
+    op.drop_index('ix_timetable_conflicts_exam_b', table_name='timetable_conflicts')
+    op.drop_table('timetable_conflicts')
@@ -0,0 +1,42 @@
+"""enrollment_version_bump
+
+Revision ID: e8c4a1d2f7b3
+Revises: d7b3c0e1f5a6
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4a1d2f7b3'
+down_revision: Union[str, Sequence[str], None] = 'd7b3c0e1f5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Enrollments are written outside the API (imports, SQL), so no endpoint calls bump_version:
+    # the statement triggers that keep exam_conflicts / student_exam_schedule in sync change
+    # what the cached endpoints return, invalidate them from the database as well.
+    # Named to fire after the trg_exam_conflicts_* / trg_student_schedule_* triggers.
+    op.execute("""
+    CREATE OR REPLACE FUNCTION timetable_version_bump()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM nextval('timetable_version_seq');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_timetable_version_enrollments
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON enrollments
+    FOR EACH STATEMENT EXECUTE FUNCTION timetable_version_bump();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_timetable_version_enrollments ON enrollments")
+    op.execute("DROP FUNCTION IF EXISTS timetable_version_bump()")
@@ -0,0 +1,124 @@
+"""timetable_conflicts_daily_limit
+
+Revision ID: f2c9d6e3a7b1
+Revises: e1b8c5d2f6a0
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c9d6e3a7b1'
+down_revision: Union[str, Sequence[str], None] = 'e1b8c5d2f6a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same-day pairs that break the student rules (same as engine.conflict_rows): same slot, or
+# shared students sitting more than max_exams_per_student_day exams that day. shared_students
+# counts the students in violation; the per-student count only runs for k > 1, off-slot pairs.
+CONFLICT_ROWS_SQL = """
+    SELECT * FROM (
+        SELECT ta.session_id, ta.generation, c.exam_a, c.exam_b,
+               CASE WHEN ta.start_time = tb.start_time OR lim.k <= 1 THEN c.weight ELSE (
+                   SELECT COUNT(DISTINCT en_a.student_id)
+                   FROM enrollments en_a
+                   JOIN enrollments en_b ON en_b.student_id = en_a.student_id AND en_b.module_id = eb.module_id
+                   WHERE en_a.module_id = ea.module_id
+                     AND (SELECT COUNT(*)
+                          FROM enrollments s3
+                          JOIN exams e3 ON e3.module_id = s3.module_id
+                          JOIN timetable_generations t3 ON t3.exam_id = e3.id
+                               AND t3.session_id = ta.session_id AND t3.generation = ta.generation
+                          WHERE s3.student_id = en_a.student_id
+                            AND CAST(t3.start_time AS DATE) = CAST(ta.start_time AS DATE)) > lim.k
+               ) END AS shared_students,
+               CAST(ta.start_time AS DATE) AS conflict_date,
+               ma.program_id AS program_a, pa.department_id AS department_a,
+               mb.program_id AS program_b, pb.department_id AS department_b
+        FROM exam_conflicts c
+        CROSS JOIN (SELECT COALESCE(
+            (SELECT value::INT FROM app_settings WHERE key = 'max_exams_per_student_day'), 1) AS k) lim
+        JOIN timetable_generations ta ON ta.exam_id = c.exam_a
+        JOIN timetable_generations tb ON tb.session_id = ta.session_id AND tb.generation = ta.generation
+                                     AND tb.exam_id = c.exam_b
+        JOIN exams ea ON ea.id = c.exam_a
+        JOIN modules ma ON ma.id = ea.module_id
+        JOIN programs pa ON pa.id = ma.program_id
+        JOIN exams eb ON eb.id = c.exam_b
+        JOIN modules mb ON mb.id = eb.module_id
+        JOIN programs pb ON pb.id = mb.program_id
+        WHERE CAST(ta.start_time AS DATE) = CAST(tb.start_time AS DATE)
+          {filters}
+    ) pairs
+    WHERE shared_students > 0
+"""
+
+# With k > 1 moving one exam can turn other pairs of its old / new day into violations (or back):
+# the trigger recomputes both days of the generation, not only the moved exam's pairs.
+SYNC_FUNCTION = """
+    CREATE OR REPLACE FUNCTION sync_timetable_conflicts()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        DELETE FROM timetable_conflicts
+        WHERE session_id = OLD.session_id AND generation = OLD.generation
+          AND (exam_a = OLD.exam_id OR exam_b = OLD.exam_id
+               OR conflict_date IN (CAST(OLD.start_time AS DATE), CAST(NEW.start_time AS DATE)));
+
+        INSERT INTO timetable_conflicts
+        {rows};
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+# Previous definitions (e5b2c8f4a6d9), restored by the downgrade
+OLD_CONFLICT_ROWS_SQL = """
+    SELECT ta.session_id, ta.generation, c.exam_a, c.exam_b, c.weight, CAST(ta.start_time AS DATE),
+           ma.program_id, pa.department_id, mb.program_id, pb.department_id
+    FROM exam_conflicts c
+    JOIN timetable_generations ta ON ta.exam_id = c.exam_a
+    JOIN timetable_generations tb ON tb.session_id = ta.session_id AND tb.generation = ta.generation
+                                 AND tb.exam_id = c.exam_b
+    JOIN exams ea ON ea.id = c.exam_a
+    JOIN modules ma ON ma.id = ea.module_id
+    JOIN programs pa ON pa.id = ma.program_id
+    JOIN exams eb ON eb.id = c.exam_b
+    JOIN modules mb ON mb.id = eb.module_id
+    JOIN programs pb ON pb.id = mb.program_id
+    WHERE CAST(ta.start_time AS DATE) = CAST(tb.start_time AS DATE)
+"""
+
+
+def _rebuild(rows_sql: str):
+    op.execute("DELETE FROM timetable_conflicts")
+    op.execute(f"INSERT INTO timetable_conflicts {rows_sql}")
+
+
+def upgrade() -> None:
+    op.execute(SYNC_FUNCTION.format(rows=CONFLICT_ROWS_SQL.format(filters="""
+          AND ta.session_id = NEW.session_id AND ta.generation = NEW.generation
+          AND CAST(ta.start_time AS DATE) IN (CAST(OLD.start_time AS DATE), CAST(NEW.start_time AS DATE))
+    """)))
+    _rebuild(CONFLICT_ROWS_SQL.format(filters=""))
+
+
+def downgrade() -> None:
+    op.execute(f"""
+    CREATE OR REPLACE FUNCTION sync_timetable_conflicts()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        DELETE FROM timetable_conflicts
+        WHERE session_id = OLD.session_id AND generation = OLD.generation
+          AND (exam_a = OLD.exam_id OR exam_b = OLD.exam_id);
+
+        INSERT INTO timetable_conflicts
+        {OLD_CONFLICT_ROWS_SQL}
+          AND ta.session_id = NEW.session_id AND ta.generation = NEW.generation
+          AND (c.exam_a = NEW.exam_id OR c.exam_b = NEW.exam_id);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    _rebuild(OLD_CONFLICT_ROWS_SQL)
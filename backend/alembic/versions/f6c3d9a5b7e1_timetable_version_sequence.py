@@ -0,0 +1,26 @@
+"""timetable_version_sequence
+
+Revision ID: f6c3d9a5b7e1
+Revises: e5b2c8f4a6d9
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c3d9a5b7e1'
+down_revision: Union[str, Sequence[str], None] = 'e5b2c8f4a6d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Global timetable version used as response cache key (app/core/cache.py)
+    op.execute("CREATE SEQUENCE timetable_version_seq")
+    op.execute("SELECT nextval('timetable_version_seq')")
+
+
+def downgrade() -> None:
+    op.execute("DROP SEQUENCE timetable_version_seq")
@@ -0,0 +1,96 @@
+"""
+Compact checkpoints for long optimization runs, stored in the engine_checkpoints table.
+
+The payload is a fixed header followed by the solution as packed int32 rows
+(exam_id, day, slot, room_id, supervisor_id). Writing one for a few thousand
+exams is a single small upsert, cheap enough to run every few seconds from
+inside the search loop, and it survives an instance restart (a local /tmp
+does not on the hosting platform).
+
+A checkpoint is only reused when its fingerprint matches the current instance:
+exams, rooms and capacities, professors and unavailability, enrollments and
+scheduling settings all feed it.
+"""
+import hashlib
+import os
+import struct
+from array import array
+from typing import Dict, Optional, Tuple
+import sqlalchemy as sa
+
+# Seconds between two checkpoint writes
+CHECKPOINT_INTERVAL = float(os.getenv("ENGINE_CHECKPOINT_INTERVAL", "5"))
+
+MAGIC = b"EXCK"
+VERSION = 2
+# magic, version, n rows
+HEADER = struct.Struct("<4sHi")
+ROW_WIDTH = 5
+
+PHASES = ["construct", "deferred", "optimize", "solved"]
+
+
+def fingerprint(*parts) -> str:
+    """Identifies the instance a checkpoint belongs to (sha256 of the solver inputs and config)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def encode_solution(solution: Dict[int, Tuple[int, int, int, int]]) -> bytes:
+    rows = array("i")
+    for exam_id, (day, slot, room_id, prof_id) in solution.items():
+        rows.extend((exam_id, day, slot, room_id, prof_id))
+    return HEADER.pack(MAGIC, VERSION, len(solution)) + rows.tobytes()
+
+
+def decode_solution(data: bytes) -> Optional[Dict[int, Tuple[int, int, int, int]]]:
+    """Solution of a payload, or None if it is truncated or from another format version"""
+    if len(data) < HEADER.size:
+        return None
+    magic, version, n = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+    body = data[HEADER.size:HEADER.size + 4 * ROW_WIDTH * n]
+    if n < 0 or len(body) != 4 * ROW_WIDTH * n:
+        return None
+    rows = array("i")
+    rows.frombytes(body)
+    return {
+        rows[i]: (rows[i + 1], rows[i + 2], rows[i + 3], rows[i + 4])
+        for i in range(0, len(rows), ROW_WIDTH)
+    }
+
+
+async def save_checkpoint(db, job_id: str, instance_fp: str, phase: str, progress: int, payload: bytes):
+    await db.execute(sa.text("""
+        INSERT INTO engine_checkpoints (job_id, fingerprint, phase, progress, payload, updated_at)
+        VALUES (:job_id, :fp, :phase, :progress, :payload, now())
+        ON CONFLICT (job_id) DO UPDATE
+        SET fingerprint = EXCLUDED.fingerprint, phase = EXCLUDED.phase, progress = EXCLUDED.progress,
+            payload = EXCLUDED.payload, updated_at = EXCLUDED.updated_at
+    """), {"job_id": job_id, "fp": instance_fp, "phase": phase, "progress": progress, "payload": payload})
+    await db.commit()
+
+
+async def load_checkpoint(db, job_id: str, instance_fp: str) -> Optional[dict]:
+    """Returns {"phase", "progress", "solution"} or None if missing / stale / corrupt."""
+    result = await db.execute(sa.text(
+        "SELECT fingerprint, phase, progress, payload FROM engine_checkpoints WHERE job_id = :job_id"
+    ), {"job_id": job_id})
+    row = result.fetchone()
+    if row is None:
+        return None
+    fp, phase, progress, payload = row
+    solution = decode_solution(bytes(payload)) if fp == instance_fp and phase in PHASES else None
+    if solution is None:
+        print(f"Ignoring checkpoint {job_id} (stale or incompatible)")
+        return None
+    return {"phase": phase, "progress": progress, "solution": solution}
+
+
+async def clear_checkpoint(db, job_id: str):
+    await db.execute(sa.text("DELETE FROM engine_checkpoints WHERE job_id = :job_id"), {"job_id": job_id})
+    await db.commit()
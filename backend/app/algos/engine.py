@@ -1,29 +1,130 @@
-from typing import List, Dict, Set
+from typing import List, Dict, FrozenSet, Set, Optional, Tuple
 import asyncio
 from sqlalchemy import select, func
 import sqlalchemy as sa
 from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
-from app.models.all_models import Student, Exam, Room, Professor, Enrollment, TimetableEntry, Module
+from array import array
+import bisect
+from app.models.all_models import Student, Exam, Room, Professor, Enrollment, TimetableGeneration, Module, ProfessorUnavailability, ExamSession
 from app.db.session import AsyncSessionLocal
+from app.algos.graph_store import CSRGraphBuilder
+from app.algos import checkpoint
+from app.db import generations
+from app.db.bulk import copy_rows
+from app.db.dashboard_views import refresh_dashboard_views
+from app.core.cache import bump_version
+from app.algos.seating import generate_seating_plan
+import os
+import shutil
+import time
+
+# Rows fetched per round-trip when streaming enrollments in out-of-core mode
+ENROLLMENT_CHUNK = 20000
+
+# Fallback start when no exam session exists: June 1st 2026
+SESSION_START = datetime(2026, 6, 1, 8, 30)
+# First slot of a day, then slot definitions (Offsets in minutes from 8:30)
+DAY_START = timedelta(hours=8, minutes=30)
+SLOT_OFFSETS = [0, 120, 300, 420]
+
+# Max supervisions per professor and day
+MAX_DAILY_SUPERVISIONS = {"draft": 4, "optimized": 2}
+
+# Carter proximity cost per shared student, indexed by the day gap between two exams
+PROXIMITY_COST = [32, 16, 8, 4, 2, 1]
+# Personal schedules of a generation, built server-side from enrollments
+STUDENT_SCHEDULE_SQL = """
+    INSERT INTO student_exam_schedule
+        (session_id, generation, student_id, exam_id, start_time, end_time, room_id, module_name, room_name)
+    SELECT t.session_id, t.generation, en.student_id, t.exam_id, t.start_time, t.end_time, t.room_id, m.name, r.name
+    FROM timetable_generations t
+    JOIN exams e ON e.id = t.exam_id
+    JOIN modules m ON m.id = e.module_id
+    JOIN enrollments en ON en.module_id = e.module_id
+    LEFT JOIN rooms r ON r.id = t.room_id
+    WHERE t.session_id = :sid AND t.generation = :gen
+"""
+TIMETABLE_CONFLICT_COLUMNS = (
+    "session_id", "generation", "exam_a", "exam_b", "shared_students", "conflict_date",
+    "program_a", "department_a", "program_b", "department_b",
+)
 
 class OptimizationEngine:
-    def __init__(self, session_factory):
+    def __init__(self, session_factory, out_of_core: Optional[bool] = None, memory_limit_mb: Optional[int] = None,
+                 graph_source: Optional[str] = None, max_exams_per_day: Optional[int] = None,
+                 session_id: Optional[int] = None):
         self.session_factory = session_factory
+        # Exam session targeted by this run (None = the current session, resolved by load_data)
+        self.session_id = session_id
+        self.session_start = SESSION_START
+        # Generation written by save_results (published by publish())
+        self.generation = None
+        # spread_cost of the final solution, computed by run() while the graph is still open
+        self.final_spread_cost = None
+        # Temp directory of the on-disk CSR graph (out-of-core / sql modes), removed by release_graph
+        self._graph_dir = None
+        # Out-of-core mode streams enrollments and keeps the graph in a memory-mapped CSR file
+        if out_of_core is None:
+            out_of_core = os.getenv("ENGINE_OUT_OF_CORE", "false").lower() in ("1", "true")
+        self.out_of_core = out_of_core
+        # "python": build the graph from enrollments, "sql": stream the exam_conflicts table
+        self.graph_source = graph_source or os.getenv("ENGINE_GRAPH_SOURCE", "python")
+        # Max exams per student and day (optimized mode); read from app_settings by load_data if not given
+        self.max_exams_per_day = max_exams_per_day or 1
+        self._max_exams_override = max_exams_per_day is not None
+        self.memory_limit_mb = memory_limit_mb or int(os.getenv("ENGINE_MEMORY_LIMIT_MB", "64"))
         self.exams: List[Exam] = []
         self.rooms: List[Room] = []
         self.profs: List[Professor] = []
-        self.enrollments: Dict[int, Set[int]] = {} # exam_id -> set of student_ids
-        self.conflicts: Dict[int, Set[int]] = {} # exam_id -> set of conflicting exam_ids
+        self.unavailability: List[Tuple[int, int, Optional[int]]] = [] # (prof_id, day, slot or None = whole day)
+        self.prof_unavailable: Dict[int, int] = {} # prof_id -> bitset over day * slots_per_day + slot
+        self.slots_per_day = len(SLOT_OFFSETS)
+        self.slots: List[Tuple[int, int]] = [] # (day, slot) grid of the current run
+        self.days = 0
+        self.mode = "optimized"
+
+        # Per-student daily counters, only used when max_exams_per_day > 1
+        self.student_day_counts: Optional[bytearray] = None # int8 counters, row-major students x days
+        self.exam_student_idx: Dict[int, array] = {} # exam_id -> student row indexes
+        self.enrollments: Dict[int, Set[int]] = {} # exam_id -> set of student_ids (in-memory mode only)
+        self.exam_sizes: Dict[int, int] = {} # exam_id -> number of enrolled students
+        self.enrollment_hashes: Dict[int, tuple] = {} # exam_id -> (size, hash of sorted students), out-of-core / sql modes
+        self.candidate_students: Dict[int, FrozenSet[int]] = {} # exam_id -> students, only for exams sharing a hash key
+        self.conflicts: Dict[int, Dict[int, int]] = {} # exam_id -> {conflicting exam_id: shared students} (or a CSRConflictGraph)
+
+        # Graph reduction (see reduce_graph); None means no reduction was run
+        self.super_nodes: Optional[Dict[int, List[int]]] = None # rep exam_id -> exam_ids with identical students
+        self.reduced_conflicts: Dict[int, Set[int]] = {} # rep exam_id -> conflicting rep exam_ids
+        self.deferred: List[Tuple[int, Optional[int]]] = [] # (exam_id, dominator exam_id or None), placed last
         
         # Solution state
-        # exam_id -> (room_id, time_slot, supervisor_id)
+        # exam_id -> (day, slot, room_id, supervisor_id)
         self.solution = {} 
 
+        # Checkpointing (see run); disabled when the phases are driven by hand
+        self._checkpoint_job: Optional[str] = None
+        self._checkpoint_fp = ""
+        self._last_checkpoint = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._checkpoint_write = None # Future of the last checkpoint write (see _maybe_checkpoint)
+
     async def load_data(self):
         """Load all necessary data into memory"""
         print("Loading data for optimization...")
         async with self.session_factory() as session:
+            # Resolve the exam session (its start date anchors day indexes)
+            if self.session_id is None:
+                result = await session.execute(select(ExamSession).where(ExamSession.is_current))
+            else:
+                result = await session.execute(select(ExamSession).where(ExamSession.id == self.session_id))
+            exam_session = result.scalars().first()
+            if exam_session is None:
+                raise ValueError(f"Exam session {self.session_id or '(current)'} not found")
+            self.session_id = exam_session.id
+            self.session_start = datetime.combine(exam_session.start_date, datetime.min.time()) + DAY_START
+            print(f"Target session: {exam_session.name} (starts {exam_session.start_date})")
+
             # Load Exams with relationships
             result = await session.execute(
                 select(Exam).options(
@@ -41,6 +142,29 @@ class OptimizationEngine:
             result = await session.execute(select(Professor))
             self.profs = result.scalars().all()
 
+            # Load declared unavailability (dates -> day index of the session)
+            result = await session.execute(
+                select(ProfessorUnavailability.professor_id, ProfessorUnavailability.date, ProfessorUnavailability.slot)
+            )
+            self.unavailability = [
+                (prof_id, (d - self.session_start.date()).days, slot) for prof_id, d, slot in result.all()
+            ]
+
+            # Scheduling rules shared with validate_timetable()
+            if not self._max_exams_override:
+                result = await session.execute(
+                    sa.text("SELECT value FROM app_settings WHERE key = 'max_exams_per_student_day'")
+                )
+                value = result.scalar()
+                self.max_exams_per_day = int(value) if value else 1
+
+            if self.out_of_core or self.graph_source == "sql":
+                if self.max_exams_per_day > 1:
+                    print("Per-student daily limit needs the enrollment map, falling back to 1 exam/day.")
+                    self.max_exams_per_day = 1
+                # Enrollments are streamed later (build_conflict_graph_chunked / build_conflict_graph_sql)
+                return
+
             # Load Enrollments (optimization: raw query for speed)
             print("Loading enrollments map...")
             query = """
@@ -57,18 +181,19 @@ class OptimizationEngine:
                 if exam_id not in self.enrollments:
                     self.enrollments[exam_id] = set()
                 self.enrollments[exam_id].add(student_id)
+            self.exam_sizes = {exam_id: len(students) for exam_id, students in self.enrollments.items()}
             print(f"Loaded enrollments for {len(self.enrollments)} exams")
 
     def build_conflict_graph(self):
         """Construct the graph where edges represent students taking both exams"""
         print("Building conflict graph...")
-        # Dictionary exam_id -> set of conflicting exam_ids
+        # Dictionary exam_id -> {conflicting exam_id: shared students}
         # Two exams conflict if they share at least one student
         
         # Inverted index: student_id -> list of exam_ids
         student_exams = {}
         for exam_id, students in self.enrollments.items():
-            self.conflicts[exam_id] = set() # Init
+            self.conflicts[exam_id] = {} # Init
             for sid in students:
                 if sid not in student_exams:
                     student_exams[sid] = []
@@ -80,132 +205,697 @@ class OptimizationEngine:
             for i in range(len(e_ids)):
                 for j in range(i + 1, len(e_ids)):
                     u, v = e_ids[i], e_ids[j]
-                    self.conflicts[u].add(v)
-                    self.conflicts[v].add(u)
+                    self.conflicts[u][v] = self.conflicts[u].get(v, 0) + 1
+                    self.conflicts[v][u] = self.conflicts[v].get(u, 0) + 1
         
         print("Conflict graph built.")
 
-    def initial_solution(self, mode="optimized"):
+    async def build_conflict_graph_chunked(self):
+        """
+        Out-of-core variant of build_conflict_graph.
+        Enrollments are streamed sorted by student, each student's exam clique is
+        emitted into a bounded pair buffer spilled to disk (memory_limit_mb), and the
+        merged counts end up in a memory-mapped CSR file. Peak memory depends on the
+        number of exams and the ceiling, not on the number of students.
+        """
+        print(f"Building conflict graph (out-of-core, {self.memory_limit_mb} MB ceiling)...")
+        exam_ids = sorted(e.id for e in self.exams)
+        index = {exam_id: i for i, exam_id in enumerate(exam_ids)}
+        builder = CSRGraphBuilder(exam_ids, memory_limit_mb=self.memory_limit_mb)
+        self._graph_dir = builder.workdir
+
+        sizes = [0] * len(exam_ids)
+        # Rolling hash of each exam's student array (students arrive sorted)
+        hashes = [0] * len(exam_ids)
+        MOD = (1 << 61) - 1
+
+        query = """
+            SELECT en.student_id, e.id as exam_id
+            FROM enrollments en
+            JOIN exams e ON e.module_id = en.module_id
+            ORDER BY en.student_id
+        """
+        current_student = None
+        student_exams = []
+        async with self.session_factory() as session:
+            result = await session.stream(sa.text(query).execution_options(yield_per=ENROLLMENT_CHUNK))
+            async for rows in result.partitions(ENROLLMENT_CHUNK):
+                for student_id, exam_id in rows:
+                    i = index.get(exam_id)
+                    if i is None:
+                        continue
+                    if student_id != current_student:
+                        builder.add_clique(student_exams)
+                        student_exams = []
+                        current_student = student_id
+                    student_exams.append(i)
+                    sizes[i] += 1
+                    hashes[i] = (hashes[i] * 1000003 + student_id) % MOD
+            builder.add_clique(student_exams)
+
+        self.exam_sizes = {exam_id: sizes[i] for i, exam_id in enumerate(exam_ids) if sizes[i]}
+        self.enrollment_hashes = {exam_id: (sizes[i], hashes[i]) for i, exam_id in enumerate(exam_ids) if sizes[i]}
+        spilled_runs = len(builder.runs)
+        self.conflicts = builder.finalize()
+        print(f"Conflict graph built ({self.conflicts.nnz // 2} edges, {spilled_runs} runs merged).")
+
+    async def build_conflict_graph_sql(self):
+        """
+        SQL push-down variant: Postgres maintains the weighted edge list in
+        exam_conflicts (self-join of enrollments, refreshed by triggers), the
+        engine only streams it into a CSR graph. Exam sizes and the sorted
+        student hash used by reduce_graph are aggregated server-side as well.
+        """
+        print("Loading conflict graph from exam_conflicts...")
+        exam_ids = sorted(e.id for e in self.exams)
+        index = {exam_id: i for i, exam_id in enumerate(exam_ids)}
+        builder = CSRGraphBuilder(exam_ids, memory_limit_mb=self.memory_limit_mb)
+        self._graph_dir = builder.workdir
+
+        async with self.session_factory() as session:
+            result = await session.stream(
+                sa.text("SELECT exam_a, exam_b, weight FROM exam_conflicts")
+                .execution_options(yield_per=ENROLLMENT_CHUNK)
+            )
+            async for rows in result.partitions(ENROLLMENT_CHUNK):
+                for exam_a, exam_b, weight in rows:
+                    if exam_a in index and exam_b in index:
+                        builder.add_edge(index[exam_a], index[exam_b], weight)
+
+            result = await session.execute(sa.text("""
+                SELECT e.id, COUNT(*), md5(string_agg(en.student_id::text, ',' ORDER BY en.student_id))
+                FROM exams e
+                JOIN enrollments en ON en.module_id = e.module_id
+                GROUP BY e.id
+            """))
+            for exam_id, size, digest in result.fetchall():
+                self.exam_sizes[exam_id] = size
+                self.enrollment_hashes[exam_id] = (size, digest)
+
+        self.conflicts = builder.finalize()
+        print(f"Conflict graph loaded ({self.conflicts.nnz // 2} edges).")
+
+    async def load_candidate_students(self):
+        """
+        Out-of-core / sql modes keep no student sets in memory and reduce_graph groups
+        exams on the (size, hash) key alone. Fetch the students of the exams that share
+        a key (usually a handful) so that only truly identical sets get merged.
+        """
+        groups = {}
+        for exam_id, key in self.enrollment_hashes.items():
+            groups.setdefault(key, []).append(exam_id)
+        candidates = [m for members in groups.values() if len(members) > 1 for m in members]
+        self.candidate_students = {}
+        async with self.session_factory() as session:
+            for start in range(0, len(candidates), ENROLLMENT_CHUNK):
+                result = await session.execute(sa.text("""
+                    SELECT e.id, array_agg(DISTINCT en.student_id ORDER BY en.student_id)
+                    FROM exams e
+                    JOIN enrollments en ON en.module_id = e.module_id
+                    WHERE e.id = ANY(:ids)
+                    GROUP BY e.id
+                """), {"ids": candidates[start:start + ENROLLMENT_CHUNK]})
+                for exam_id, students in result.fetchall():
+                    self.candidate_students[exam_id] = frozenset(students)
+        print(f"Loaded students of {len(self.candidate_students)} exams sharing an enrollment hash")
+
+    def _exam_students(self, exam_id) -> Optional[Set[int]]:
+        if exam_id in self.enrollments:
+            return self.enrollments[exam_id]
+        return self.candidate_students.get(exam_id)
+
+    def reduce_graph(self):
+        """
+        Graph reduction pre-pass, run between build_conflict_graph and initial_solution.
+        - Exams with exactly the same students are collapsed into one super-node
+          (hash of the sorted student array) and placed as a block.
+        - Exams whose neighbourhood is dominated by a non-adjacent exam are removed
+          and placed afterwards, preferably on the day of their dominator.
+        - Degree-0 exams are removed and placed at the very end.
+        """
+        print("Reducing conflict graph...")
+        # 1. Identical enrollments -> super-nodes (rep exam_id -> member exam_ids)
+        by_students = {}
+        for exam in self.exams:
+            # Exams without students never conflict: keep them as singletons
+            if not self.exam_sizes.get(exam.id):
+                key = ("empty", exam.id)
+            elif exam.id in self.enrollment_hashes:
+                key = self.enrollment_hashes[exam.id]
+            else:
+                key = hash(tuple(sorted(self.enrollments[exam.id])))
+            by_students.setdefault(key, []).append(exam.id)
+
+        self.super_nodes = {}
+        rep_of = {}
+        for members in by_students.values():
+            # Guard against hash collisions: only merge truly identical sets
+            # (out-of-core / sql modes compare the sets of load_candidate_students;
+            # an exam whose set is unknown stays a singleton)
+            while members:
+                rep = members[0]
+                students = self._exam_students(rep)
+                if students is None:
+                    same = [rep]
+                else:
+                    same = [m for m in members if self._exam_students(m) == students]
+                members = [m for m in members if m not in same]
+                self.super_nodes[rep] = same
+                for m in same:
+                    rep_of[m] = rep
+
+        # Reduced graph between super-nodes
+        self.reduced_conflicts = {rep: set() for rep in self.super_nodes}
+        for rep, members in self.super_nodes.items():
+            for m in members:
+                for n in self.conflicts.get(m, ()):
+                    if rep_of[n] != rep:
+                        self.reduced_conflicts[rep].add(rep_of[n])
+
+        # 2. Degree-0 exams: no student shared with anyone, trivially placeable
+        isolated = [rep for rep, members in self.super_nodes.items()
+                    if len(members) == 1 and not self.reduced_conflicts[rep]]
+
+        # 3. Dominated singletons: N(u) ⊆ N(v), u and v not adjacent -> u can take v's day
+        dominated = []
+        removed = set(isolated)
+        dominators = set()
+        by_degree = sorted(self.reduced_conflicts, key=lambda r: len(self.reduced_conflicts[r]))
+        for u in by_degree:
+            if u in removed or u in dominators or len(self.super_nodes[u]) > 1:
+                continue
+            neighbours = self.reduced_conflicts[u] - removed
+            if not neighbours:
+                continue
+            # Any dominator is adjacent to all of N(u): scan the smallest neighbourhood only
+            pivot = min(neighbours, key=lambda w: len(self.reduced_conflicts[w]))
+            for v in self.reduced_conflicts[pivot]:
+                if v == u or v in removed or v in neighbours:
+                    continue
+                if neighbours <= self.reduced_conflicts[v]:
+                    dominated.append((u, v))
+                    removed.add(u)
+                    dominators.add(v)
+                    break
+
+        self.deferred = [(u, v) for u, v in dominated] + [(u, None) for u in isolated]
+        for rep in removed:
+            del self.super_nodes[rep]
+        print(f"Reduced graph: {len(self.super_nodes)} super-nodes for {len(self.exams)} exams "
+              f"({len(dominated)} dominated, {len(isolated)} isolated deferred).")
+
+    def build_unavailability_bitsets(self, days, slots_per_day):
+        """
+        Professors x slots availability as one int bitset per professor:
+        bit (day * slots_per_day + slot) is set when the professor is unavailable.
+        """
+        self.slots_per_day = slots_per_day
+        self.prof_unavailable = {}
+        full_day = (1 << slots_per_day) - 1
+        for prof_id, day, slot in self.unavailability:
+            if not 0 <= day < days:
+                continue
+            if slot is None:
+                bits = full_day << (day * slots_per_day)
+            elif 0 <= slot < slots_per_day:
+                bits = 1 << (day * slots_per_day + slot)
+            else:
+                continue
+            self.prof_unavailable[prof_id] = self.prof_unavailable.get(prof_id, 0) | bits
+
+    def _init_student_counters(self):
+        """
+        students x days counters (int8 in a bytearray) for the rule
+        "max k exams per student per day". Not needed for k = 1, where the
+        conflict graph already blocks the whole day.
+        """
+        if self.max_exams_per_day <= 1 or self.mode == "draft" or not self.enrollments:
+            self.student_day_counts = None
+            return False
+        students = sorted({sid for ss in self.enrollments.values() for sid in ss})
+        index = {sid: i for i, sid in enumerate(students)}
+        self.exam_student_idx = {
+            exam_id: array("i", sorted(index[sid] for sid in ss)) for exam_id, ss in self.enrollments.items()
+        }
+        self.student_day_counts = bytearray(len(students) * self.days)
+        return True
+
+    def _bump_students(self, exam_id, day, delta):
+        counts, days = self.student_day_counts, self.days
+        for i in self.exam_student_idx.get(exam_id, ()):
+            counts[i * days + day] += delta
+
+    def _student_blocked_days(self, exam_id):
+        """Days on which at least one student of the exam already reached the daily limit"""
+        counts, days, k = self.student_day_counts, self.days, self.max_exams_per_day
+        blocked = set()
+        for i in self.exam_student_idx.get(exam_id, ()):
+            base = i * days
+            for d in range(days):
+                if counts[base + d] >= k:
+                    blocked.add(d)
+            if len(blocked) == days:
+                break
+        return blocked
+
+    def _place_exam(self, exam, mode, slots, preferred_days=()):
+        """Try to place one exam in the first feasible (day, slot). Returns True if placed."""
+        student_count = self.exam_sizes.get(exam.id, 0)
+
+        # Blocked days based on conflict graph
+        # Draft mode ignores student conflicts to show a 'raw' starting state
+        blocked_slots = set()
+        if mode == "draft":
+            blocked_days = set() # Allow same-day conflicts
+        elif self.student_day_counts is not None:
+            # k exams/day allowed: block full days from the counters, never two in the same slot
+            blocked_days = self._student_blocked_days(exam.id)
+            blocked_slots = {self.solution[nid][:2] for nid in self.conflicts.get(exam.id, []) if nid in self.solution}
+        else:
+            blocked_days = {self.solution[nid][0] for nid in self.conflicts.get(exam.id, []) if nid in self.solution}
+
+        valid_rooms = [r for r in self.rooms if r.capacity >= student_count]
+
+        if preferred_days:
+            slots = [s for s in slots if s[0] in preferred_days] + [s for s in slots if s[0] not in preferred_days]
+
+        # Draft: Max 4 supervisions/day. Optimized: Max 2 (more relaxed load).
+        max_daily = MAX_DAILY_SUPERVISIONS[mode]
+
+        for day, slot in slots:
+            if day in blocked_days: continue
+
+            usage_key = (day, slot)
+            if usage_key in blocked_slots: continue
+            if usage_key not in self.room_usage: self.room_usage[usage_key] = set()
+
+            # Room conflict: Never allow two exams in same room/slot
+            selected_room = next((r for r in valid_rooms if r.id not in self.room_usage[usage_key]), None)
+            if not selected_room: continue
+
+            if usage_key not in self.prof_usage: self.prof_usage[usage_key] = set()
+
+            # Declared unavailability: one AND against the professor's slot bitset
+            slot_bit = 1 << (day * self.slots_per_day + slot)
+            unavailable = self.prof_unavailable
+            candidate_profs = [p for p in self.profs if p.id not in self.prof_usage[usage_key] and self.prof_daily_counts.get((day, p.id), 0) < max_daily and not unavailable.get(p.id, 0) & slot_bit]
+
+            if not candidate_profs: continue
+
+            exam_dept_id = exam.module.program.department_id if exam.module and exam.module.program else -1
+            best_p = None
+            best_score = float('inf')
+
+            for p in candidate_profs:
+                score = self.prof_total_counts[p.id]
+                if p.department_id == exam_dept_id: score -= 5
+                if score < best_score:
+                    best_score = score
+                    best_p = p
+
+            selected_prof = best_p
+            if not selected_prof: continue
+
+            self.solution[exam.id] = (day, slot, selected_room.id, selected_prof.id)
+            self.room_usage[usage_key].add(selected_room.id)
+            self.prof_usage[usage_key].add(selected_prof.id)
+            self.prof_daily_counts[(day, selected_prof.id)] = self.prof_daily_counts.get((day, selected_prof.id), 0) + 1
+            self.prof_total_counts[selected_prof.id] += 1
+            if self.student_day_counts is not None:
+                self._bump_students(exam.id, day, 1)
+            return True
+
+        return False
+
+    def _rebuild_usage(self):
+        """Recompute room/prof usage maps from self.solution (used when resuming)"""
+        self.room_usage = {}
+        self.prof_usage = {}
+        self.prof_daily_counts = {}
+        self.prof_total_counts = {p.id: 0 for p in self.profs}
+        counters = self._init_student_counters()
+        for exam_id, (day, slot, room_id, prof_id) in self.solution.items():
+            if counters:
+                self._bump_students(exam_id, day, 1)
+            self.room_usage.setdefault((day, slot), set()).add(room_id)
+            self.prof_usage.setdefault((day, slot), set()).add(prof_id)
+            self.prof_daily_counts[(day, prof_id)] = self.prof_daily_counts.get((day, prof_id), 0) + 1
+            if prof_id in self.prof_total_counts:
+                self.prof_total_counts[prof_id] += 1
+
+    async def _store_checkpoint(self, phase, progress, payload):
+        async with self.session_factory() as session:
+            await checkpoint.save_checkpoint(session, self._checkpoint_job, self._checkpoint_fp, phase, progress, payload)
+
+    def _maybe_checkpoint(self, phase, progress=0, force=False):
+        """
+        Write a checkpoint at most every CHECKPOINT_INTERVAL seconds.
+        Called from the search thread (see run): the write is handed to the event loop,
+        one at a time so that an older write never lands after a newer one.
+        """
+        if self._checkpoint_job is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_checkpoint < checkpoint.CHECKPOINT_INTERVAL:
+            return
+        if self._checkpoint_write is not None and not self._wait_checkpoint(block=force):
+            return # Previous write still running, try again at the next call
+        payload = checkpoint.encode_solution(self.solution)
+        self._checkpoint_write = asyncio.run_coroutine_threadsafe(
+            self._store_checkpoint(phase, progress, payload), self._loop
+        )
+        self._last_checkpoint = now
+        if force:
+            self._wait_checkpoint(block=True)
+
+    def _wait_checkpoint(self, block):
+        """True once the last checkpoint write is over (a failed write is logged, not fatal)"""
+        future = self._checkpoint_write
+        if not block and not future.done():
+            return False
+        try:
+            future.result()
+        except Exception as exc:
+            print(f"Checkpoint write failed: {exc}")
+        self._checkpoint_write = None
+        return True
+
+    async def _instance_fingerprint(self, mode):
+        """Fingerprint of every input the solution depends on (see checkpoint.fingerprint)"""
+        async with self.session_factory() as session:
+            # Order-independent digest of the enrollments: two independent hashes, no big string
+            result = await session.execute(sa.text("""
+                SELECT COUNT(*),
+                       COALESCE(SUM(hashtext(student_id || ':' || module_id)::BIGINT), 0),
+                       COALESCE(SUM(hashtext(module_id || '/' || student_id)::BIGINT), 0)
+                FROM enrollments
+            """))
+            enrollment_digest = tuple(result.fetchone())
+        return checkpoint.fingerprint(
+            mode, self.session_id, self.max_exams_per_day,
+            sorted((e.id, e.module_id) for e in self.exams),
+            sorted((r.id, r.capacity) for r in self.rooms),
+            sorted(p.id for p in self.profs),
+            sorted(self.unavailability, key=lambda u: (u[0], u[1], -1 if u[2] is None else u[2])),
+            enrollment_digest,
+        )
+
+    def _configure_grid(self, mode):
+        """(day, slot) grid of the mode; rooms by capacity, unavailability bitsets"""
+        self.rooms.sort(key=lambda r: r.capacity)
+        
+        # Configuration temporelle : Plus serré pour le draft
+        DAYS = 10 if mode == "draft" else 15
+        SLOTS_PER_DAY = 3 if mode == "draft" else 4
+        slots = [(d, s) for d in range(DAYS) for s in range(SLOTS_PER_DAY)]
+        self.slots = slots
+        self.days = DAYS
+        self.mode = mode
+        self.build_unavailability_bitsets(DAYS, SLOTS_PER_DAY)
+        return slots
+
+    def check_solution(self, mode) -> List[str]:
+        """
+        Hard-constraint violations of self.solution (empty list = valid). Used on a
+        solution reloaded from a checkpoint before it is saved or extended.
+        """
+        self._configure_grid(mode)
+        grid = set(self.slots)
+        exam_ids = {e.id for e in self.exams}
+        capacity = {r.id: r.capacity for r in self.rooms}
+        prof_ids = {p.id for p in self.profs}
+        max_daily = MAX_DAILY_SUPERVISIONS[mode]
+        violations = []
+        rooms_used, profs_used, prof_days = set(), set(), {}
+        for exam_id, (day, slot, room_id, prof_id) in self.solution.items():
+            if exam_id not in exam_ids:
+                violations.append(f"exam {exam_id} no longer exists")
+            if (day, slot) not in grid:
+                violations.append(f"exam {exam_id} outside the grid ({day}, {slot})")
+            if room_id not in capacity or capacity[room_id] < self.exam_sizes.get(exam_id, 0):
+                violations.append(f"exam {exam_id} does not fit room {room_id}")
+            if prof_id not in prof_ids or self.prof_unavailable.get(prof_id, 0) >> (day * self.slots_per_day + slot) & 1:
+                violations.append(f"supervisor {prof_id} unavailable for exam {exam_id}")
+            if (day, slot, room_id) in rooms_used:
+                violations.append(f"room {room_id} used twice at ({day}, {slot})")
+            if (day, slot, prof_id) in profs_used:
+                violations.append(f"supervisor {prof_id} used twice at ({day}, {slot})")
+            rooms_used.add((day, slot, room_id))
+            profs_used.add((day, slot, prof_id))
+            prof_days[(day, prof_id)] = prof_days.get((day, prof_id), 0) + 1
+        violations += [f"supervisor {p} has {n} exams on day {d}" for (d, p), n in prof_days.items() if n > max_daily]
+
+        if mode != "draft":
+            # Same rule as conflict_rows: a clash is a shared slot, or a student above the daily limit
+            clashes = sum(1 for _ in self.conflict_rows())
+            if clashes:
+                violations.append(f"{clashes} student conflicts")
+        return violations
+
+    def initial_solution(self, mode="optimized", resume_state=None):
         """
         Génération constructive avec respect des contraintes.
         Mode 'draft': Heuristique plus rapide, peut laisser quelques conflits si nécessaire.
         Mode 'optimized': Recherche exhaustive pour éliminer tous les conflits.
+        Si reduce_graph() a été appelé, les super-nœuds sont placés en bloc puis
+        les examens retirés (dominés, isolés) sont réinsérés à la fin.
+        resume_state: checkpoint chargé par run(); l'ordre étant déterministe,
+        les examens déjà placés sont simplement sautés.
         """
         print(f"🚀 Lancement de la génération ({mode})...")
         
         start_time = datetime.now()
         TIMEOUT_SECONDS = 30 if mode == "draft" else 60
+        slots = self._configure_grid(mode)
 
         # Tri des examens par difficulté
-        sorted_exams = sorted(self.exams, key=lambda e: len(self.conflicts.get(e.id, [])), reverse=True)
+        if self.super_nodes is not None:
+            exam_by_id = {e.id: e for e in self.exams}
+            sorted_reps = sorted(self.super_nodes, key=lambda r: len(self.conflicts.get(r, [])), reverse=True)
+            sorted_exams = [exam_by_id[m] for r in sorted_reps for m in self.super_nodes[r]]
+            deferred = [(exam_by_id[u], v) for u, v in self.deferred]
+        else:
+            sorted_exams = sorted(self.exams, key=lambda e: len(self.conflicts.get(e.id, [])), reverse=True)
+            deferred = []
         
-        self.rooms.sort(key=lambda r: r.capacity)
-        
-        # Configuration temporelle : Plus serré pour le draft
-        DAYS = 10 if mode == "draft" else 15
-        SLOTS_PER_DAY = 3 if mode == "draft" else 4
-        slots = [(d, s) for d in range(DAYS) for s in range(SLOTS_PER_DAY)]
-        
-        room_usage = {} 
-        prof_usage = {} 
-        prof_daily_counts = {} 
-        prof_total_counts = {p.id: 0 for p in self.profs}
+        if resume_state:
+            self.solution = dict(resume_state["solution"])
+            print(f"♻️ Reprise depuis le checkpoint : {len(self.solution)} examens déjà placés.")
+        self._rebuild_usage()
         
         unassigned = []
-        total_exams = len(sorted_exams)
+        total_exams = len(sorted_exams) + len(deferred)
         
         for idx, exam in enumerate(sorted_exams):
             if (datetime.now() - start_time).total_seconds() > TIMEOUT_SECONDS:
                 print(f"⚠️ Timeout atteint ({TIMEOUT_SECONDS}s).")
                 unassigned.extend([e.id for e in sorted_exams[idx:]])
+                unassigned.extend([e.id for e, _ in deferred])
+                deferred = []
                 break
 
-            assigned = False
-            student_count = len(self.enrollments.get(exam.id, []))
-            
-            # Blocked days based on conflict graph
-            # Draft mode ignores student conflicts to show a 'raw' starting state
-            if mode == "draft":
-                blocked_days = set() # Allow same-day conflicts
-            else:
-                blocked_days = {self.solution[nid][0] for nid in self.conflicts.get(exam.id, []) if nid in self.solution}
-            
-            valid_rooms = [r for r in self.rooms if r.capacity >= student_count]
-
-            for day, slot in slots:
-                if day in blocked_days: continue
-
-                usage_key = (day, slot)
-                if usage_key not in room_usage: room_usage[usage_key] = set()
-                
-                # Room conflict: Never allow two exams in same room/slot
-                selected_room = next((r for r in valid_rooms if r.id not in room_usage[usage_key]), None)
-                if not selected_room: continue
-
-                if usage_key not in prof_usage: prof_usage[usage_key] = set()
-                
-                # Draft: Max 3 supervisions/day. Optimized: Max 2 (more relaxed load).
-                # Actually let's make it consistent or purposeful
-                max_daily = 4 if mode == "draft" else 2 
-                candidate_profs = [p for p in self.profs if p.id not in prof_usage[usage_key] and prof_daily_counts.get((day, p.id), 0) < max_daily]
-
-                if not candidate_profs: continue
-                
-                exam_dept_id = exam.module.program.department_id if exam.module and exam.module.program else -1
-                best_p = None
-                best_score = float('inf')
-                
-                for p in candidate_profs:
-                    score = prof_total_counts[p.id]
-                    if p.department_id == exam_dept_id: score -= 5
-                    if score < best_score:
-                        best_score = score
-                        best_p = p
-                
-                selected_prof = best_p
-                if not selected_prof: continue
-
-                self.solution[exam.id] = (day, slot, selected_room.id, selected_prof.id)
-                room_usage[usage_key].add(selected_room.id)
-                prof_usage[usage_key].add(selected_prof.id)
-                prof_daily_counts[(day, selected_prof.id)] = prof_daily_counts.get((day, selected_prof.id), 0) + 1
-                prof_total_counts[selected_prof.id] += 1
-                assigned = True
-                break
-            
-            if not assigned:
+            if exam.id in self.solution:
+                continue
+
+            if not self._place_exam(exam, mode, slots):
                 unassigned.append(exam.id)
             
             if idx % 50 == 0:
                 print(f"⌛ Progression : {idx}/{total_exams}...")
+            self._maybe_checkpoint("construct", idx)
+
+        # Expansion de la réduction : dominés sur le jour de leur dominant, puis isolés
+        for exam, dominator_id in deferred:
+            if exam.id in self.solution:
+                continue
+            self._maybe_checkpoint("deferred")
+            preferred = (self.solution[dominator_id][0],) if dominator_id in self.solution else ()
+            if not self._place_exam(exam, mode, slots, preferred_days=preferred):
+                unassigned.append(exam.id)
 
         print(f"✅ Terminé. Non-assignés : {len(unassigned)}/{total_exams}")
         return len(unassigned) == 0
 
-    def optimize(self):
+    def _neighbour_weights(self, exam_id) -> Dict[int, int]:
+        """exam_id -> {conflicting exam_id: shared students}, for both graph backends"""
+        if isinstance(self.conflicts, dict):
+            return self.conflicts.get(exam_id, {})
+        return self.conflicts.weights(exam_id)
+
+    @staticmethod
+    def _proximity(gap):
+        gap = abs(gap)
+        return PROXIMITY_COST[gap] if gap < len(PROXIMITY_COST) else 0
+
+    def spread_cost(self):
         """
-        Since Greedy already handles hard constraints, this step would maximize soft constraints.
-        For now, we rely on the heuristic inside initial_solution (e.g. Dept priority).
+        Student spread objective (Carter proximity cost): every pair of conflicting
+        exams costs shared_students * 2^(5 - gap) when they are gap <= 5 days apart.
         """
-        pass
+        total = 0
+        for exam_id, (day, _, _, _) in self.solution.items():
+            for nid, weight in self._neighbour_weights(exam_id).items():
+                if nid > exam_id and nid in self.solution:
+                    total += weight * self._proximity(day - self.solution[nid][0])
+        return total
+
+    def optimize(self, mode="optimized"):
+        """
+        Local search on the student spread objective (see spread_cost).
+        Each exam may move to another (day, slot) that keeps every hard constraint
+        (no same-day clash, free room, same supervisor still available). The delta
+        is computed from the exam's weighted neighbourhood only, so evaluating a
+        move costs O(degree), never O(students).
+        """
+        if not self.solution:
+            return
+        print(f"📈 Optimisation de l'étalement (coût initial : {self.spread_cost()})...")
+        start_time = datetime.now()
+        TIMEOUT_SECONDS = 30
+        MAX_PASSES = 10
+        max_daily = MAX_DAILY_SUPERVISIONS[mode]
+        slots_by_day = {}
+        for day, slot in self.slots:
+            slots_by_day.setdefault(day, []).append(slot)
+
+        order = sorted(self.solution, key=lambda e: len(self._neighbour_weights(e)), reverse=True)
+        for pass_idx in range(MAX_PASSES):
+            improved = 0
+            for exam_id in order:
+                if (datetime.now() - start_time).total_seconds() > TIMEOUT_SECONDS:
+                    print(f"⚠️ Timeout de l'optimisation atteint ({TIMEOUT_SECONDS}s).")
+                    return
+                if self._improve_exam(exam_id, mode, slots_by_day, max_daily):
+                    improved += 1
+                self._maybe_checkpoint("optimize", pass_idx)
+            print(f"⌛ Passe {pass_idx + 1} : {improved} examens déplacés.")
+            if not improved:
+                break
+        print(f"✅ Coût d'étalement final : {self.spread_cost()}")
+
+    def _improve_exam(self, exam_id, mode, slots_by_day, max_daily):
+        """Move one exam to the best feasible day for the spread objective. Returns True if moved."""
+        day, slot, room_id, prof_id = self.solution[exam_id]
+
+        # Weighted histogram of the neighbours' days: O(degree)
+        neighbour_days = {}
+        for nid, weight in self._neighbour_weights(exam_id).items():
+            placed = self.solution.get(nid)
+            if placed:
+                neighbour_days[placed[0]] = neighbour_days.get(placed[0], 0) + weight
+
+        def day_cost(d):
+            return sum(w * self._proximity(d - nd) for nd, w in neighbour_days.items())
+
+        current = day_cost(day)
+        if current == 0:
+            return False
+        use_counters = self.student_day_counts is not None
+        if use_counters:
+            blocked_days = self._student_blocked_days(exam_id)
+            neighbour_slots = {self.solution[nid][:2] for nid in self._neighbour_weights(exam_id) if nid in self.solution}
+        elif mode != "draft":
+            blocked_days = set(neighbour_days)
+        else:
+            blocked_days = set()
+        candidates = []
+        for d in range(self.days):
+            if d == day or d in blocked_days:
+                continue
+            cost = day_cost(d)
+            if cost < current:
+                candidates.append((cost, d))
+        candidates.sort()
+
+        capacity_needed = self.exam_sizes.get(exam_id, 0)
+        unavailable = self.prof_unavailable.get(prof_id, 0)
+        for _, d in candidates:
+            if self.prof_daily_counts.get((d, prof_id), 0) >= max_daily:
+                continue
+            for s in slots_by_day.get(d, []):
+                key = (d, s)
+                if use_counters and key in neighbour_slots:
+                    continue
+                if prof_id in self.prof_usage.get(key, ()) or unavailable & (1 << (d * self.slots_per_day + s)):
+                    continue
+                used = self.room_usage.get(key, set())
+                room = next((r for r in self.rooms if r.capacity >= capacity_needed and r.id not in used), None)
+                if not room:
+                    continue
+
+                # Apply the move
+                self.room_usage[(day, slot)].discard(room_id)
+                self.prof_usage[(day, slot)].discard(prof_id)
+                self.prof_daily_counts[(day, prof_id)] -= 1
+                self.room_usage.setdefault(key, set()).add(room.id)
+                self.prof_usage.setdefault(key, set()).add(prof_id)
+                self.prof_daily_counts[(d, prof_id)] = self.prof_daily_counts.get((d, prof_id), 0) + 1
+                self.solution[exam_id] = (d, s, room.id, prof_id)
+                if use_counters:
+                    self._bump_students(exam_id, day, -1)
+                    self._bump_students(exam_id, d, 1)
+                return True
+        return False
+
+    def unused_seats(self):
+        """Total empty seats over all scheduled exams"""
+        capacity = {r.id: r.capacity for r in self.rooms}
+        return sum(capacity[room_id] - self.exam_sizes.get(exam_id, 0)
+                   for exam_id, (_, _, room_id, _) in self.solution.items() if room_id in capacity)
+
+    def rebalance_rooms(self):
+        """
+        Post-pass: re-solve room assignment inside each slot to minimise unused seats.
+        An exam fits every room at least as large as its roster, so the feasibility
+        graph is nested; for such bipartite graphs, taking exams by decreasing size
+        and giving each the smallest free room that fits yields a minimum-waste
+        perfect matching. O(n log n) per slot, from in-memory data only.
+        """
+        if not self.solution:
+            return
+        before = self.unused_seats()
+        rooms = sorted(self.rooms, key=lambda r: r.capacity)
+        by_slot = {}
+        for exam_id, (day, slot, _, _) in self.solution.items():
+            by_slot.setdefault((day, slot), []).append(exam_id)
+
+        for key, exam_ids in by_slot.items():
+            exam_ids.sort(key=lambda e: self.exam_sizes.get(e, 0), reverse=True)
+            free_caps = [r.capacity for r in rooms]
+            free_rooms = list(rooms)
+            assignment = {}
+            for exam_id in exam_ids:
+                i = bisect.bisect_left(free_caps, self.exam_sizes.get(exam_id, 0))
+                if i == len(free_rooms):
+                    assignment = None # Should not happen: the current assignment is feasible
+                    break
+                free_caps.pop(i)
+                assignment[exam_id] = free_rooms.pop(i).id
+            if not assignment:
+                continue
+            for exam_id, room_id in assignment.items():
+                day, slot, _, prof_id = self.solution[exam_id]
+                self.solution[exam_id] = (day, slot, room_id, prof_id)
+            self.room_usage[key] = set(assignment.values())
+
+        print(f"🏫 Réaffectation des salles : {before} -> {self.unused_seats()} places inutilisées.")
 
     async def save_results(self):
-        """Bulk insert timetable entries"""
+        """
+        Bulk insert the solution as a new, unpublished generation of the target session.
+        Readers keep seeing the published one until publish() flips the pointer.
+        """
         print("Saving results to database...")
         entries = []
         
-        # Start Date: June 1st 2026
-        start_date = datetime(2026, 6, 1, 8, 30)
-        
-        # Slot definitions (Offsets in minutes from 8:30)
-        slot_offsets = [0, 120, 300, 420]
-        
         for exam_id, (day, slot_idx, room_id, prof_id) in self.solution.items():
-            current_day = start_date + timedelta(days=day)
-            slot_time = current_day + timedelta(minutes=slot_offsets[slot_idx])
+            current_day = self.session_start + timedelta(days=day)
+            slot_time = current_day + timedelta(minutes=SLOT_OFFSETS[slot_idx])
             end_time = slot_time + timedelta(minutes=90)
             
             entries.append({
+                "session_id": self.session_id,
+                "generation": None,
                 "exam_id": exam_id,
                 "room_id": room_id,
                 "supervisor_id": prof_id,
@@ -216,18 +906,150 @@ class OptimizationEngine:
         if not entries:
             print("No entries to save.")
             return
+        # Written in time order: keeps the start_time BRIN ranges of the partition narrow
+        entries.sort(key=lambda entry: (entry["start_time"], entry["exam_id"]))
 
         async with self.session_factory() as session:
-            await session.execute(sa.text("TRUNCATE TABLE timetable_entries RESTART IDENTITY CASCADE"))
-            stmt = sa.insert(TimetableEntry)
-            await session.execute(stmt, entries)
+            # Shadow generation: plain inserts, no lock held against readers of the live timetable
+            self.generation = await generations.next_generation(session)
+            for entry in entries:
+                entry["generation"] = self.generation
+            await session.execute(sa.insert(TimetableGeneration), entries)
+            # Same-day clashes are known from the graph: persist them with the generation
+            conflict_count = await copy_rows(
+                session, "timetable_conflicts", TIMETABLE_CONFLICT_COLUMNS, self.conflict_rows()
+            )
+            schedule = await session.execute(
+                sa.text(STUDENT_SCHEDULE_SQL), {"sid": self.session_id, "gen": self.generation}
+            )
             await session.commit()
-            print(f"Saved {len(entries)} timetable entries.")
+            print(f"Student schedules: {schedule.rowcount} rows.")
+            print(f"Saved {len(entries)} timetable entries and {conflict_count} same-day conflicts "
+                  f"(generation {self.generation}, not yet published).")
+
+    def conflict_rows(self):
+        """
+        timetable_conflicts rows of the current solution: same-day pairs of conflicting exams
+        that break the student rules, i.e. placed in the same slot, or on a day where some of
+        their shared students sit more than max_exams_per_day exams. shared_students counts
+        the students in violation (all the shared ones for a slot clash or with k = 1).
+        """
+        keys = {}
+        for exam in self.exams:
+            program = exam.module.program if exam.module else None
+            keys[exam.id] = (program.id, program.department_id) if program else (None, None)
 
-    async def run(self, mode="optimized"):
-        await self.load_data()
-        self.build_conflict_graph()
-        self.initial_solution(mode=mode)
+        # Exams per (student, day), only needed when several exams a day are allowed
+        k = self.max_exams_per_day
+        day_counts = None
+        if k > 1 and self.enrollments:
+            day_counts = {}
+            for exam_id, placement in self.solution.items():
+                for sid in self.enrollments.get(exam_id, ()):
+                    key = (sid, placement[0])
+                    day_counts[key] = day_counts.get(key, 0) + 1
+
+        for exam_id, placement in self.solution.items():
+            day = placement[0]
+            for nid, weight in self._neighbour_weights(exam_id).items():
+                if nid > exam_id and nid in self.solution and self.solution[nid][0] == day:
+                    if day_counts is not None and self.solution[nid][1] != placement[1]:
+                        shared = self.enrollments.get(exam_id, set()) & self.enrollments.get(nid, set())
+                        weight = sum(1 for sid in shared if day_counts[(sid, day)] > k)
+                        if not weight:
+                            continue
+                    yield (
+                        self.session_id, self.generation, exam_id, nid, weight,
+                        (self.session_start + timedelta(days=day)).date(),
+                        *keys.get(exam_id, (None, None)), *keys.get(nid, (None, None)),
+                    )
+
+    async def publish(self):
+        """Make the saved generation the live timetable of the session (atomic pointer flip)"""
+        if self.generation is None:
+            return
+        async with self.session_factory() as session:
+            await generations.publish_generation(session, self.session_id, self.generation)
+            await session.commit()
+            await bump_version(session)
+        print(f"Published generation {self.generation} for session {self.session_id}.")
+        await refresh_dashboard_views(self.session_factory)
+
+    def release_graph(self):
+        """Close the memory-mapped CSR graph and remove its temp directory (no-op for the dict graph)"""
+        if hasattr(self.conflicts, "close"):
+            self.conflicts.close()
+            self.conflicts = {}
+        if self._graph_dir:
+            shutil.rmtree(self._graph_dir, ignore_errors=True)
+            self._graph_dir = None
+
+    def _solve(self, mode, resume_state):
+        self.initial_solution(mode=mode, resume_state=resume_state)
         if mode == "optimized":
-            self.optimize()
+            self.optimize(mode=mode)
+        self.rebalance_rooms()
+        self._maybe_checkpoint("solved", force=True)
+
+    async def run(self, mode="optimized", resume=False, job_id=None, seating=True):
+        """
+        Full pipeline. The solution is checkpointed periodically under job_id
+        (defaults to mode + session); with resume=True a matching checkpoint is reloaded
+        and the search continues from it instead of starting over.
+        seating=True generates the seat-level plan once the timetable is saved.
+        The new generation (timetable + seats) is published only once complete;
+        superseded generations are left to generations.collect_generations.
+        """
+        try:
+            await self.load_data()
+            # One run per session at a time, up to the publish (GenerationLocked otherwise)
+            async with generations.session_run_lock(self.session_factory, self.session_id):
+                await self._run_locked(mode, resume, job_id, seating)
+        finally:
+            # Also on failure: the mmap and the on-disk graph are large by design
+            self.release_graph()
+
+    async def _run_locked(self, mode, resume, job_id, seating):
+        """run() once the session lock is held: graph, search, save, seating, publish"""
+        if self.graph_source == "sql":
+            await self.build_conflict_graph_sql()
+        elif self.out_of_core:
+            await self.build_conflict_graph_chunked()
+        else:
+            self.build_conflict_graph()
+        if self.enrollment_hashes:
+            await self.load_candidate_students()
+        self.reduce_graph()
+
+        self._checkpoint_job = job_id or f"{mode}_s{self.session_id}"
+        self._checkpoint_fp = await self._instance_fingerprint(mode)
+        resume_state = None
+        if resume:
+            async with self.session_factory() as session:
+                resume_state = await checkpoint.load_checkpoint(session, self._checkpoint_job, self._checkpoint_fp)
+        if resume_state:
+            # The fingerprint can't see everything (e.g. a hash collision): re-check before reuse
+            self.solution = dict(resume_state["solution"])
+            violations = self.check_solution(mode)
+            self.solution = {}
+            if violations:
+                print(f"Ignoring checkpoint {self._checkpoint_job}: {len(violations)} violations "
+                      f"({'; '.join(violations[:3])})")
+                resume_state = None
+
+        if resume_state and resume_state["phase"] == "solved":
+            print("♻️ Checkpoint already solved, saving it directly.")
+            self.solution = resume_state["solution"]
+        else:
+            # CPU-bound search in a worker thread: the event loop stays free for the API
+            # and for the checkpoint writes handed over by _maybe_checkpoint
+            self._loop = asyncio.get_running_loop()
+            await asyncio.to_thread(self._solve, mode, resume_state)
+        # The CSR graph (out-of-core / sql modes) is closed at the end of run()
+        self.final_spread_cost = self.spread_cost()
         await self.save_results()
+        async with self.session_factory() as session:
+            await checkpoint.clear_checkpoint(session, self._checkpoint_job)
+        if seating and self.generation is not None:
+            await generate_seating_plan(self.session_factory, self.session_id, self.generation)
+        await self.publish()
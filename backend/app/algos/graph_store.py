@@ -0,0 +1,206 @@
+"""
+Out-of-core storage for the exam conflict graph.
+
+Pair counts are aggregated in a bounded in-memory buffer, spilled to sorted
+run files when the buffer reaches the memory ceiling, then k-way merged into
+a memory-mapped CSR file (offsets / neighbours / weights).
+"""
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Rough cost of one entry in the pair-count dict (int key + int value + slot)
+BYTES_PER_PAIR = 120
+# Records are (row, col, weight) int32 triplets
+RECORD = struct.Struct("<iii")
+READ_BUFFER = RECORD.size * 8192
+HEADER = struct.Struct("<qq")  # n, nnz
+
+
+class CSRGraphBuilder:
+    """Accumulates weighted exam-pair edges with a bounded memory footprint."""
+
+    def __init__(self, exam_ids: List[int], memory_limit_mb: int = 64, workdir: str = None):
+        self.exam_ids = exam_ids
+        self.n = len(exam_ids)
+        self.max_pairs = max(1024, memory_limit_mb * 1024 * 1024 // BYTES_PER_PAIR)
+        self.workdir = workdir or tempfile.mkdtemp(prefix="conflicts_")
+        self.counts: Dict[int, int] = {}  # row * n + col -> shared students
+        self.runs: List[str] = []
+
+    def add_clique(self, exam_idx: List[int]):
+        """Register one student: every pair of their exams gets +1 (both directions)."""
+        counts = self.counts
+        n = self.n
+        for i in range(len(exam_idx)):
+            u = exam_idx[i]
+            for j in range(i + 1, len(exam_idx)):
+                v = exam_idx[j]
+                if u == v:
+                    continue
+                counts[u * n + v] = counts.get(u * n + v, 0) + 1
+                counts[v * n + u] = counts.get(v * n + u, 0) + 1
+        if len(counts) >= self.max_pairs:
+            self._spill()
+
+    def add_edge(self, u: int, v: int, weight: int):
+        """Register an already aggregated undirected edge (both directions)."""
+        for key in (u * self.n + v, v * self.n + u):
+            self.counts[key] = self.counts.get(key, 0) + weight
+        if len(self.counts) >= self.max_pairs:
+            self._spill()
+
+    def _spill(self):
+        if not self.counts:
+            return
+        path = os.path.join(self.workdir, f"run_{len(self.runs)}.bin")
+        buf = array("i")
+        n = self.n
+        for key in sorted(self.counts):
+            buf.extend((key // n, key % n, self.counts[key]))
+        with open(path, "wb") as f:
+            buf.tofile(f)
+        self.runs.append(path)
+        self.counts = {}
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Tuple[int, int, int]]:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(READ_BUFFER)
+                if not chunk:
+                    break
+                yield from RECORD.iter_unpack(chunk)
+
+    def _merged(self) -> Iterator[Tuple[int, int, int]]:
+        """Merge all sorted runs, summing weights of identical (row, col) keys."""
+        current = None
+        weight = 0
+        for u, v, w in heapq.merge(*(self._read_run(p) for p in self.runs)):
+            if (u, v) != current:
+                if current is not None:
+                    yield current[0], current[1], weight
+                current = (u, v)
+                weight = 0
+            weight += w
+        if current is not None:
+            yield current[0], current[1], weight
+
+    def finalize(self, path: str = None) -> "CSRConflictGraph":
+        """Merge runs into a single CSR file and return a memory-mapped view of it."""
+        self._spill()
+        path = path or os.path.join(self.workdir, "conflicts.csr")
+        cols_path = path + ".cols"
+        weights_path = path + ".weights"
+
+        offsets = array("q", [0] * (self.n + 1))
+        nnz = 0
+        cols = array("i")
+        weights = array("i")
+        with open(cols_path, "wb") as fc, open(weights_path, "wb") as fw:
+            for u, v, w in self._merged():
+                offsets[u + 1] += 1
+                cols.append(v)
+                weights.append(w)
+                nnz += 1
+                if len(cols) >= 65536:
+                    cols.tofile(fc)
+                    weights.tofile(fw)
+                    cols = array("i")
+                    weights = array("i")
+            cols.tofile(fc)
+            weights.tofile(fw)
+        for i in range(self.n):
+            offsets[i + 1] += offsets[i]
+
+        with open(path, "wb") as out:
+            out.write(HEADER.pack(self.n, nnz))
+            array("i", self.exam_ids).tofile(out)
+            offsets.tofile(out)
+            for part in (cols_path, weights_path):
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+                os.remove(part)
+
+        for run in self.runs:
+            os.remove(run)
+        self.runs = []
+        return CSRConflictGraph(path)
+
+
+class CSRConflictGraph:
+    """
+    Read-only, memory-mapped conflict graph.
+    Exposes the same mapping interface the engine uses on the in-memory
+    graph (exam_id -> conflicting exam_ids), plus per-edge weights.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        n, nnz = HEADER.unpack_from(self._mm, 0)
+        view = self._view = memoryview(self._mm)
+        pos = HEADER.size
+        self.exam_ids = view[pos:pos + 4 * n].cast("i")
+        pos += 4 * n
+        self.offsets = view[pos:pos + 8 * (n + 1)].cast("q")
+        pos += 8 * (n + 1)
+        self.cols = view[pos:pos + 4 * nnz].cast("i")
+        pos += 4 * nnz
+        self.weights_view = view[pos:pos + 4 * nnz].cast("i")
+        self.n = n
+        self.nnz = nnz
+        self.index = {eid: i for i, eid in enumerate(self.exam_ids)}
+
+    def get(self, exam_id: int, default=()):
+        i = self.index.get(exam_id)
+        if i is None:
+            return default
+        ids = self.exam_ids
+        return [ids[j] for j in self.cols[self.offsets[i]:self.offsets[i + 1]]]
+
+    def __getitem__(self, exam_id: int) -> List[int]:
+        if exam_id not in self.index:
+            raise KeyError(exam_id)
+        return self.get(exam_id)
+
+    def __contains__(self, exam_id: int) -> bool:
+        return exam_id in self.index
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.exam_ids)
+
+    def keys(self) -> Iterable[int]:
+        return list(self.exam_ids)
+
+    def items(self) -> Iterator[Tuple[int, List[int]]]:
+        for exam_id in self.exam_ids:
+            yield exam_id, self.get(exam_id)
+
+    def degree(self, exam_id: int) -> int:
+        i = self.index.get(exam_id)
+        return 0 if i is None else self.offsets[i + 1] - self.offsets[i]
+
+    def weights(self, exam_id: int) -> Dict[int, int]:
+        """exam_id -> {conflicting exam_id: shared student count}"""
+        i = self.index.get(exam_id)
+        if i is None:
+            return {}
+        a, b = self.offsets[i], self.offsets[i + 1]
+        ids = self.exam_ids
+        return {ids[j]: w for j, w in zip(self.cols[a:b], self.weights_view[a:b])}
+
+    def close(self):
+        for view in (self.exam_ids, self.offsets, self.cols, self.weights_view, self._view):
+            view.release()
+        self._mm.close()
+        self._file.close()
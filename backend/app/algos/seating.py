@@ -0,0 +1,89 @@
+"""
+Seating plan stage, run after save_results.
+Every enrolled student gets a seat index in the room of their exam. Students
+are streamed exam by exam (sorted server-side), so only one exam's roster is
+held in memory, and the plan is bulk-written with COPY.
+"""
+from itertools import chain, repeat, zip_longest
+from typing import Dict, Iterator, List, Tuple
+import time
+import sqlalchemy as sa
+from app.db.bulk import copy_rows
+
+SEATING_COLUMNS = ("session_id", "generation", "exam_id", "student_id", "room_id", "seat_index")
+STREAM_CHUNK = 20000
+
+
+def interleave_programs(groups: List[List[int]]) -> List[int]:
+    """
+    Round-robin over program groups (largest first) so that neighbouring
+    seats belong to different programs for as long as possible.
+    """
+    groups = sorted(groups, key=len, reverse=True)
+    # Column-wise read of the groups, the padding of the shorter ones dropped
+    return [sid for sid in chain.from_iterable(zip_longest(*groups)) if sid is not None]
+
+
+def seat_exam(key: Tuple[int, int], exam_id: int, room_id: int, by_program: Dict[int, List[int]], alternate_programs: bool) -> Iterator[Tuple[int, int, int, int, int, int]]:
+    if alternate_programs and len(by_program) > 1:
+        students = interleave_programs(list(by_program.values()))
+    else:
+        students = list(chain.from_iterable(by_program.values()))
+    session_id, generation = key
+    return zip(repeat(session_id), repeat(generation), repeat(exam_id), students, repeat(room_id), range(len(students)))
+
+
+async def _seat_rows(result, key: Tuple[int, int], alternate_programs: bool):
+    """Group the streamed (exam, room, program, student) rows by exam and yield seat rows"""
+    current = None
+    by_program: Dict[int, List[int]] = {}
+    async for chunk in result.partitions(STREAM_CHUNK):
+        for exam_id, room_id, program_id, student_id in chunk:
+            if (exam_id, room_id) != current:
+                if current is not None:
+                    for row in seat_exam(key, current[0], current[1], by_program, alternate_programs):
+                        yield row
+                current = (exam_id, room_id)
+                by_program = {}
+            by_program.setdefault(program_id, []).append(student_id)
+    if current is not None:
+        for row in seat_exam(key, current[0], current[1], by_program, alternate_programs):
+            yield row
+
+
+async def generate_seating_plan(session_factory, session_id: int, generation: int, alternate_programs: bool = True) -> int:
+    """Rebuild seat_assignments for one timetable generation. Returns the number of seats assigned."""
+    print("Generating seating plan...")
+    start = time.time()
+    query = """
+        SELECT t.exam_id, t.room_id, s.program_id, en.student_id
+        FROM timetable_generations t
+        JOIN exams e ON t.exam_id = e.id
+        JOIN enrollments en ON en.module_id = e.module_id
+        JOIN students s ON s.id = en.student_id
+        WHERE t.session_id = :sid AND t.generation = :gen
+        ORDER BY t.exam_id, s.program_id, en.student_id
+    """
+
+    # Reading and COPY need separate connections: the read side is a server-side cursor
+    async with session_factory() as read_session, session_factory() as write_session:
+        result = await read_session.stream(
+            sa.text(query).execution_options(yield_per=STREAM_CHUNK), {"sid": session_id, "gen": generation}
+        )
+        await write_session.execute(
+            sa.text("DELETE FROM seat_assignments WHERE session_id = :sid AND generation = :gen"),
+            {"sid": session_id, "gen": generation},
+        )
+        batch = []
+        written = 0
+        async for row in _seat_rows(result, (session_id, generation), alternate_programs):
+            batch.append(row)
+            if len(batch) >= STREAM_CHUNK:
+                written += await copy_rows(write_session, "seat_assignments", SEATING_COLUMNS, batch)
+                batch = []
+        if batch:
+            written += await copy_rows(write_session, "seat_assignments", SEATING_COLUMNS, batch)
+        await write_session.commit()
+
+    print(f"Seating plan: {written} seats assigned in {time.time() - start:.2f}s.")
+    return written
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import login, timetable, optimization, stats, manage, workflow
+from app.api.api_v1.endpoints import login, timetable, optimization, stats, manage, workflow, feeds, exports, documents, availability
 
 api_router = APIRouter()
 api_router.include_router(login.router, tags=["login"])
@@ -8,3 +8,7 @@ api_router.include_router(optimization.router, prefix="/optimize", tags=["optimi
 api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
 api_router.include_router(manage.router, prefix="/manage", tags=["management"])
 api_router.include_router(workflow.router, prefix="/workflow", tags=["workflow"])
+api_router.include_router(feeds.router, prefix="/feeds", tags=["feeds"])
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
+api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
+api_router.include_router(availability.router, prefix="/availability", tags=["availability"])
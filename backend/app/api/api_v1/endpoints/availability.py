@@ -0,0 +1,97 @@
+from typing import Any, List, Optional, Tuple
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.api import deps
+from app.algos.engine import SLOT_OFFSETS
+from app.db.availability import get_index, slot_bounds
+from app.models.all_models import User
+
+router = APIRouter()
+
+# Slots per batch query
+MAX_BATCH_SLOTS = 64
+
+
+def _parse_slots(at: List[str]) -> List[Tuple[date, int]]:
+    """at=YYYY-MM-DD:slot (slot = 0-based index of the day's exam slots, as in professor_unavailability)"""
+    if not at:
+        raise HTTPException(status_code=400, detail="Give at least one at=YYYY-MM-DD:slot")
+    if len(at) > MAX_BATCH_SLOTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SLOTS} slots per query")
+    slots = []
+    for value in at:
+        try:
+            day, slot = value.rsplit(":", 1)
+            day, slot = date.fromisoformat(day), int(slot)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid slot '{value}', expected YYYY-MM-DD:slot")
+        if not 0 <= slot < len(SLOT_OFFSETS):
+            raise HTTPException(status_code=400, detail=f"Slot must be between 0 and {len(SLOT_OFFSETS) - 1}")
+        slots.append((day, slot))
+    return slots
+
+
+def _check_staff(current_user: User):
+    if current_user.role == 'student':
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+
+def _answer(index, slots, free_mask, describe, common: bool) -> dict:
+    answer = {"version": index.version, "slots": []}
+    all_free = None
+    for day, slot in slots:
+        mask = free_mask(day, slot)
+        all_free = mask if all_free is None else all_free & mask
+        answer["slots"].append({
+            "date": day,
+            "slot": slot,
+            "start_time": slot_bounds(day, slot)[0],
+            "free": describe(mask),
+        })
+    if common:
+        # Free in every requested slot (e.g. a room for a multi-slot exam)
+        answer["common"] = describe(all_free or 0)
+    return answer
+
+
+@router.get("/rooms", response_model=dict)
+async def free_rooms(
+    at: List[str] = Query([]),
+    min_capacity: int = 0,
+    common: bool = False,
+    session_id: int = Depends(deps.get_exam_session_id),
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Rooms free in the published timetable, largest first.
+    Batch: repeat at=YYYY-MM-DD:slot; min_capacity filters on seats;
+    common=true also returns the rooms free in all the requested slots.
+    """
+    _check_staff(current_user)
+    slots = _parse_slots(at)
+    index = await get_index(db, session_id)
+    return _answer(index, slots, lambda day, slot: index.free_rooms(day, slot, min_capacity), index.rooms, common)
+
+
+@router.get("/supervisors", response_model=dict)
+async def free_supervisors(
+    at: List[str] = Query([]),
+    department_id: Optional[int] = None,
+    common: bool = False,
+    session_id: int = Depends(deps.get_exam_session_id),
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Professors neither supervising nor declared unavailable, per slot.
+    Same batch parameters as /availability/rooms; heads only see their own department.
+    """
+    _check_staff(current_user)
+    if current_user.role == 'head' and current_user.professor_profile:
+        department_id = current_user.professor_profile.department_id
+    slots = _parse_slots(at)
+    index = await get_index(db, session_id)
+    return _answer(
+        index, slots, lambda day, slot: index.free_supervisors(day, slot, department_id), index.supervisors, common
+    )
@@ -0,0 +1,92 @@
+from typing import Any, List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.api import deps
+from app.db import documents
+from app.db.session import AsyncSessionLocal
+from app.models.all_models import User
+
+router = APIRouter()
+
+DOCUMENT_ROLES = ['admin', 'dean', 'vice_dean']
+
+
+def _check_role(current_user: User):
+    if current_user.role not in DOCUMENT_ROLES:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+
+async def _get_job(db, job_id: str) -> dict:
+    job = await documents.read_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Document job not found")
+    return job
+
+
+@router.post("/jobs", response_model=dict)
+async def start_document_job(
+    background_tasks: BackgroundTasks,
+    kinds: List[str] = Query(list(documents.DOCUMENT_KINDS)),
+    session_id: int = Depends(deps.get_exam_session_id),
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Render the door sheets (kinds=rooms) and/or student convocations (kinds=convocations)
+    of the published timetable as PDFs, in the background.
+    Poll GET /documents/jobs/{job_id}, then download /documents/jobs/{job_id}/bundle.zip.
+    """
+    _check_role(current_user)
+    unknown = [kind for kind in kinds if kind not in documents.DOCUMENT_KINDS]
+    if unknown or not kinds:
+        raise HTTPException(status_code=400, detail=f"kinds must be among {documents.DOCUMENT_KINDS}")
+    job = await documents.create_job(db, session_id, kinds)
+    background_tasks.add_task(documents.run_document_job, AsyncSessionLocal, job["job_id"])
+    print(f"[DOCUMENTS] Job {job['job_id']} ({', '.join(kinds)}) started by {current_user.email}")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def read_document_job(
+    job_id: str,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Progress of a document job: status (queued, running, done, failed), done / total documents"""
+    _check_role(current_user)
+    job = await _get_job(db, job_id)
+    job["progress"] = round(job["done"] / job["total"], 3) if job["total"] else None
+    return job
+
+
+@router.get("/jobs/{job_id}/bundle.zip")
+async def download_document_bundle(
+    job_id: str,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Zip of all the PDFs of a finished job, streamed as it is built"""
+    _check_role(current_user)
+    job = await _get_job(db, job_id)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return StreamingResponse(
+        documents.iter_bundle(AsyncSessionLocal, job_id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="documents_s{job["session_id"]}.zip"'},
+    )
+
+
+@router.delete("/jobs/{job_id}", response_model=dict)
+async def delete_document_job(
+    job_id: str,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Remove a job and its files"""
+    _check_role(current_user)
+    job = await _get_job(db, job_id)
+    if job["status"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail="Job is still running")
+    await documents.delete_job(db, job_id)
+    return {"message": f"Job {job_id} deleted"}
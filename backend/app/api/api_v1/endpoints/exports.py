@@ -0,0 +1,62 @@
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.api import deps
+from app.db.exports import EXPORTS, EXPORT_FILTERS, MEDIA_TYPES, SESSION_EXPORTS, export_filename, stream_export
+from app.db.session import AsyncSessionLocal
+from app.models.all_models import User
+
+router = APIRouter()
+
+EXPORT_ROLES = ['admin', 'dean', 'vice_dean', 'head']
+
+
+async def _stream(name: str, fmt: str, params: dict):
+    # Own connection: the response body outlives the request's dependencies
+    async with AsyncSessionLocal() as session:
+        async for data in stream_export(session, name, fmt, params):
+            yield data
+
+
+@router.get("/{name}.{fmt}")
+async def export(
+    name: str,
+    fmt: str,
+    department_id: Optional[int] = None,
+    program_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    session_id: int = Depends(deps.get_exam_session_id),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Streaming export: timetable, students, professors or rooms (room sheets), as .csv or .xlsx.
+    Filters: department_id, program_id (timetable, students), room_id (rooms).
+    Heads of department only get their own department.
+    """
+    if name not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export, expected one of {tuple(EXPORTS)}")
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Format must be csv or xlsx")
+    if current_user.role not in EXPORT_ROLES:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    if current_user.role == 'head':
+        profile = current_user.professor_profile
+        if not profile or (department_id is not None and department_id != profile.department_id):
+            raise HTTPException(status_code=403, detail="You can only export your own department")
+        department_id = profile.department_id
+
+    params = {"department_id": department_id, "program_id": program_id, "room_id": room_id}
+    unsupported = [key for key, value in params.items()
+                   if value is not None and key not in EXPORT_FILTERS[name]]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Filter not supported by this export: {unsupported[0]}")
+    if name in SESSION_EXPORTS:
+        params["session_id"] = session_id
+
+    filename = export_filename(name, fmt, session_id)
+    return StreamingResponse(
+        _stream(name, fmt, params),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
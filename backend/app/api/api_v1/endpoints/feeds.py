@@ -0,0 +1,139 @@
+"""
+iCalendar feeds (.ics) of exams per student, supervisor and room.
+
+Feed URLs carry an HMAC token instead of a JWT so calendar apps can poll them.
+A feed is streamed from a server-side cursor the first time it is requested for a
+timetable version, then served from the response cache: with the memoized version,
+a cache hit (or a 304) does not touch the database.
+"""
+from typing import Any
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+import sqlalchemy as sa
+from app.api import deps
+from app.core import cache, ical
+from app.db.session import AsyncSessionLocal
+from app.models.all_models import User
+
+router = APIRouter()
+
+FEED_CHUNK = 500
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+
+# Published generation of the current session
+CURRENT_ENTRIES = """
+    SELECT t.* FROM timetable_entries t
+    WHERE t.session_id = (SELECT id FROM exam_sessions WHERE is_current)
+"""
+
+FEED_QUERIES = {
+    "student": """
+        SELECT sc.exam_id, sc.module_name, sc.start_time, sc.end_time, sc.room_name
+        FROM student_exam_schedule sc
+        JOIN exam_sessions s ON s.id = sc.session_id AND s.is_current AND sc.generation = s.published_generation
+        WHERE sc.student_id = :owner_id
+        ORDER BY sc.start_time, sc.exam_id
+    """,
+    "professor": f"""
+        SELECT t.exam_id, m.name, t.start_time, t.end_time, r.name
+        FROM ({CURRENT_ENTRIES}) t
+        JOIN exams e ON e.id = t.exam_id
+        JOIN modules m ON m.id = e.module_id
+        LEFT JOIN rooms r ON r.id = t.room_id
+        WHERE t.supervisor_id = :owner_id
+        ORDER BY t.start_time, t.exam_id
+    """,
+    "room": f"""
+        SELECT t.exam_id, m.name, t.start_time, t.end_time, r.name
+        FROM ({CURRENT_ENTRIES}) t
+        JOIN exams e ON e.id = t.exam_id
+        JOIN modules m ON m.id = e.module_id
+        JOIN rooms r ON r.id = t.room_id
+        WHERE t.room_id = :owner_id
+        ORDER BY t.start_time, t.exam_id
+    """,
+}
+FEED_NAMES = {"student": "Mes examens", "professor": "Mes surveillances", "room": "Salle"}
+
+
+def feed_path(kind: str, owner_id: int) -> str:
+    return f"/api/v1/feeds/{kind}/{owner_id}.ics?token={ical.feed_token(kind, owner_id)}"
+
+
+async def _stream_feed(key, kind: str, owner_id: int):
+    """Stream the calendar chunk by chunk, then keep the full body in the response cache"""
+    parts = []
+    dtstamp = datetime.now(timezone.utc)
+    header = ical.calendar_header(f"{FEED_NAMES[kind]} ({kind} {owner_id})").encode()
+    parts.append(header)
+    yield header
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(
+            sa.text(FEED_QUERIES[kind]).execution_options(yield_per=FEED_CHUNK), {"owner_id": owner_id}
+        )
+        async for chunk in result.partitions(FEED_CHUNK):
+            body = "".join(
+                ical.vevent(
+                    uid=f"exam-{exam_id}-{kind}-{owner_id}@exam-timetable",
+                    start=start, end=end, summary=f"Examen : {name or exam_id}",
+                    location=room, dtstamp=dtstamp,
+                )
+                for exam_id, name, start, end, room in chunk
+                if start is not None
+            ).encode()
+            parts.append(body)
+            yield body
+    footer = ical.calendar_footer().encode()
+    parts.append(footer)
+    yield footer
+    cache.response_cache.put(key, b"".join(parts))
+
+
+@router.get("/me", response_model=dict)
+async def my_feed_urls(
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Subscription URLs of the logged-in user's calendar feeds"""
+    urls = {}
+    if current_user.student_profile:
+        urls["student"] = feed_path("student", current_user.student_profile.id)
+    if current_user.professor_profile:
+        urls["professor"] = feed_path("professor", current_user.professor_profile.id)
+    return urls
+
+
+@router.get("/rooms/{room_id}", response_model=dict)
+async def room_feed_url(
+    room_id: int,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Subscription URL of a room's calendar (staff only)"""
+    if current_user.role == 'student':
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"room": feed_path("room", room_id)}
+
+
+@router.get("/{kind}/{owner_id}.ics")
+async def read_feed(
+    kind: str,
+    owner_id: int,
+    request: Request,
+    token: str = "",
+) -> Any:
+    """iCalendar feed (no JWT: the URL token authenticates the feed)"""
+    if kind not in ical.FEED_KINDS:
+        raise HTTPException(status_code=404, detail="Unknown feed")
+    if not ical.check_feed_token(kind, owner_id, token):
+        raise HTTPException(status_code=403, detail="Invalid feed token")
+
+    key = ("ics", kind, owner_id, await cache.memoized_version(AsyncSessionLocal))
+    etag = cache.make_etag(key)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if cache.not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = cache.response_cache.get(key)
+    if body is not None:
+        return Response(content=body, media_type=ICS_MEDIA_TYPE, headers=headers)
+    return StreamingResponse(_stream_feed(key, kind, owner_id), media_type=ICS_MEDIA_TYPE, headers=headers)
@@ -1,17 +1,26 @@
 """
 Management endpoints for Admin/Head users
-CRUD operations for departments, programs, modules, rooms, users, exams
+CRUD operations for departments, programs, modules, rooms, users, exams,
+professor unavailability, exam sessions
 """
+import datetime as dt
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Body
+import sqlalchemy as sa
 from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 from app.api import deps
 from app.models.all_models import (
     User, UserRole, Department, Program, Module, Room, Exam, 
-    Professor, Student
+    Professor, Student, ProfessorUnavailability, AppSetting, ExamSession
 )
-from pydantic import BaseModel, EmailStr
+from app.algos.engine import SLOT_OFFSETS
+from app.db import generations
+from app.db.dashboard_views import refresh_dashboard_views
+from app.db.session import AsyncSessionLocal
+from app.core.cache import bump_version
+from pydantic import BaseModel, EmailStr, field_validator
 
 router = APIRouter()
 
@@ -45,6 +54,48 @@ class ExamCreate(BaseModel):
     module_id: int
     duration_minutes: int = 90
 
+class SchedulingSettings(BaseModel):
+    max_exams_per_student_day: int = 1
+
+class ExamSessionCreate(BaseModel):
+    name: str
+    kind: str = "summer"  # winter, summer, resit...
+    start_date: dt.date
+    is_current: bool = False
+
+def _check_slot(slot: int) -> int:
+    if not 0 <= slot < len(SLOT_OFFSETS):
+        raise ValueError(f"slot must be between 0 and {len(SLOT_OFFSETS) - 1}")
+    return slot
+
+class UnavailabilityCreate(BaseModel):
+    date: dt.date
+    slot: Optional[int] = None  # None = whole day
+
+    @field_validator("slot")
+    @classmethod
+    def slot_in_day(cls, slot):
+        return slot if slot is None else _check_slot(slot)
+
+class UnavailabilityGridRow(BaseModel):
+    professor_id: int
+    date: dt.date
+    slots: Optional[List[int]] = None  # None = whole day
+
+    @field_validator("slots")
+    @classmethod
+    def slots_in_day(cls, slots):
+        return slots if slots is None else [_check_slot(slot) for slot in slots]
+
+class UnavailabilityImport(BaseModel):
+    rows: List[UnavailabilityGridRow]
+    replace: bool = True  # Wipe the department's existing grid first
+
+async def _commit(db):
+    """Commit a management write, then invalidate cached timetable / dashboard responses"""
+    await db.commit()
+    await bump_version(db)
+
 # ==================== DEPARTMENTS ====================
 
 @router.get("/departments", response_model=List[dict])
@@ -69,7 +120,7 @@ async def create_department(
     """Create a department (Admin only)"""
     dept = Department(name=data.name)
     db.add(dept)
-    await db.commit()
+    await _commit(db)
     await db.refresh(dept)
     return {"id": dept.id, "name": dept.name}
 
@@ -107,7 +158,7 @@ async def create_program(
     
     program = Program(name=data.name, department_id=data.department_id)
     db.add(program)
-    await db.commit()
+    await _commit(db)
     await db.refresh(program)
     return {"id": program.id, "name": program.name, "department_id": program.department_id}
 
@@ -154,7 +205,7 @@ async def create_module(
     
     module = Module(name=data.name, program_id=data.program_id, professor_id=data.professor_id)
     db.add(module)
-    await db.commit()
+    await _commit(db)
     await db.refresh(module)
     return {"id": module.id, "name": module.name, "program_id": module.program_id}
 
@@ -179,7 +230,7 @@ async def create_room(
     """Create a room (Admin only)"""
     room = Room(name=data.name, capacity=data.capacity)
     db.add(room)
-    await db.commit()
+    await _commit(db)
     await db.refresh(room)
     return {"id": room.id, "name": room.name, "capacity": room.capacity}
 
@@ -195,7 +246,7 @@ async def delete_room(
         raise HTTPException(status_code=404, detail="Room not found")
     stmt = delete(Room).where(Room.id == room_id)
     await db.execute(stmt)
-    await db.commit()
+    await _commit(db)
     return {"message": "Room deleted"}
 
 # ==================== USERS ====================
@@ -257,22 +308,22 @@ async def create_user(
         is_active=True
     )
     db.add(user)
-    await db.commit()
+    await _commit(db)
     await db.refresh(user)
     
     # Create profile if needed
     if data.role == 'professor' and data.department_id:
         prof = Professor(user_id=user.id, department_id=data.department_id)
         db.add(prof)
-        await db.commit()
+        await _commit(db)
     elif data.role == 'student' and data.program_id:
         student = Student(user_id=user.id, program_id=data.program_id)
         db.add(student)
-        await db.commit()
+        await _commit(db)
     elif data.role == 'head' and data.department_id:
         prof = Professor(user_id=user.id, department_id=data.department_id)
         db.add(prof)
-        await db.commit()
+        await _commit(db)
     
     return {
         "id": user.id,
@@ -329,7 +380,224 @@ async def create_exam(
     
     exam = Exam(module_id=data.module_id, duration_minutes=data.duration_minutes)
     db.add(exam)
-    await db.commit()
+    await _commit(db)
     await db.refresh(exam)
     return {"id": exam.id, "module_id": exam.module_id, "duration_minutes": exam.duration_minutes}
 
+# ==================== PROFESSOR UNAVAILABILITY ====================
+
+async def _check_unavailability_access(current_user: User, professor: Professor):
+    """Admin: everyone. Head: own department. Professor: own profile only."""
+    if current_user.role == 'admin':
+        return
+    own = current_user.professor_profile
+    if current_user.role == 'head' and own and own.department_id == professor.department_id:
+        return
+    if current_user.role == 'professor' and own and own.id == professor.id:
+        return
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+@router.get("/professors/{professor_id}/unavailability", response_model=List[dict])
+async def list_unavailability(
+    professor_id: int,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """List the declared unavailable days/slots of a professor"""
+    professor = await db.get(Professor, professor_id)
+    if not professor:
+        raise HTTPException(status_code=404, detail="Professor not found")
+    await _check_unavailability_access(current_user, professor)
+
+    result = await db.execute(
+        select(ProfessorUnavailability)
+        .where(ProfessorUnavailability.professor_id == professor_id)
+        .order_by(ProfessorUnavailability.date, ProfessorUnavailability.slot)
+    )
+    return [
+        {"id": u.id, "professor_id": u.professor_id, "date": u.date, "slot": u.slot}
+        for u in result.scalars().all()
+    ]
+
+@router.post("/professors/{professor_id}/unavailability", response_model=dict)
+async def create_unavailability(
+    professor_id: int,
+    data: UnavailabilityCreate,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Declare a professor unavailable for a whole day (slot=None) or a single slot"""
+    professor = await db.get(Professor, professor_id)
+    if not professor:
+        raise HTTPException(status_code=404, detail="Professor not found")
+    await _check_unavailability_access(current_user, professor)
+
+    # Unique on (professor_id, date, COALESCE(slot, -1)): whole-day duplicates are caught too
+    result = await db.execute(
+        pg_insert(ProfessorUnavailability)
+        .values(professor_id=professor_id, date=data.date, slot=data.slot)
+        .on_conflict_do_nothing()
+        .returning(ProfessorUnavailability.id)
+    )
+    entry_id = result.scalar()
+    if entry_id is None:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Unavailability already declared")
+    await _commit(db)
+    return {"id": entry_id, "professor_id": professor_id, "date": data.date, "slot": data.slot}
+
+@router.delete("/unavailability/{entry_id}")
+async def delete_unavailability(
+    entry_id: int,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Remove an unavailability entry"""
+    entry = await db.get(ProfessorUnavailability, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Unavailability not found")
+    professor = await db.get(Professor, entry.professor_id)
+    await _check_unavailability_access(current_user, professor)
+
+    await db.execute(delete(ProfessorUnavailability).where(ProfessorUnavailability.id == entry_id))
+    await _commit(db)
+    return {"message": "Unavailability deleted"}
+
+@router.post("/departments/{dept_id}/unavailability/import", response_model=dict)
+async def import_department_unavailability(
+    dept_id: int,
+    data: UnavailabilityImport,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Batch import of a whole department's unavailability grid (Admin, Head of the department)"""
+    if current_user.role not in ['admin', 'head']:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if current_user.role == 'head':
+        own = current_user.professor_profile
+        if not own or own.department_id != dept_id:
+            raise HTTPException(status_code=403, detail="You can only import your own department")
+
+    result = await db.execute(select(Professor.id).where(Professor.department_id == dept_id))
+    dept_profs = set(result.scalars().all())
+    unknown = {r.professor_id for r in data.rows} - dept_profs
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Professors not in department {dept_id}: {sorted(unknown)}")
+
+    rows = set()
+    for r in data.rows:
+        for slot in (r.slots if r.slots is not None else [None]):
+            rows.add((r.professor_id, r.date, slot))
+
+    if data.replace and dept_profs:
+        await db.execute(delete(ProfessorUnavailability).where(ProfessorUnavailability.professor_id.in_(dept_profs)))
+    if rows:
+        # replace=false merges into the existing grid: rows already declared are skipped
+        await db.execute(
+            pg_insert(ProfessorUnavailability).on_conflict_do_nothing(),
+            [{"professor_id": p, "date": d, "slot": s} for p, d, s in rows]
+        )
+    await _commit(db)
+    return {"message": f"Imported {len(rows)} unavailability entries for department {dept_id}"}
+
+# ==================== SCHEDULING SETTINGS ====================
+
+@router.get("/settings/scheduling", response_model=dict)
+async def get_scheduling_settings(
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Scheduling rules used by the engine and validate_timetable()"""
+    setting = await db.get(AppSetting, "max_exams_per_student_day")
+    return {"max_exams_per_student_day": int(setting.value) if setting else 1}
+
+@router.put("/settings/scheduling", response_model=dict)
+async def update_scheduling_settings(
+    data: SchedulingSettings,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """Update scheduling rules (Admin only)"""
+    if not 1 <= data.max_exams_per_student_day <= 4:
+        raise HTTPException(status_code=400, detail="max_exams_per_student_day must be between 1 and 4")
+    setting = await db.get(AppSetting, "max_exams_per_student_day")
+    if setting:
+        setting.value = str(data.max_exams_per_student_day)
+    else:
+        db.add(AppSetting(key="max_exams_per_student_day", value=str(data.max_exams_per_student_day)))
+    await _commit(db)
+    return {"max_exams_per_student_day": data.max_exams_per_student_day}
+
+# ==================== EXAM SESSIONS ====================
+
+def _session_dict(s: ExamSession) -> dict:
+    return {
+        "id": s.id, "name": s.name, "kind": s.kind, "start_date": s.start_date,
+        "is_current": s.is_current, "published_generation": s.published_generation,
+    }
+
+@router.get("/sessions", response_model=List[dict])
+async def list_exam_sessions(
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """List exam sessions, most recent first"""
+    result = await db.execute(select(ExamSession).order_by(ExamSession.start_date.desc()))
+    return [_session_dict(s) for s in result.scalars().all()]
+
+@router.post("/sessions", response_model=dict)
+async def create_exam_session(
+    data: ExamSessionCreate,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """Create an exam session (Admin only). Its timetable partition is created by trigger."""
+    existing = await db.execute(select(ExamSession).where(ExamSession.name == data.name))
+    if existing.scalars().first():
+        raise HTTPException(status_code=400, detail="Exam session already exists")
+    if data.is_current:
+        await db.execute(sa.update(ExamSession).where(ExamSession.is_current).values(is_current=False))
+    session = ExamSession(name=data.name, kind=data.kind, start_date=data.start_date, is_current=data.is_current)
+    db.add(session)
+    await _commit(db)
+    await db.refresh(session)
+    return _session_dict(session)
+
+@router.post("/sessions/{session_id}/activate", response_model=dict)
+async def activate_exam_session(
+    session_id: int,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """Make a session the current one (default target of the engine and timetable views)"""
+    session = await db.get(ExamSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Exam session not found")
+    await db.execute(sa.update(ExamSession).where(ExamSession.is_current).values(is_current=False))
+    await db.flush()
+    session.is_current = True
+    await _commit(db)
+    return _session_dict(session)
+
+@router.post("/sessions/{session_id}/rollback", response_model=dict)
+async def rollback_exam_session(
+    session_id: int,
+    background_tasks: BackgroundTasks,
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """Republish the previous timetable generation of a session (Admin only)"""
+    session = await db.get(ExamSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Exam session not found")
+    # Held until the commit; a run in progress would publish over the rollback
+    if not await generations.try_lock_session(db, session_id):
+        raise HTTPException(status_code=409, detail="An optimization run is in progress for this session")
+    previous = await generations.previous_generation(db, session_id)
+    if previous is None:
+        raise HTTPException(status_code=400, detail="No previous generation to roll back to")
+    await generations.publish_generation(db, session_id, previous)
+    await _commit(db)
+    background_tasks.add_task(refresh_dashboard_views, AsyncSessionLocal)
+    await db.refresh(session)
+    return _session_dict(session)
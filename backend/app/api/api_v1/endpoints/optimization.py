@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Any
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from typing import Any, Optional
 from app.api import deps
 from app.models.all_models import User
 from app.schemas.all_schemas import OptimizationStats
 from app.algos.engine import OptimizationEngine
 from app.db.session import AsyncSessionLocal
+from app.db.generations import GenerationLocked, collect_generations
 import time
 import asyncio
 
@@ -12,51 +13,67 @@ router = APIRouter()
 
 @router.post("/draft", response_model=OptimizationStats)
 async def run_draft_generation(
+    background_tasks: BackgroundTasks,
+    resume: bool = False,
+    session_id: Optional[int] = None,
     current_user: User = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Generate a Draft Timetable (Quick Heuristic)
+    resume=true continues from the last checkpoint of an interrupted run.
+    session_id targets an exam session (defaults to the current one).
     """
     print(f"[DRAFT] Draft Generation triggered by {current_user.email}")
     try:
-        engine = OptimizationEngine(AsyncSessionLocal)
+        engine = OptimizationEngine(AsyncSessionLocal, session_id=session_id)
         start_time = time.time()
         
         print(f"[DRAFT] Starting draft generation...")
         # Run in draft mode (faster, fewer slots)
-        await engine.run(mode="draft")
+        await engine.run(mode="draft", resume=resume)
         
         end_time = time.time()
+        # Superseded generations are dropped after the response is sent
+        background_tasks.add_task(collect_generations, AsyncSessionLocal, engine.session_id)
         print(f"[DRAFT] Completed! Total exams: {len(engine.exams)}, Time: {end_time - start_time:.2f}s")
         
         stats = OptimizationStats(
             total_exams=len(engine.exams),
             conflicts_found=0, # Placeholder
             success=True,
-            execution_time=end_time - start_time
+            execution_time=end_time - start_time,
+            spread_cost=engine.final_spread_cost
         )
         print(f"[DRAFT] Returning stats: {stats.dict()}")
         return stats
+    except GenerationLocked as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"Error during draft generation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/run", response_model=OptimizationStats)
 async def run_optimization(
+    background_tasks: BackgroundTasks,
+    resume: bool = False,
+    session_id: Optional[int] = None,
     current_user: User = Depends(deps.get_current_active_superuser), # Only admin
 ) -> Any:
     """
     Trigger the full optimization engine (Admin only)
+    resume=true continues from the last checkpoint of an interrupted run.
+    session_id targets an exam session (defaults to the current one).
     """
     print(f"[OPTIMIZE] Full Optimization triggered by {current_user.email}")
     
     try:
-        engine = OptimizationEngine(AsyncSessionLocal)
+        engine = OptimizationEngine(AsyncSessionLocal, session_id=session_id)
         
         print(f"[OPTIMIZE] Starting full optimization...")
         start_time = time.time()
-        await engine.run(mode="optimized")
+        await engine.run(mode="optimized", resume=resume)
         end_time = time.time()
+        background_tasks.add_task(collect_generations, AsyncSessionLocal, engine.session_id)
         print(f"[OPTIMIZE] Completed! Total exams: {len(engine.exams)}, Time: {end_time - start_time:.2f}s")
         
         # Calculate stats
@@ -64,10 +81,13 @@ async def run_optimization(
             total_exams=len(engine.exams),
             conflicts_found=0, # Assuming greedy success
             success=True,
-            execution_time=end_time - start_time
+            execution_time=end_time - start_time,
+            spread_cost=engine.final_spread_cost
         )
         print(f"[OPTIMIZE] Returning stats: {stats.dict()}")
         return stats
+    except GenerationLocked as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"Error during optimization: {e}")
         raise HTTPException(status_code=500, detail=str(e))
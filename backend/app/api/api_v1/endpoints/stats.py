@@ -1,19 +1,54 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends
+from typing import Any, List, Optional
+import asyncio
+import base64
+import datetime as dt
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 import sqlalchemy as sa
 from sqlalchemy import select, func, distinct
 from app.api import deps
+from app.core import cache
+from app.db.session import AsyncSessionLocal
 from app.models.all_models import User, Student, Professor, Room, Department, Exam, TimetableEntry, Module, Program
 
 router = APIRouter()
 
+async def _fetch_all(query: str, params: dict):
+    """Run one dashboard query on its own pooled connection (lets the queries overlap)"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(sa.text(query), params)
+        return result.fetchall()
+
+
+def _head_department(current_user: User):
+    if current_user.role == 'head' and current_user.professor_profile:
+        return current_user.professor_profile.department_id
+    return None
+
+
 @router.get("/dashboard-kpi")
 async def get_dashboard_kpi(
+    request: Request,
+    session_id: int = Depends(deps.get_exam_session_id),
     db = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get Key Performance Indicators based on user role.
+    Cached per (scope, session, timetable version); honours If-None-Match.
+    """
+    return await cache.cached_response(
+        request, db, "dashboard-kpi", cache.user_scope(current_user, _head_department(current_user)), (session_id,),
+        lambda: _dashboard_kpi(session_id, current_user),
+    )
+
+
+async def _dashboard_kpi(session_id: int, current_user: User) -> dict:
+    """
+    Timetable aggregates come precomputed from the mv_* materialized views
+    (app/db/dashboard_views.py); the three reads run concurrently on separate
+    connections, so the dashboard costs about one round-trip of latency.
     """
     
     stats = {
@@ -23,189 +58,96 @@ async def get_dashboard_kpi(
         "conflicts": 0, # Placeholder
         "occupancy_rate": 0
     }
-    
-    # Global Stats (Fast counts)
-    total_students = await db.execute(select(func.count(User.id)).where(User.role == 'student'))
-    stats["total_students"] = total_students.scalar()
-    
-    total_profs = await db.execute(select(func.count(Professor.id)))
-    stats["total_profs"] = total_profs.scalar()
-    
-    total_exams = await db.execute(select(func.count(TimetableEntry.id)))
-    stats["total_exams"] = total_exams.scalar()
-    
-    
-    # Department specific logic
-    if current_user.role == 'head':
-        try:
-            # Find the department for this head
-            query = select(Professor).where(Professor.user_id == current_user.id)
-            result = await db.execute(query)
-            prof_profile = result.scalars().first()
-            
-            if prof_profile and prof_profile.department_id:
-                dept_id = prof_profile.department_id
-                stats["scope"] = "Department"
-                
-                # Filter stats by dept
-                student_count = await db.execute(
-                    select(func.count(Student.id))
-                    .join(Student.program)
-                    .where(Program.department_id == dept_id)
-                )
-                stats["total_students"] = student_count.scalar() or 0
-                
-                prof_count = await db.execute(
-                    select(func.count(Professor.id))
-                    .where(Professor.department_id == dept_id)
-                )
-                stats["total_profs"] = prof_count.scalar() or 0
-                
-                exam_count = await db.execute(
-                    select(func.count(TimetableEntry.id))
-                    .join(TimetableEntry.exam)
-                    .join(Exam.module)
-                    .join(Module.program)
-                    .where(Program.department_id == dept_id)
-                )
-                stats["total_exams"] = exam_count.scalar() or 0
-            else:
-                print(f"HOD {current_user.email} has no department link")
-                stats["scope"] = "Global (No Dept Profile)"
-        except Exception as e:
-            print(f"Error calculating HOD stats: {e}")
-            stats["scope"] = "Global (Fallback)"
-    # 4. Conflict Rates (Strategic View for Dean/Head)
-    # Conflict is detected if validate_timetable() returns results.
-    # For a strategic view, we want conflicts per dept or program.
-    conflict_query = """
-        SELECT 
-            d.name,
-            COUNT(DISTINCT conflicts.exam_id) as conflict_count
-        FROM departments d
-        LEFT JOIN programs p ON d.id = p.department_id
-        LEFT JOIN modules m ON p.id = m.program_id
-        LEFT JOIN exams e ON m.id = e.module_id
-        LEFT JOIN (
-            -- Subquery to find exam_ids that have student conflicts (Multi-exam on same day)
-            SELECT t1.exam_id
-            FROM timetable_entries t1
-            JOIN exams e1 ON t1.exam_id = e1.id
-            JOIN modules m1 ON e1.module_id = m1.id
-            JOIN enrollments en1 ON m1.id = en1.module_id
-            WHERE EXISTS (
-                SELECT 1 
-                FROM timetable_entries t2
-                JOIN exams e2 ON t2.exam_id = e2.id
-                JOIN modules m2 ON e2.module_id = m2.id
-                JOIN enrollments en2 ON m2.id = en2.module_id
-                WHERE en2.student_id = en1.student_id 
-                  AND CAST(t2.start_time AS DATE) = CAST(t1.start_time AS DATE)
-                  AND t2.id <> t1.id
-            )
-        ) conflicts ON e.id = conflicts.exam_id
-        GROUP BY d.name;
-    """
-    conf_res = await db.execute(sa.text(conflict_query))
-    stats["conflicts_by_dept"] = [{"name": row[0], "count": int(row[1] or 0)} for row in conf_res.fetchall()]
+    params = {"session_id": session_id}
 
+    # Department of a head, resolved once (professor_profile is preloaded by get_current_user)
+    dept_id = None
     if current_user.role == 'head':
-        # Conflicts per program for this head's department
-        prog_conflict_query = """
-            SELECT 
-                p.name,
-                COUNT(DISTINCT conflicts.exam_id) as conflict_count
-            FROM programs p
-            LEFT JOIN modules m ON p.id = m.program_id
-            LEFT JOIN exams e ON m.id = e.module_id
-            LEFT JOIN (
-                SELECT t1.exam_id
-                FROM timetable_entries t1
-                JOIN exams e1 ON t1.exam_id = e1.id
-                JOIN modules m1 ON e1.module_id = m1.id
-                JOIN enrollments en1 ON m1.id = en1.module_id
-                WHERE EXISTS (
-                    SELECT 1 
-                    FROM timetable_entries t2
-                    JOIN exams e2 ON t2.exam_id = e2.id
-                    JOIN modules m2 ON e2.module_id = m2.id
-                    JOIN enrollments en2 ON m2.id = en2.module_id
-                    WHERE en2.student_id = en1.student_id 
-                      AND CAST(t2.start_time AS DATE) = CAST(t1.start_time AS DATE)
-                      AND t2.id <> t1.id
-                )
-            ) conflicts ON e.id = conflicts.exam_id
-            WHERE p.department_id = :dept_id
-            GROUP BY p.name;
-        """
-        # Get dept_id
-        prof_res = await db.execute(select(Professor).where(Professor.user_id == current_user.id))
-        prof = prof_res.scalars().first()
-        if prof:
-            prog_conf_res = await db.execute(sa.text(prog_conflict_query), {"dept_id": prof.department_id})
-            stats["conflicts_by_program"] = [{"name": row[0], "count": int(row[1] or 0)} for row in prog_conf_res.fetchall()]
-
-    # 7. Validation Workflow Summary (Dean/Vice-Dean Strategic KPIs)
-    stats["validation_status"] = {"DRAFT": 0, "DEPT_APPROVED": 0, "FINAL_APPROVED": 0}
-    status_query = select(TimetableEntry.status, func.count(TimetableEntry.id)).group_by(TimetableEntry.status)
-    status_res = await db.execute(status_query)
-    for row in status_res.all():
-        if row[0] in stats["validation_status"]:
-            stats["validation_status"][row[0]] = row[1]
+        prof_profile = current_user.professor_profile
+        if prof_profile and prof_profile.department_id:
+            dept_id = prof_profile.department_id
+            params["dept_id"] = dept_id
+            stats["scope"] = "Department"
         else:
-            # Handle cases where status might be None or unexpected
-            stats["validation_status"]["DRAFT"] += row[1]
-    
-    # 8. Room Occupancy & Waste
-    occ_query = """
-        SELECT 
-            AVG(CAST(en_counts.cnt AS NUMERIC) / r.capacity * 100) as avg_rate,
-            AVG(r.capacity - en_counts.cnt) as avg_unused_seats
-        FROM rooms r
-        JOIN timetable_entries t ON r.id = t.room_id
-        JOIN exams e ON t.exam_id = e.id
-        JOIN (SELECT module_id, COUNT(*) as cnt FROM enrollments GROUP BY module_id) en_counts ON e.module_id = en_counts.module_id
-        WHERE r.capacity > 0;
-    """
-    occ_res = await db.execute(sa.text(occ_query))
-    row = occ_res.fetchone()
-    stats["occupancy_rate"] = float(row[0] or 0)
-    stats["avg_unused_seats"] = float(row[1] or 0)
-    stats["room_waste_pct"] = max(0, 100 - stats["occupancy_rate"])
+            print(f"HOD {current_user.email} has no department link")
+            stats["scope"] = "Global (No Dept Profile)"
+
+    # 1. Counts, validation workflow summary and room occupancy
+    if dept_id is not None:
+        students_sql = """SELECT COUNT(*) FROM students s JOIN programs p ON p.id = s.program_id
+                          WHERE p.department_id = :dept_id"""
+        profs_sql = "SELECT COUNT(*) FROM professors WHERE department_id = :dept_id"
+        exams_sql = """SELECT COALESCE(SUM(exam_count), 0) FROM mv_program_kpi
+                       WHERE session_id = :session_id AND department_id = :dept_id"""
+    else:
+        students_sql = "SELECT COUNT(*) FROM users WHERE role = 'student'"
+        profs_sql = "SELECT COUNT(*) FROM professors"
+        exams_sql = "SELECT total_exams FROM mv_timetable_kpi WHERE session_id = :session_id"
 
-    # 9. Room Usage Distribution (Chart)
-    room_usage_query = """
-        SELECT r.name, COUNT(t.id) as usage_count
-        FROM rooms r
-        JOIN timetable_entries t ON r.id = t.room_id
-        GROUP BY r.name
-        ORDER BY usage_count DESC
-        LIMIT 10;
+    counts_query = f"""
+        SELECT
+            ({students_sql}),
+            ({profs_sql}),
+            ({exams_sql}),
+            k.draft_count, k.dept_approved_count, k.final_approved_count,
+            k.occupancy_rate, k.avg_unused_seats
+        FROM (SELECT 1) one
+        LEFT JOIN mv_timetable_kpi k ON k.session_id = :session_id
     """
-    room_usage_res = await db.execute(sa.text(room_usage_query))
-    stats["room_occupancy"] = [{"name": row[0], "rate": row[1]} for row in room_usage_res.fetchall()]
-
-    # 10. Exams per Day (Chart)
-    exams_day_query = """
-        SELECT CAST(start_time AS DATE) as day, COUNT(*) as cnt
-        FROM timetable_entries
-        GROUP BY CAST(start_time AS DATE)
-        ORDER BY day;
+
+    # 2. Conflict Rates (Strategic View for Dean/Head): per dept, plus per program for a head
+    # (exams sharing students with another exam on the same day)
+    program_conflicts_sql = ""
+    if dept_id is not None:
+        program_conflicts_sql = """
+        UNION ALL
+        SELECT 'program', name, conflict_count
+        FROM mv_program_kpi
+        WHERE session_id = :session_id AND department_id = :dept_id
+        """
+    conflict_query = f"""
+        SELECT 'dept', d.name, COALESCE(SUM(k.conflict_count), 0)
+        FROM departments d
+        LEFT JOIN mv_program_kpi k ON k.department_id = d.id AND k.session_id = :session_id
+        GROUP BY d.name
+        {program_conflicts_sql}
     """
-    day_res = await db.execute(sa.text(exams_day_query))
-    stats["exams_by_day"] = [{"date": str(row[0]), "count": row[1]} for row in day_res.fetchall()]
 
-    # 11. Professor Load (Chart)
-    prof_load_query = """
-        SELECT u.full_name, COUNT(t.id) as load
-        FROM timetable_entries t
-        JOIN users u ON t.supervisor_id = u.id
-        GROUP BY u.full_name
-        ORDER BY load DESC
-        LIMIT 10;
+    # 3. Charts: room usage, exams per day, professor load
+    charts_query = """
+        (SELECT 'room', name, usage_count FROM mv_room_usage
+         WHERE session_id = :session_id ORDER BY usage_count DESC LIMIT 10)
+        UNION ALL
+        (SELECT 'day', to_char(day, 'YYYY-MM-DD'), exam_count FROM mv_exams_per_day
+         WHERE session_id = :session_id ORDER BY day)
+        UNION ALL
+        (SELECT 'prof', full_name, load FROM mv_prof_load
+         WHERE session_id = :session_id ORDER BY load DESC LIMIT 10)
     """
-    prof_res = await db.execute(sa.text(prof_load_query))
-    stats["prof_load"] = [{"name": row[0], "count": row[1]} for row in prof_res.fetchall()]
+
+    count_rows, conflict_rows, chart_rows = await asyncio.gather(
+        _fetch_all(counts_query, params),
+        _fetch_all(conflict_query, params),
+        _fetch_all(charts_query, params),
+    )
+
+    (total_students, total_profs, total_exams,
+     draft, dept_approved, final_approved, avg_rate, avg_unused) = count_rows[0]
+    stats["total_students"] = total_students or 0
+    stats["total_profs"] = total_profs or 0
+    stats["total_exams"] = int(total_exams or 0)
+    stats["validation_status"] = {"DRAFT": draft or 0, "DEPT_APPROVED": dept_approved or 0, "FINAL_APPROVED": final_approved or 0}
+    stats["occupancy_rate"] = float(avg_rate or 0)
+    stats["avg_unused_seats"] = float(avg_unused or 0)
+    stats["room_waste_pct"] = max(0, 100 - stats["occupancy_rate"])
+
+    stats["conflicts_by_dept"] = [{"name": name, "count": int(cnt or 0)} for kind, name, cnt in conflict_rows if kind == 'dept']
+    if dept_id is not None:
+        stats["conflicts_by_program"] = [{"name": name, "count": int(cnt or 0)} for kind, name, cnt in conflict_rows if kind == 'program']
+
+    stats["room_occupancy"] = [{"name": name, "rate": cnt} for kind, name, cnt in chart_rows if kind == 'room']
+    stats["exams_by_day"] = [{"date": day, "count": cnt} for kind, day, cnt in chart_rows if kind == 'day']
+    stats["prof_load"] = [{"name": name, "count": cnt} for kind, name, cnt in chart_rows if kind == 'prof']
 
     # 12. Quality Score & Optimization Gain
     # Calculate a more dynamic quality score based on conflict density
@@ -233,90 +175,228 @@ async def get_dashboard_kpi(
         stats["optimization_gain"] = 0.0
 
     return stats
+# conflicts-detailed: rows are ordered by (type, date, key_a, key_b) so that a page
+# cursor is just the last key and every page is an index range scan.
+CONFLICT_TYPES = ["student", "room"]
+CONFLICT_LABELS = {"student": "Étudiant (Multi-Exam)", "room": "Salle (Surcharge)"}
+CONFLICT_STREAM_CHUNK = 1000
+MAX_CONFLICT_PAGE = 1000
+
+
+def _encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        kind, day, key_a, key_b = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return CONFLICT_TYPES.index(kind), dt.date.fromisoformat(day), int(key_a), int(key_b)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _conflict_query(kind: str, dept_id, day, after) -> str:
+    """SQL for one conflict type, returning (date, key_a, key_b, target, detail...) in key order"""
+    if kind == "student":
+        filters = ""
+        if dept_id is not None:
+            filters += " AND (c.department_a = :dept_id OR c.department_b = :dept_id)"
+        if day is not None:
+            filters += " AND c.conflict_date = :day"
+        if after is not None:
+            filters += " AND (c.conflict_date, c.exam_a, c.exam_b) > (:after_date, :after_a, :after_b)"
+        return f"""
+            SELECT c.conflict_date, c.exam_a, c.exam_b, c.shared_students, ma.name, mb.name
+            FROM timetable_conflicts c
+            JOIN exam_sessions s ON s.id = c.session_id AND c.generation = s.published_generation
+            JOIN exams ea ON ea.id = c.exam_a
+            JOIN modules ma ON ma.id = ea.module_id
+            JOIN exams eb ON eb.id = c.exam_b
+            JOIN modules mb ON mb.id = eb.module_id
+            WHERE c.session_id = :session_id {filters}
+            ORDER BY c.conflict_date, c.exam_a, c.exam_b
+        """
+    filters = ""
+    if dept_id is not None:
+        filters += " AND p.department_id = :dept_id"
+    if day is not None:
+        filters += " AND CAST(t.start_time AS DATE) = :day"
+    if after is not None:
+        filters += " AND (CAST(t.start_time AS DATE), t.exam_id) > (:after_date, :after_a)"
+    return f"""
+        SELECT CAST(t.start_time AS DATE) AS day, t.exam_id, 0, r.name, m.name, en_counts.cnt, r.capacity
+        FROM timetable_entries t
+        JOIN rooms r ON t.room_id = r.id
+        JOIN exams e ON t.exam_id = e.id
+        JOIN modules m ON e.module_id = m.id
+        JOIN programs p ON m.program_id = p.id
+        JOIN (SELECT module_id, COUNT(*) as cnt FROM enrollments GROUP BY module_id) en_counts ON e.module_id = en_counts.module_id
+        WHERE t.session_id = :session_id AND en_counts.cnt > r.capacity {filters}
+        ORDER BY day, t.exam_id
+    """
+
+
+def _conflict_item(kind: str, row) -> dict:
+    if kind == "student":
+        # Students of the pair: GET /stats/conflicts-detailed/students?exam_a=..&exam_b=..
+        return {"type": CONFLICT_LABELS[kind], "target": f"{row[3]} étudiant(s)",
+                "detail": f"Date: {row[0]} | Modules: {row[4]} | {row[5]}",
+                "exams": [row[1], row[2]]}
+    return {"type": CONFLICT_LABELS[kind], "target": row[3],
+            "detail": f"Module: {row[4]} | Inscrits: {row[5]} > Capacité: {row[6]}"}
+
+
+async def _iter_conflicts(db, session_id: int, kinds, dept_id, day, after, limit: Optional[int] = None):
+    """
+    Yield (cursor key, item) in cursor order, starting after `after`.
+    With a limit each query is bounded (page mode); without one rows come from a
+    server-side cursor in chunks (streaming mode), so memory stays flat.
+    """
+    for kind_idx, kind in enumerate(CONFLICT_TYPES):
+        if kind not in kinds or (after is not None and kind_idx < after[0]):
+            continue
+        params = {"session_id": session_id}
+        if dept_id is not None:
+            params["dept_id"] = dept_id
+        if day is not None:
+            params["day"] = day
+        kind_after = after if after is not None and kind_idx == after[0] else None
+        if kind_after is not None:
+            params.update(after_date=kind_after[1], after_a=kind_after[2], after_b=kind_after[3])
+        query = _conflict_query(kind, dept_id, day, kind_after)
+
+        if limit is not None:
+            if limit <= 0:
+                return
+            result = await db.execute(sa.text(query + " LIMIT :limit"), {**params, "limit": limit})
+            rows = result.fetchall()
+            limit -= len(rows)
+            for row in rows:
+                yield (kind, row[0].isoformat(), row[1], row[2]), _conflict_item(kind, row)
+        else:
+            result = await db.stream(sa.text(query).execution_options(yield_per=CONFLICT_STREAM_CHUNK), params)
+            async for chunk in result.partitions(CONFLICT_STREAM_CHUNK):
+                for row in chunk:
+                    yield (kind, row[0].isoformat(), row[1], row[2]), _conflict_item(kind, row)
+
+
+async def _ndjson_conflicts(session_id: int, kinds, dept_id, day, after):
+    # Own connection: the response body outlives the request's dependencies
+    async with AsyncSessionLocal() as session:
+        async for _, item in _iter_conflicts(session, session_id, kinds, dept_id, day, after):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+
+async def _conflict_page(db, session_id: int, kinds, dept_id, day, after, limit: int) -> dict:
+    items = []
+    last_key = None
+    async for key, item in _iter_conflicts(db, session_id, kinds, dept_id, day, after, limit + 1):
+        if len(items) == limit:
+            return {"items": items, "next_cursor": _encode_cursor(last_key)}
+        items.append(item)
+        last_key = key
+    return {"items": items, "next_cursor": None}
+
+
+async def _all_conflicts(db, session_id: int, kinds, dept_id, day) -> list:
+    return [item async for _, item in _iter_conflicts(db, session_id, kinds, dept_id, day, None)]
+
+
 @router.get("/conflicts-detailed")
 async def get_detailed_conflicts(
+    request: Request,
+    conflict_type: Optional[str] = Query(None, alias="type"),
+    department_id: Optional[int] = None,
+    date: Optional[dt.date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    format: str = "json",
+    session_id: int = Depends(deps.get_exam_session_id),
     db = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get granular details of all current conflicts in the timetable.
+    - type=student|room, department_id (admin only, heads see their own), date filters
+    - limit=N returns {"items", "next_cursor"}; pass cursor=next_cursor for the next page
+    - format=ndjson (or Accept: application/x-ndjson) streams one conflict per line
+    JSON responses are cached per (scope, filters, timetable version) and honour If-None-Match.
     """
     if current_user.role not in ['admin', 'head']:
         return []
 
-    dept_id = None
-    if current_user.role == 'head':
-        prof_res = await db.execute(select(Professor).where(Professor.user_id == current_user.id))
-        prof = prof_res.scalars().first()
-        if prof:
-            dept_id = prof.department_id
+    dept_id = _head_department(current_user) if current_user.role == 'head' else department_id
+    if conflict_type is not None and conflict_type not in CONFLICT_TYPES:
+        raise HTTPException(status_code=400, detail=f"type must be one of {CONFLICT_TYPES}")
+    kinds = [conflict_type] if conflict_type else CONFLICT_TYPES
+    after = _decode_cursor(cursor) if cursor else None
 
-    # 1. Student Conflicts
-    # Construct WHERE clause dynamically to avoid passing None param that might confuse asyncpg in raw SQL
-    dept_filter = ""
-    params = {}
-    if dept_id is not None:
-        dept_filter = "WHERE p.department_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    student_query = f"""
-        WITH StudentDateConflicts AS (
-            SELECT 
-                en1.student_id,
-                CAST(t1.start_time AS DATE) as conflict_date
-            FROM timetable_entries t1
-            JOIN exams e1 ON t1.exam_id = e1.id
-            JOIN modules m1 ON e1.module_id = m1.id
-            JOIN enrollments en1 ON m1.id = en1.module_id
-            GROUP BY en1.student_id, CAST(t1.start_time AS DATE)
-            HAVING COUNT(*) > 1
+    if format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _ndjson_conflicts(session_id, kinds, dept_id, date, after), media_type="application/x-ndjson"
         )
-        SELECT 
-            u.full_name as student_name,
-            c.conflict_date,
-            string_agg(m.name, ' | ') as conflicting_modules
-        FROM StudentDateConflicts c
-        JOIN enrollments en ON c.student_id = en.student_id
-        JOIN modules m ON en.module_id = m.id
-        JOIN exams e ON m.id = e.module_id
-        JOIN timetable_entries t ON e.id = t.exam_id AND CAST(t.start_time AS DATE) = c.conflict_date
-        JOIN students s_profile ON c.student_id = s_profile.id
-        JOIN users u ON s_profile.user_id = u.id
-        JOIN programs p ON m.program_id = p.id
-        {dept_filter}
-        GROUP BY u.id, u.full_name, c.conflict_date
+
+    if limit is not None:
+        limit = max(1, min(limit, MAX_CONFLICT_PAGE))
+        compute = lambda: _conflict_page(db, session_id, kinds, dept_id, date, after, limit)
+    else:
+        compute = lambda: _all_conflicts(db, session_id, kinds, dept_id, date)
+    return await cache.cached_response(
+        request, db, "conflicts-detailed", cache.user_scope(current_user, dept_id),
+        (session_id, conflict_type, dept_id, date, cursor, limit), compute,
+    )
+
+
+@router.get("/conflicts-detailed/students")
+async def get_conflict_students(
+    exam_a: int,
+    exam_b: int,
+    session_id: int = Depends(deps.get_exam_session_id),
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
     """
-    student_res = await db.execute(sa.text(student_query), params)
-    student_conflicts = [
-        {"type": "Étudiant (Multi-Exam)", "target": row[0], "detail": f"Date: {row[1]} | Modules: {row[2]}"}
-        for row in student_res.fetchall()
-    ]
-
-    # 2. Room Capacity Conflicts
-    room_filter = ""
-    if dept_id is not None:
-        room_filter = "AND p.department_id = :dept_id"
-        # params already has dept_id if needed
-
-    room_query = f"""
-        SELECT 
-            r.name as room_name,
-            m.name as module_name,
-            en_counts.cnt as student_count,
-            r.capacity as room_capacity
-        FROM timetable_entries t
-        JOIN rooms r ON t.room_id = r.id
-        JOIN exams e ON t.exam_id = e.id
-        JOIN modules m ON e.module_id = m.id
-        JOIN programs p ON m.program_id = p.id
-        JOIN (SELECT module_id, COUNT(*) as cnt FROM enrollments GROUP BY module_id) en_counts ON e.module_id = en_counts.module_id
-        WHERE en_counts.cnt > r.capacity
-        {room_filter}
+    Students behind one student conflict of /conflicts-detailed (a pair of exams of the
+    published timetable), with the number of exams each one sits that day.
     """
-    room_res = await db.execute(sa.text(room_query), params)
-    room_conflicts = [
-        {"type": "Salle (Surcharge)", "target": row[0], "detail": f"Module: {row[1]} | Inscrits: {row[2]} > Capacité: {row[3]}"}
-        for row in room_res.fetchall()
-    ]
+    if current_user.role not in ['admin', 'head']:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    exam_a, exam_b = min(exam_a, exam_b), max(exam_a, exam_b)
+    params = {"session_id": session_id, "exam_a": exam_a, "exam_b": exam_b}
+    dept_filter = ""
+    dept_id = _head_department(current_user)
+    if current_user.role == 'head':
+        dept_filter = " AND (c.department_a = :dept_id OR c.department_b = :dept_id)"
+        params["dept_id"] = dept_id
 
-    return student_conflicts + room_conflicts
+    result = await db.execute(sa.text(f"""
+        SELECT c.generation, c.conflict_date
+        FROM timetable_conflicts c
+        JOIN exam_sessions s ON s.id = c.session_id AND c.generation = s.published_generation
+        WHERE c.session_id = :session_id AND c.exam_a = :exam_a AND c.exam_b = :exam_b {dept_filter}
+    """), params)
+    pair = result.fetchone()
+    if pair is None:
+        raise HTTPException(status_code=404, detail="Conflict not found")
+
+    result = await db.execute(sa.text("""
+        SELECT st.id, u.full_name, COUNT(DISTINCT ses.exam_id) AS exams_that_day
+        FROM exams ea
+        JOIN exams eb ON eb.id = :exam_b
+        JOIN enrollments en_a ON en_a.module_id = ea.module_id
+        JOIN enrollments en_b ON en_b.student_id = en_a.student_id AND en_b.module_id = eb.module_id
+        JOIN students st ON st.id = en_a.student_id
+        JOIN users u ON u.id = st.user_id
+        LEFT JOIN student_exam_schedule ses ON ses.session_id = :session_id AND ses.generation = :generation
+             AND ses.student_id = st.id AND CAST(ses.start_time AS DATE) = :day
+        WHERE ea.id = :exam_a
+        GROUP BY st.id, u.full_name
+        ORDER BY u.full_name, st.id
+    """), {**params, "generation": pair[0], "day": pair[1]})
+    return {
+        "exams": [exam_a, exam_b],
+        "date": pair[1],
+        "students": [
+            {"id": sid, "name": name, "exams_that_day": count} for sid, name, count in result.fetchall()
+        ],
+    }
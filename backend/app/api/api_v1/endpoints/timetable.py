@@ -1,96 +1,369 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+import sqlalchemy as sa
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app.api import deps
-from app.models.all_models import User, TimetableEntry, Exam, Professor, Student, Module, Enrollment
-from app.schemas.all_schemas import TimetableEntrySchema
+from app.core import cache
+from app.models.all_models import User, TimetableEntry, Exam, Professor, Student, Module, Enrollment, Program, Room, ExamSession
+from app.schemas.all_schemas import TimetableEntrySchema, TimetableEntryUpdate
+from app.db.dashboard_views import refresh_dashboard_views
+from app.db.session import AsyncSessionLocal
 
 router = APIRouter()
 
+# Max change-log rows per /timetable/changes call
+MAX_CHANGES_PAGE = 5000
+# Widest window GET /timetable/range serves (a month view)
+MAX_RANGE_DAYS = 31
+
 @router.get("/", response_model=List[TimetableEntrySchema])
 async def read_timetable(
+    request: Request,
     db = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    after_start_time: Optional[datetime] = None,
+    after_id: Optional[int] = None,
     department_id: Optional[int] = None,
     program_id: Optional[int] = None,
+    session_id: int = Depends(deps.get_exam_session_id),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
-    Retrieve timetable entries.
+    Retrieve timetable entries of an exam session (defaults to the current one),
+    ordered by (start_time, id).
+    Keyset pagination: pass the start_time and id of the last row received as
+    after_start_time / after_id (constant cost per page, unlike skip).
+    Cached per (scope, filters, timetable version); honours If-None-Match.
     """
-    # Join with Exam/Module? Schema expects IDs, so simple select is fine.
-    # API could support filtering by student/prof (based on current_user role)
-    
-    # Main query
-    query = select(TimetableEntry).options(
-        selectinload(TimetableEntry.exam).selectinload(Exam.module).selectinload(Module.program),
-        selectinload(TimetableEntry.room),
-        selectinload(TimetableEntry.supervisor).selectinload(Professor.user)
+    if (after_start_time is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_start_time and after_id go together")
+    profile = current_user.professor_profile
+    scope = cache.user_scope(current_user, profile.department_id if profile else None)
+    after = (after_start_time, after_id) if after_id is not None else None
+    return await cache.cached_response(
+        request, db, "timetable", scope, (session_id, skip, limit, after, department_id, program_id),
+        lambda: _timetable_entries(db, skip, limit, after, department_id, program_id, session_id, current_user),
+    )
+
+
+def _scoped_entries_query(department_id, program_id, session_id, current_user):
+    """Flat projection of the published entries the user may see, or None (nothing visible)"""
+    # Flat column projection (no ORM objects); ix_timetable_generations_keyset covers the
+    # session-wide and program-filtered paths, ix_timetable_generations_supervisor the professor one
+    published = (
+        select(ExamSession.published_generation).where(ExamSession.id == session_id).scalar_subquery()
+    )
+    query = (
+        select(
+            TimetableEntry.id, TimetableEntry.exam_id, TimetableEntry.room_id, TimetableEntry.supervisor_id,
+            TimetableEntry.start_time, TimetableEntry.end_time,
+            Module.name, Room.name, User.full_name,
+        )
+        .select_from(TimetableEntry)
+        .outerjoin(Exam, TimetableEntry.exam_id == Exam.id)
+        .outerjoin(Module, Exam.module_id == Module.id)
+        .outerjoin(Room, TimetableEntry.room_id == Room.id)
+        .outerjoin(Professor, TimetableEntry.supervisor_id == Professor.id)
+        .outerjoin(User, Professor.user_id == User.id)
+        # Partition pruning + an index condition on the published generation
+        .where(TimetableEntry.session_id == session_id, TimetableEntry.generation == published)
     )
     
-    # Filter based on role
+    # Filter based on role (profiles are preloaded by get_current_user)
+    dept_filter = department_id
     if current_user.role == 'student':
         # Show all exams for their program
-        query = query.join(Exam, TimetableEntry.exam_id == Exam.id)\
-                     .join(Module, Exam.module_id == Module.id)\
-                     .join(Program, Module.program_id == Program.id)\
-                     .join(Student, Student.program_id == Program.id)\
-                     .where(Student.user_id == current_user.id)
-                     
+        student = current_user.student_profile
+        query = query.where(Module.program_id == (student.program_id if student else None))
+
     elif current_user.role == 'professor':
-        query = query.join(Professor, TimetableEntry.supervisor_id == Professor.id)\
-                     .where(Professor.user_id == current_user.id)
-                     
+        professor = current_user.professor_profile
+        query = query.where(TimetableEntry.supervisor_id == (professor.id if professor else None))
+
     elif current_user.role == 'head':
-        prof_res = await db.execute(select(Professor).where(Professor.user_id == current_user.id))
-        prof = prof_res.scalars().first()
-        if prof:
-            query = query.join(Exam, TimetableEntry.exam_id == Exam.id)\
-                         .join(Module, Exam.module_id == Module.id)\
-                         .join(Program, Module.program_id == Program.id)\
-                         .where(Program.department_id == prof.department_id)
+        if current_user.professor_profile:
+            if department_id and department_id != current_user.professor_profile.department_id:
+                return None
+            dept_filter = current_user.professor_profile.department_id
         else:
             # Fallback for HOD: if no prof profile, show everything
             print(f"HOD User {current_user.email} has no professor profile! Falling back to global view.")
-            # No additional where clause means they see all exams
-            pass
 
     # Apply global filters on top
-    if department_id:
-        # We might need to join again or use the existing join path
-        # To be safe, we check if already joined to Program
-        if current_user.role not in ['student', 'head']:
-            query = query.join(Exam, TimetableEntry.exam_id == Exam.id)\
-                         .join(Module, Exam.module_id == Module.id)\
-                         .join(Program, Module.program_id == Program.id)
-        query = query.where(Program.department_id == department_id)
-        
+    if dept_filter:
+        query = query.where(Module.program_id.in_(select(Program.id).where(Program.department_id == dept_filter)))
     if program_id:
-        if current_user.role not in ['student', 'head'] and not department_id:
-            query = query.join(Exam, TimetableEntry.exam_id == Exam.id)\
-                         .join(Module, Exam.module_id == Module.id)
         query = query.where(Module.program_id == program_id)
-        
-    result = await db.execute(query.offset(skip).limit(limit).distinct())
-    entries = result.scalars().all()
-    
-    # Transform to schema if needed, but Pydantic orm_mode might need help with deep nesting or properties
-    # Simplest: Map manually or use properties in Pydantic v2
-    # Here we map to dictionary with flat names
-    mapped = []
-    for e in entries:
-        mapped.append({
-            "id": e.id,
-            "exam_id": e.exam_id,
-            "room_id": e.room_id,
-            "supervisor_id": e.supervisor_id,
-            "start_time": e.start_time,
-            "end_time": e.end_time,
-            "status": e.status,
-            "exam_name": e.exam.module.name if e.exam and e.exam.module else f"Exam {e.exam_id}",
-            "room_name": e.room.name if e.room else f"Room {e.room_id}",
-            "supervisor_name": e.supervisor.user.full_name if e.supervisor and e.supervisor.user else f"Prof {e.supervisor_id}"
-        })
-    return mapped
+    return query
+
+
+def _entry_dicts(rows) -> list:
+    return [
+        {
+            "id": entry_id,
+            "exam_id": exam_id,
+            "room_id": room_id,
+            "supervisor_id": supervisor_id,
+            "start_time": start_time,
+            "end_time": end_time,
+            "exam_name": module_name or f"Exam {exam_id}",
+            "room_name": room_name or f"Room {room_id}",
+            "supervisor_name": supervisor_name or f"Prof {supervisor_id}",
+        }
+        for (entry_id, exam_id, room_id, supervisor_id, start_time, end_time,
+             module_name, room_name, supervisor_name) in rows
+    ]
+
+
+async def _timetable_entries(db, skip, limit, after, department_id, program_id, session_id, current_user) -> list:
+    query = _scoped_entries_query(department_id, program_id, session_id, current_user)
+    if query is None:
+        return []
+    if after is not None:
+        query = query.where(sa.tuple_(TimetableEntry.start_time, TimetableEntry.id) > sa.tuple_(*after))
+    query = query.order_by(TimetableEntry.start_time, TimetableEntry.id).limit(limit)
+    if skip:
+        query = query.offset(skip)
+
+    result = await db.execute(query)
+    return _entry_dicts(result.all())
+
+@router.get("/range", response_model=List[TimetableEntrySchema])
+async def read_timetable_range(
+    request: Request,
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    department_id: Optional[int] = None,
+    program_id: Optional[int] = None,
+    db = Depends(deps.get_db),
+    session_id: int = Depends(deps.get_exam_session_id),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Entries starting in [from, to) (dates or datetimes), for day and week views,
+    with the same role scoping and filters as GET /timetable. At most MAX_RANGE_DAYS wide.
+    A range scan of ix_timetable_generations_keyset inside the published generation.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if end - start > timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
+
+    async def compute():
+        query = _scoped_entries_query(department_id, program_id, session_id, current_user)
+        if query is None:
+            return []
+        result = await db.execute(
+            query.where(TimetableEntry.start_time >= start, TimetableEntry.start_time < end)
+            .order_by(TimetableEntry.start_time, TimetableEntry.id)
+        )
+        return _entry_dicts(result.all())
+
+    profile = current_user.professor_profile
+    scope = cache.user_scope(current_user, profile.department_id if profile else None)
+    return await cache.cached_response(
+        request, db, "timetable-range", scope, (session_id, start, end, department_id, program_id), compute
+    )
+
+@router.get("/changes", response_model=dict)
+async def read_timetable_changes(
+    request: Request,
+    since: int = 0,
+    limit: int = 1000,
+    department_id: Optional[int] = None,
+    program_id: Optional[int] = None,
+    db = Depends(deps.get_db),
+    session_id: int = Depends(deps.get_exam_session_id),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Incremental sync of the published timetable (same scope and filters as GET /timetable).
+    Returns the entries changed after change version `since`:
+    - changed: ids of every changed entry; entries: current rows of those still visible
+      (a changed id missing from entries was deleted or left the user's scope)
+    - version: pass it as `since` next time; has_more: call again right away
+    - reset: a new generation was published since `since` (or since=0): refetch /timetable
+    """
+    limit = max(1, min(limit, MAX_CHANGES_PAGE))
+
+    async def compute():
+        marks = await db.execute(sa.text("""
+            SELECT MAX(id) FILTER (WHERE op = 'reset'), MAX(id)
+            FROM timetable_changes WHERE session_id = :sid
+        """), {"sid": session_id})
+        reset_id, latest = marks.one()
+        if latest is None or since < (reset_id or 0) or since > latest:
+            return {"version": latest or 0, "reset": True, "has_more": False, "changed": [], "entries": []}
+
+        result = await db.execute(sa.text("""
+            SELECT id, entry_id FROM timetable_changes
+            WHERE session_id = :sid AND id > :since AND op <> 'reset'
+            ORDER BY id
+            LIMIT :limit
+        """), {"sid": session_id, "since": since, "limit": limit + 1})
+        rows = result.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        changed = sorted({entry_id for _, entry_id in rows})
+
+        entries = []
+        query = _scoped_entries_query(department_id, program_id, session_id, current_user)
+        if changed and query is not None:
+            visible = await db.execute(query.where(TimetableEntry.id.in_(changed)).order_by(TimetableEntry.id))
+            entries = _entry_dicts(visible.all())
+        return {
+            "version": rows[-1][0] if rows else latest,
+            "reset": False,
+            "has_more": has_more,
+            "changed": changed,
+            "entries": entries,
+        }
+
+    profile = current_user.professor_profile
+    scope = cache.user_scope(current_user, profile.department_id if profile else None)
+    return await cache.cached_response(
+        request, db, "timetable-changes", scope, (session_id, since, limit, department_id, program_id), compute
+    )
+
+@router.get("/me", response_model=List[dict])
+async def read_my_schedule(
+    request: Request,
+    db = Depends(deps.get_db),
+    session_id: int = Depends(deps.get_exam_session_id),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Personal exam schedule of the logged-in student: the exams of the modules they are
+    enrolled in. One index-only range scan on student_exam_schedule, cached per student
+    and timetable version.
+    """
+    student = current_user.student_profile
+    if current_user.role != 'student' or not student:
+        raise HTTPException(status_code=403, detail="Only students have a personal exam schedule")
+
+    async def compute():
+        result = await db.execute(sa.text("""
+            SELECT exam_id, module_name, start_time, end_time, room_id, room_name
+            FROM student_exam_schedule
+            WHERE session_id = :sid
+              AND generation = (SELECT published_generation FROM exam_sessions WHERE id = :sid)
+              AND student_id = :student_id
+            ORDER BY start_time, exam_id
+        """), {"sid": session_id, "student_id": student.id})
+        return [
+            {
+                "exam_id": row[0],
+                "exam_name": row[1] or f"Exam {row[0]}",
+                "start_time": row[2],
+                "end_time": row[3],
+                "room_id": row[4],
+                "room_name": row[5] or f"Room {row[4]}",
+            }
+            for row in result.fetchall()
+        ]
+
+    return await cache.cached_response(
+        request, db, "timetable-me", cache.user_scope(current_user), (session_id,), compute
+    )
+
+@router.put("/{entry_id}", response_model=dict)
+async def update_timetable_entry(
+    entry_id: int,
+    data: TimetableEntryUpdate,
+    background_tasks: BackgroundTasks,
+    session_id: int = Depends(deps.get_exam_session_id),
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Manually move / reassign a published entry (Admin only).
+    Rescheduling recomputes this exam's rows in timetable_conflicts (trigger).
+    """
+    result = await db.execute(
+        select(TimetableEntry)
+        .options(selectinload(TimetableEntry.exam))
+        .where(TimetableEntry.session_id == session_id, TimetableEntry.id == entry_id)
+    )
+    entry = result.scalars().first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Timetable entry not found")
+
+    if data.start_time is not None:
+        duration = entry.exam.duration_minutes if entry.exam and entry.exam.duration_minutes else 90
+        entry.start_time = data.start_time
+        entry.end_time = data.start_time + timedelta(minutes=duration)
+    if data.room_id is not None:
+        entry.room_id = data.room_id
+    if data.supervisor_id is not None:
+        entry.supervisor_id = data.supervisor_id
+    await db.commit()
+    await cache.bump_version(db)
+
+    conflicts = await db.execute(sa.text("""
+        SELECT COUNT(*) FROM timetable_conflicts
+        WHERE session_id = :sid AND generation = :gen AND (exam_a = :exam_id OR exam_b = :exam_id)
+    """), {"sid": session_id, "gen": entry.generation, "exam_id": entry.exam_id})
+    background_tasks.add_task(refresh_dashboard_views, AsyncSessionLocal)
+    return {
+        "id": entry.id,
+        "exam_id": entry.exam_id,
+        "room_id": entry.room_id,
+        "supervisor_id": entry.supervisor_id,
+        "start_time": entry.start_time,
+        "end_time": entry.end_time,
+        "status": entry.status,
+        "same_day_conflicts": conflicts.scalar(),
+    }
+
+@router.get("/seating/rooms/{room_id}", response_model=List[dict])
+async def read_room_seating(
+    room_id: int,
+    exam_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    session_id: int = Depends(deps.get_exam_session_id),
+    db = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Seating chart of a room, one block per exam, paginated in seat order
+    (served by ix_seat_assignments_room_chart).
+    """
+    if current_user.role == 'student':
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    exam_filter = ""
+    params = {"room_id": room_id, "session_id": session_id, "skip": skip, "limit": min(limit, 500)}
+    if exam_id is not None:
+        exam_filter = "AND sa.exam_id = :exam_id"
+        params["exam_id"] = exam_id
+
+    query = f"""
+        SELECT sa.exam_id, m.name, t.start_time, sa.seat_index, sa.student_id, u.full_name
+        FROM seat_assignments sa
+        JOIN timetable_entries t ON t.session_id = sa.session_id AND t.generation = sa.generation AND t.exam_id = sa.exam_id
+        JOIN exams e ON e.id = sa.exam_id
+        JOIN modules m ON m.id = e.module_id
+        JOIN students s ON s.id = sa.student_id
+        JOIN users u ON u.id = s.user_id
+        WHERE sa.session_id = :session_id
+          AND sa.generation = (SELECT published_generation FROM exam_sessions WHERE id = :session_id)
+          AND sa.room_id = :room_id {exam_filter}
+        ORDER BY sa.exam_id, sa.seat_index
+        OFFSET :skip LIMIT :limit
+    """
+    result = await db.execute(sa.text(query), params)
+    return [
+        {
+            "exam_id": row[0],
+            "exam_name": row[1],
+            "start_time": row[2],
+            "seat_index": row[3],
+            "student_id": row[4],
+            "student_name": row[5],
+        }
+        for row in result.fetchall()
+    ]
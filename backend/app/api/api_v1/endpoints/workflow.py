@@ -1,8 +1,11 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
 from app.api import deps
+from app.core.cache import bump_version
+from app.db.dashboard_views import refresh_dashboard_views, STATUS_VIEWS
+from app.db.session import AsyncSessionLocal
 from app.models.all_models import User, TimetableEntry, Exam, Module, Program, Department, Professor
 
 router = APIRouter()
@@ -10,6 +13,8 @@ router = APIRouter()
 @router.post("/validate-dept/{dept_id}")
 async def validate_by_head(
     dept_id: int,
+    background_tasks: BackgroundTasks,
+    session_id: int = Depends(deps.get_exam_session_id),
     db = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
@@ -30,6 +35,7 @@ async def validate_by_head(
     # TimetableEntry -> Exam -> Module -> Program -> Department
     stmt = (
         update(TimetableEntry)
+        .where(TimetableEntry.session_id == session_id)
         .where(TimetableEntry.exam_id.in_(
             select(Exam.id)
             .join(Module)
@@ -40,31 +46,40 @@ async def validate_by_head(
     )
     await db.execute(stmt)
     await db.commit()
+    await bump_version(db)
+    # Status counts on the dashboard are materialized
+    background_tasks.add_task(refresh_dashboard_views, AsyncSessionLocal, STATUS_VIEWS)
     return {"message": f"Department {dept_id} validated successfully"}
 
 @router.post("/approve-final")
 async def approve_by_dean(
+    background_tasks: BackgroundTasks,
+    session_id: int = Depends(deps.get_exam_session_id),
     db = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
     Final approval by Dean or Vice-Dean.
     Marks all DEPT_APPROVED entries as FINAL_APPROVED.
+    The static JSON shards are exported at frontend deploy time (export_static.py), not here.
     """
     if current_user.role not in ['dean', 'vice_dean']:
         raise HTTPException(status_code=403, detail="Only Dean or Vice-Dean can approve")
 
     stmt = (
         update(TimetableEntry)
-        .where(TimetableEntry.status == "DEPT_APPROVED")
+        .where(TimetableEntry.session_id == session_id, TimetableEntry.status == "DEPT_APPROVED")
         .values(status="FINAL_APPROVED")
     )
     await db.execute(stmt)
     await db.commit()
+    await bump_version(db)
+    background_tasks.add_task(refresh_dashboard_views, AsyncSessionLocal, STATUS_VIEWS)
     return {"message": "All department-validated entries are now final"}
 
 @router.get("/status-summary")
 async def get_workflow_status(
+    session_id: int = Depends(deps.get_exam_session_id),
     db = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
@@ -76,6 +91,8 @@ async def get_workflow_status(
 
     # Count entries by status
     from sqlalchemy import func
-    result = await db.execute(select(TimetableEntry.status, func.count(TimetableEntry.id)).group_by(TimetableEntry.status))
+    result = await db.execute(select(TimetableEntry.status, func.count(TimetableEntry.id))
+                              .where(TimetableEntry.session_id == session_id)
+                              .group_by(TimetableEntry.status))
     counts = {row[0]: row[1] for row in result.all()}
     return counts
@@ -6,7 +6,7 @@ from pydantic import ValidationError
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app.db.session import AsyncSessionLocal
-from app.models.all_models import User
+from app.models.all_models import User, ExamSession
 from app.core import security
 import os
 
@@ -48,3 +48,14 @@ async def get_current_active_superuser(
             status_code=400, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+async def get_exam_session_id(session_id: Optional[int] = None, db = Depends(get_db)) -> int:
+    """Exam session a request targets: the ?session_id= one, or the current session"""
+    if session_id is None:
+        result = await db.execute(select(ExamSession.id).where(ExamSession.is_current))
+    else:
+        result = await db.execute(select(ExamSession.id).where(ExamSession.id == session_id))
+    found = result.scalar()
+    if found is None:
+        raise HTTPException(status_code=404, detail="Exam session not found")
+    return found
@@ -0,0 +1,117 @@
+"""
+Versioned response cache for the read-heavy timetable / dashboard endpoints.
+
+Entries are keyed by (endpoint, user scope, parameters, timetable version).
+The version is a Postgres sequence shared by every worker: anything that changes
+what these endpoints return (engine publish, workflow approvals, manage writes)
+calls bump_version, so stale entries are simply never looked up again and age
+out of the LRU. Enrollment writes, which don't go through the API, bump it from
+a statement trigger instead; that bump happens before the writer commits, so a
+response built in between can be cached under the new version with the old
+enrollments until the next bump. The ETag is derived from the key, so a client revalidating with
+If-None-Match gets a 304 without the response being rebuilt.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+import sqlalchemy as sa
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+# Seconds a memoized version may be reused without asking the database (memoized_version)
+VERSION_TTL = float(os.getenv("CACHE_VERSION_TTL", "15"))
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+
+async def current_version(db) -> int:
+    result = await db.execute(sa.text("SELECT last_value FROM timetable_version_seq"))
+    return result.scalar()
+
+
+_version_memo = {"value": None, "checked": 0.0}
+
+
+async def memoized_version(session_factory) -> int:
+    """
+    current_version read at most once per VERSION_TTL seconds per worker, for
+    unauthenticated high-frequency pollers (calendar feeds) where a cache hit must
+    not touch the database. Changes show up with up to VERSION_TTL seconds of delay.
+    """
+    now = time.monotonic()
+    if _version_memo["value"] is None or now - _version_memo["checked"] > VERSION_TTL:
+        async with session_factory() as session:
+            _version_memo["value"] = await current_version(session)
+        _version_memo["checked"] = now
+    return _version_memo["value"]
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    return etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+
+
+async def bump_version(db) -> int:
+    """Invalidate every cached response (nextval is not transactional: call it after the commit)"""
+    result = await db.execute(sa.text("SELECT nextval('timetable_version_seq')"))
+    return result.scalar()
+
+
+def user_scope(user, dept_id: Optional[int] = None) -> Tuple:
+    """What a user is allowed to see: own rows for students/professors, a department for heads"""
+    if user.role in ('student', 'professor'):
+        return (user.role, user.id)
+    if user.role == 'head':
+        return (user.role, dept_id)
+    return (user.role,)
+
+
+def make_etag(key: Hashable) -> str:
+    return '"' + hashlib.sha1(repr(key).encode()).hexdigest() + '"'
+
+
+async def cached_response(
+    request: Request,
+    db,
+    endpoint: str,
+    scope: Tuple,
+    params: Tuple,
+    compute: Callable[[], Awaitable[Any]],
+) -> Response:
+    key = (endpoint, scope, params, await current_version(db))
+    etag = make_etag(key)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key)
+    if body is None:
+        body = json.dumps(jsonable_encoder(await compute())).encode()
+        response_cache.put(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,81 @@
+"""
+Minimal iCalendar (RFC 5545) writer for the exam feeds, plus the feed URL tokens.
+
+Tokens are an HMAC of (feed kind, owner id) with the app secret: calendar clients
+cannot send a JWT, and checking a token needs no database access.
+"""
+import hashlib
+import hmac
+import os
+from datetime import datetime
+from typing import Iterable, Optional
+from app.core.security import SECRET_KEY
+
+# Changing the salt revokes every feed URL handed out so far
+FEED_TOKEN_SALT = os.getenv("ICS_FEED_TOKEN_SALT", "ics-v1")
+FEED_KINDS = ("student", "professor", "room")
+PRODID = "-//Exam Timetable Platform//Exams//FR"
+
+
+def feed_token(kind: str, owner_id: int) -> str:
+    message = f"{FEED_TOKEN_SALT}:{kind}:{owner_id}".encode()
+    return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def check_feed_token(kind: str, owner_id: int, token: str) -> bool:
+    return hmac.compare_digest(feed_token(kind, owner_id), token or "")
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    """Content lines are limited to 75 octets; continuation lines start with a space"""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line + "\r\n"
+    out, chunk = [], b""
+    for char in line:
+        encoded = char.encode()
+        if len(chunk) + len(encoded) > (75 if not out else 74):
+            out.append(chunk.decode())
+            chunk = b""
+        chunk += encoded
+    out.append(chunk.decode())
+    return "\r\n ".join(out) + "\r\n"
+
+
+def _stamp(value: datetime) -> str:
+    # Timetable times are stored naive (local); emitted as floating local times
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def calendar_header(name: str) -> str:
+    return "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH", f"X-WR-CALNAME:{_escape(name)}",
+    ))
+
+
+def calendar_footer() -> str:
+    return "END:VCALENDAR\r\n"
+
+
+def vevent(uid: str, start: datetime, end: Optional[datetime], summary: str,
+           location: Optional[str], dtstamp: datetime, description: Optional[str] = None) -> str:
+    lines: Iterable[str] = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{dtstamp.strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART:{_stamp(start)}",
+    ]
+    if end:
+        lines.append(f"DTEND:{_stamp(end)}")
+    lines.append(f"SUMMARY:{_escape(summary)}")
+    if location:
+        lines.append(f"LOCATION:{_escape(location)}")
+    if description:
+        lines.append(f"DESCRIPTION:{_escape(description)}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
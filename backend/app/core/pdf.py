@@ -0,0 +1,103 @@
+"""
+Minimal text-only PDF writer for the printed documents (door sheets, convocations).
+
+Only what those documents need: A4 pages, Helvetica / Helvetica-Bold (standard
+fonts, nothing embedded), WinAnsi text laid out top-down with automatic page
+breaks and fixed-width table columns. Page streams are Flate-compressed.
+A document renders in about a millisecond, and is plain bytes, so it can be
+produced in a worker process.
+"""
+import zlib
+from typing import List, Optional, Sequence
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4, points
+MARGIN = 50
+LINE_SPACING = 1.35
+# Average Helvetica glyph width as a fraction of the font size (used to clip table cells)
+AVG_CHAR_WIDTH = 0.5
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _clip(text: str, width: float, size: float) -> str:
+    max_chars = max(1, int(width / (size * AVG_CHAR_WIDTH)))
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+
+class PdfWriter:
+    def __init__(self, title: str = ""):
+        self.title = title
+        self._pages: List[List[bytes]] = []
+        self._y = 0.0
+        self.new_page()
+
+    def new_page(self):
+        self._pages.append([])
+        self._y = PAGE_HEIGHT - MARGIN
+
+    def _ensure(self, height: float):
+        if self._y - height < MARGIN:
+            self.new_page()
+
+    def _draw(self, x: float, text: str, size: float, bold: bool):
+        font = b"/F2" if bold else b"/F1"
+        self._pages[-1].append(
+            b"BT " + font + b" %g Tf %g %g Td " % (size, x, self._y) + _pdf_string(text) + b" Tj ET"
+        )
+
+    def text(self, text: str, size: float = 10, bold: bool = False, indent: float = 0):
+        height = size * LINE_SPACING
+        self._ensure(height)
+        self._y -= height
+        self._draw(MARGIN + indent, _clip(text, PAGE_WIDTH - 2 * MARGIN - indent, size), size, bold)
+
+    def heading(self, text: str, size: float = 16):
+        self.text(text, size=size, bold=True)
+        self.space(size * 0.5)
+
+    def row(self, cells: Sequence[Optional[str]], widths: Sequence[float], size: float = 10, bold: bool = False):
+        height = size * LINE_SPACING
+        self._ensure(height)
+        self._y -= height
+        x = MARGIN
+        for cell, width in zip(cells, widths):
+            if cell:
+                self._draw(x, _clip(str(cell), width - 4, size), size, bold)
+            x += width
+
+    def space(self, height: float = 8):
+        self._y -= height
+
+    def render(self) -> bytes:
+        objects: List[bytes] = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"",  # Pages, filled once the page objects are numbered
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+            b"<< /Title " + _pdf_string(self.title) + b" /Producer (Exam Timetable Platform) >>",
+        ]
+        page_ids = []
+        for ops in self._pages:
+            stream = zlib.compress(b"\n".join(ops))
+            objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            content_id = len(objects)
+            objects.append(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] " % (PAGE_WIDTH, PAGE_HEIGHT)
+                + b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>" % content_id
+            )
+            page_ids.append(len(objects))
+        objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % i for i in page_ids) + b"] /Count %d >>" % len(page_ids)
+
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+        out += b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+        return bytes(out)
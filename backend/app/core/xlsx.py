@@ -0,0 +1,157 @@
+"""
+Minimal streaming XLSX (SpreadsheetML) writer for the bulk exports.
+
+The workbook has a single sheet. Rows are written as inline strings / numbers
+straight into the sheet part of a zip opened on a write-only sink, and every
+call returns the compressed bytes produced so far. Memory stays constant
+whatever the row count and the download starts with the first rows.
+"""
+import re
+import zipfile
+from datetime import date, datetime
+from typing import Iterable, List, Sequence
+from xml.sax.saxutils import escape
+
+_EPOCH = datetime(1899, 12, 30)
+# Characters XML 1.0 does not allow (control chars other than tab / newline / CR)
+_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# Style ids of cellXfs in STYLES: 0 default, 1 date + time, 2 date
+_STYLE_DATETIME = 1
+_STYLE_DATE = 2
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+    '<cellXfs count="3"><xf/>'
+    '<xf numFmtId="164" applyNumberFormat="1"/>'
+    '<xf numFmtId="14" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def _workbook(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31], {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _cell(value) -> str:
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        serial = (value.replace(tzinfo=None) - _EPOCH).total_seconds() / 86400
+        return f'<c s="{_STYLE_DATETIME}"><v>{serial}</v></c>'
+    if isinstance(value, date):
+        return f'<c s="{_STYLE_DATE}"><v>{(value - _EPOCH.date()).days}</v></c>'
+    text = _ILLEGAL.sub("", escape(str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(values: Iterable) -> str:
+    return '<row>' + ''.join(_cell(value) for value in values) + '</row>'
+
+
+class StreamSink:
+    """Write-only, non-seekable file object: zipfile then streams entries with data descriptors"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class XlsxStreamWriter:
+    """
+    writer = XlsxStreamWriter("Sheet", header)
+    yield writer.start(); yield writer.write_rows(chunk) ...; yield writer.close()
+    """
+
+    def __init__(self, sheet_name: str, header: Sequence[str]):
+        self.sheet_name = sheet_name
+        self.header = header
+        self._sink = StreamSink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=zipfile.ZIP_DEFLATED)
+        self._sheet = None
+
+    def start(self) -> bytes:
+        self._zip.writestr("[Content_Types].xml", CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", _workbook(self.sheet_name))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        self._zip.writestr("xl/styles.xml", STYLES)
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._sheet.write(SHEET_HEADER.encode())
+        self._sheet.write(_row(self.header).encode())
+        return self._sink.drain()
+
+    def write_rows(self, rows: Iterable[Sequence]) -> bytes:
+        self._sheet.write("".join(_row(row) for row in rows).encode())
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._sheet.write(SHEET_FOOTER.encode())
+        self._sheet.close()
+        self._zip.close()
+        return self._sink.drain()
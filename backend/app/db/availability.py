@@ -0,0 +1,164 @@
+"""
+In-memory availability index of the published timetable (free rooms / supervisors per slot).
+
+Rooms are numbered by decreasing capacity and professors by id, and every
+(date, slot) keeps a bitset of the busy ones, built from the entries' time
+intervals (an entry marks every slot it overlaps, so manually moved off-grid
+entries count too) and, for supervisors, the declared unavailability.
+"Rooms with >= N seats free at (date, slot)" is then a prefix mask (bisect on
+the capacities) minus the busy bitset: microseconds, whatever the timetable size.
+
+Each worker keeps the indexes of the last few sessions queried (LRU), each one
+rebuilt when the timetable version (app.core.cache) changes.
+"""
+import asyncio
+import os
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import sqlalchemy as sa
+from app.algos.engine import DAY_START, SLOT_OFFSETS
+from app.core.cache import LRUCache, current_version
+
+# Length of one exam slot (engine default exam duration)
+SLOT_MINUTES = 90
+# Sessions whose index a worker keeps at once
+AVAILABILITY_INDEX_SESSIONS = int(os.getenv("AVAILABILITY_INDEX_SESSIONS", "4"))
+
+
+def slot_bounds(day: date, slot: int) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, datetime.min.time()) + DAY_START + timedelta(minutes=SLOT_OFFSETS[slot])
+    return start, start + timedelta(minutes=SLOT_MINUTES)
+
+
+def _bits(mask: int) -> List[int]:
+    """Positions of the set bits, lowest first"""
+    positions = []
+    while mask:
+        low = mask & -mask
+        positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+@dataclass
+class AvailabilityIndex:
+    session_id: int
+    version: int
+    # Rooms by decreasing capacity (bit i = room_ids[i]); capacities negated for bisect
+    room_ids: List[int] = field(default_factory=list)
+    room_names: List[str] = field(default_factory=list)
+    room_capacities: List[int] = field(default_factory=list)
+    _neg_capacities: List[int] = field(default_factory=list)
+    # Professors by id (bit j = professor_ids[j])
+    professor_ids: List[int] = field(default_factory=list)
+    professor_names: List[str] = field(default_factory=list)
+    department_masks: Dict[int, int] = field(default_factory=dict)
+    busy_rooms: Dict[Tuple[date, int], int] = field(default_factory=dict)
+    busy_supervisors: Dict[Tuple[date, int], int] = field(default_factory=dict)
+
+    def _mark(self, busy: Dict[Tuple[date, int], int], bit: int, start: datetime, end: Optional[datetime]):
+        end = end or start + timedelta(minutes=SLOT_MINUTES)
+        day = start.date()
+        while day <= end.date():
+            for slot in range(len(SLOT_OFFSETS)):
+                slot_start, slot_end = slot_bounds(day, slot)
+                if start < slot_end and end > slot_start:
+                    busy[(day, slot)] = busy.get((day, slot), 0) | (1 << bit)
+            day += timedelta(days=1)
+
+    def free_rooms(self, day: date, slot: int, min_capacity: int = 0) -> int:
+        """Bitset of the free rooms with at least min_capacity seats"""
+        eligible = bisect_right(self._neg_capacities, -min_capacity)
+        return ((1 << eligible) - 1) & ~self.busy_rooms.get((day, slot), 0)
+
+    def free_supervisors(self, day: date, slot: int, department_id: Optional[int] = None) -> int:
+        if department_id is None:
+            eligible = (1 << len(self.professor_ids)) - 1
+        else:
+            eligible = self.department_masks.get(department_id, 0)
+        return eligible & ~self.busy_supervisors.get((day, slot), 0)
+
+    def rooms(self, mask: int) -> List[dict]:
+        """Rooms of a bitset, largest first"""
+        return [
+            {"id": self.room_ids[i], "name": self.room_names[i], "capacity": self.room_capacities[i]}
+            for i in _bits(mask)
+        ]
+
+    def supervisors(self, mask: int) -> List[dict]:
+        return [{"id": self.professor_ids[j], "name": self.professor_names[j]} for j in _bits(mask)]
+
+
+async def build_index(db, session_id: int, version: int) -> AvailabilityIndex:
+    start = time.time()
+    index = AvailabilityIndex(session_id=session_id, version=version)
+
+    rooms = await db.execute(sa.text("SELECT id, name, capacity FROM rooms ORDER BY capacity DESC NULLS LAST, id"))
+    room_bits = {}
+    for room_id, name, capacity in rooms.fetchall():
+        room_bits[room_id] = len(index.room_ids)
+        index.room_ids.append(room_id)
+        index.room_names.append(name)
+        index.room_capacities.append(capacity or 0)
+    index._neg_capacities = [-capacity for capacity in index.room_capacities]
+
+    professors = await db.execute(sa.text("""
+        SELECT pr.id, u.full_name, pr.department_id
+        FROM professors pr JOIN users u ON u.id = pr.user_id
+        ORDER BY pr.id
+    """))
+    prof_bits = {}
+    for prof_id, name, department_id in professors.fetchall():
+        bit = prof_bits[prof_id] = len(index.professor_ids)
+        index.professor_ids.append(prof_id)
+        index.professor_names.append(name)
+        if department_id is not None:
+            index.department_masks[department_id] = index.department_masks.get(department_id, 0) | (1 << bit)
+
+    entries = await db.execute(sa.text("""
+        SELECT room_id, supervisor_id, start_time, end_time
+        FROM timetable_entries
+        WHERE session_id = :sid AND start_time IS NOT NULL
+    """), {"sid": session_id})
+    count = 0
+    for room_id, supervisor_id, start_time, end_time in entries.fetchall():
+        count += 1
+        if room_id in room_bits:
+            index._mark(index.busy_rooms, room_bits[room_id], start_time, end_time)
+        if supervisor_id in prof_bits:
+            index._mark(index.busy_supervisors, prof_bits[supervisor_id], start_time, end_time)
+
+    unavailable = await db.execute(sa.text("SELECT professor_id, date, slot FROM professor_unavailability"))
+    for prof_id, day, slot in unavailable.fetchall():
+        if prof_id not in prof_bits:
+            continue
+        for s in (range(len(SLOT_OFFSETS)) if slot is None else [slot]):
+            key = (day, s)
+            index.busy_supervisors[key] = index.busy_supervisors.get(key, 0) | (1 << prof_bits[prof_id])
+
+    print(f"Availability index built for session {session_id} (version {version}): "
+          f"{len(index.room_ids)} rooms, {len(index.professor_ids)} professors, {count} entries "
+          f"in {time.time() - start:.2f}s.")
+    return index
+
+
+_indexes = LRUCache(AVAILABILITY_INDEX_SESSIONS)
+# One build at a time per session; other sessions are served meanwhile
+_build_locks: Dict[int, asyncio.Lock] = {}
+
+
+async def get_index(db, session_id: int) -> AvailabilityIndex:
+    """Index of the session at the current timetable version (rebuilt at most once per version)"""
+    version = await current_version(db)
+    index = _indexes.get(session_id)
+    if index is not None and index.version == version:
+        return index
+    async with _build_locks.setdefault(session_id, asyncio.Lock()):
+        index = _indexes.get(session_id)
+        if index is None or index.version != version:
+            index = await build_index(db, session_id, version)
+            _indexes.put(session_id, index)
+    return index
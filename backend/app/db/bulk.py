@@ -0,0 +1,55 @@
+"""
+Bulk write helpers (COPY FROM STDIN) working with both async drivers
+the app can run on: psycopg (default URL) and asyncpg.
+"""
+from typing import Iterable, List, Sequence
+
+# Rows per COPY write call (keeps the text buffer small)
+COPY_BATCH = 10000
+
+
+def _copy_field(value) -> str:
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+async def copy_rows(session, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+    """
+    COPY rows into table inside the session's current transaction.
+    Returns the number of rows written. The caller commits.
+    """
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    driver = raw.driver_connection
+    written = 0
+
+    if hasattr(driver, "copy_records_to_table"):
+        # asyncpg
+        batch: List[tuple] = []
+        for row in rows:
+            batch.append(tuple(row))
+            if len(batch) >= COPY_BATCH:
+                await driver.copy_records_to_table(table, records=batch, columns=list(columns))
+                written += len(batch)
+                batch = []
+        if batch:
+            await driver.copy_records_to_table(table, records=batch, columns=list(columns))
+            written += len(batch)
+        return written
+
+    # psycopg 3: feed tab-separated text in batches
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    async with driver.cursor() as cur:
+        async with cur.copy(sql) as copy:
+            lines: List[str] = []
+            for row in rows:
+                lines.append("\t".join(map(_copy_field, row)))
+                if len(lines) >= COPY_BATCH:
+                    await copy.write("\n".join(lines) + "\n")
+                    written += len(lines)
+                    lines = []
+            if lines:
+                await copy.write("\n".join(lines) + "\n")
+                written += len(lines)
+    return written
@@ -0,0 +1,26 @@
+"""
+Materialized dashboard aggregates (created by migration d4a1b7e3f5c8).
+
+/stats/dashboard-kpi reads these instead of aggregating the timetable on every
+load. They are refreshed CONCURRENTLY, so dashboard reads never block, when a
+timetable generation is published and when the validation workflow changes
+entry statuses. Each refresh bumps the response cache version.
+"""
+from typing import Sequence
+import time
+import sqlalchemy as sa
+from app.core.cache import bump_version
+
+DASHBOARD_VIEWS = ("mv_timetable_kpi", "mv_program_kpi", "mv_room_usage", "mv_exams_per_day", "mv_prof_load")
+# Views that depend on timetable_entries.status only
+STATUS_VIEWS = ("mv_timetable_kpi",)
+
+
+async def refresh_dashboard_views(session_factory, views: Sequence[str] = DASHBOARD_VIEWS):
+    start = time.time()
+    async with session_factory() as session:
+        for name in views:
+            await session.execute(sa.text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+        await session.commit()
+        await bump_version(session)
+    print(f"Dashboard views refreshed ({', '.join(views)}) in {time.time() - start:.2f}s.")
@@ -0,0 +1,316 @@
+"""
+Printed documents of an exam session: one door sheet per room (its exams and
+the seat list of each) and one convocation per student (their exams, rooms and
+seats), rendered from the published timetable and seating plan.
+
+Rows are streamed from the database grouped by room / by program, and each
+group becomes a task for the process pool (one task per room, one per batch of
+CONVOCATION_BATCH students of a program), so rendering uses every core while
+at most a few groups are held in memory. Workers return the PDFs, which are
+stored in document_files next to the job's row in document_jobs: any API
+worker or instance can report the progress and stream the bundle, and a
+restart loses nothing but the jobs that were running.
+"""
+import asyncio
+import os
+import time
+import uuid
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+import sqlalchemy as sa
+from app.core.pdf import PdfWriter
+from app.core.xlsx import StreamSink
+
+# Size of the rendering pool, shared by all the jobs of the API process
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", str(os.cpu_count() or 2)))
+# Students per convocation task
+CONVOCATION_BATCH = 200
+# Rows per server-side cursor fetch
+DOCUMENT_CHUNK = 5000
+# Seconds between two progress / file flushes while running
+PROGRESS_INTERVAL = 1.0
+# A running job without progress for that long was lost with its process (restart, crash)
+JOB_STALE_SECONDS = 600
+DOCUMENT_KINDS = ("rooms", "convocations")
+
+ROOM_SHEETS_SQL = """
+    SELECT t.room_id, r.name, r.capacity, t.exam_id, m.name, t.start_time, t.end_time, su.full_name,
+           sa.seat_index, u.full_name, p.name
+    FROM timetable_entries t
+    JOIN rooms r ON r.id = t.room_id
+    JOIN exams e ON e.id = t.exam_id
+    JOIN modules m ON m.id = e.module_id
+    LEFT JOIN professors pr ON pr.id = t.supervisor_id
+    LEFT JOIN users su ON su.id = pr.user_id
+    LEFT JOIN seat_assignments sa
+      ON sa.session_id = t.session_id AND sa.generation = t.generation
+     AND sa.exam_id = t.exam_id AND sa.room_id = t.room_id
+    LEFT JOIN students s ON s.id = sa.student_id
+    LEFT JOIN users u ON u.id = s.user_id
+    LEFT JOIN programs p ON p.id = s.program_id
+    WHERE t.session_id = :sid
+    ORDER BY t.room_id, t.start_time, t.exam_id, sa.seat_index
+"""
+CONVOCATIONS_SQL = """
+    SELECT st.program_id, p.name, ses.student_id, u.full_name,
+           ses.start_time, ses.end_time, ses.module_name, ses.room_name, sa.seat_index
+    FROM student_exam_schedule ses
+    JOIN exam_sessions es ON es.id = ses.session_id AND es.published_generation = ses.generation
+    JOIN students st ON st.id = ses.student_id
+    JOIN users u ON u.id = st.user_id
+    JOIN programs p ON p.id = st.program_id
+    LEFT JOIN seat_assignments sa
+      ON sa.session_id = ses.session_id AND sa.generation = ses.generation
+     AND sa.exam_id = ses.exam_id AND sa.student_id = ses.student_id
+    WHERE ses.session_id = :sid
+    ORDER BY st.program_id, ses.student_id, ses.start_time, ses.exam_id
+"""
+COUNT_SQL = {
+    "rooms": "SELECT COUNT(DISTINCT room_id) FROM timetable_entries WHERE session_id = :sid",
+    "convocations": """
+        SELECT COUNT(DISTINCT ses.student_id) FROM student_exam_schedule ses
+        JOIN exam_sessions es ON es.id = ses.session_id AND es.published_generation = ses.generation
+        WHERE ses.session_id = :sid
+    """,
+}
+
+
+def _slot(start: Optional[datetime], end: Optional[datetime]) -> Tuple[str, str]:
+    if start is None:
+        return "", ""
+    return start.strftime("%d/%m/%Y"), start.strftime("%H:%M") + (f" - {end.strftime('%H:%M')}" if end else "")
+
+
+# --- Rendering (runs in the worker processes) ---
+
+def render_room_sheet(session_name: str, room: tuple, exams: list) -> List[Tuple[str, bytes]]:
+    """room = (room_id, name, capacity); exams = [(exam_id, module, start, end, supervisor, [(seat, student, program)])]"""
+    room_id, room_name, capacity = room
+    pdf = PdfWriter(f"{room_name} - {session_name}")
+    pdf.heading(f"Salle {room_name or room_id}")
+    pdf.text(f"{session_name} | Capacité : {capacity or '-'}", size=11)
+    for exam_id, module, start, end, supervisor, seats in exams:
+        day, hours = _slot(start, end)
+        pdf.space(12)
+        pdf.text(f"{module or f'Exam {exam_id}'} | {day} {hours}", size=12, bold=True)
+        pdf.text(f"Surveillant : {supervisor or '-'} | {len(seats)} étudiant(s)", size=10)
+        pdf.space(4)
+        pdf.row(["Place", "Étudiant", "Formation"], [50, 260, 185], bold=True)
+        for seat_index, student, program in seats:
+            pdf.row([str(seat_index + 1), student, program], [50, 260, 185])
+    return [(f"rooms/room_{room_id}.pdf", pdf.render())]
+
+
+def render_convocations(session_name: str, program: tuple, students: list) -> List[Tuple[str, bytes]]:
+    """program = (program_id, name); students = [(student_id, name, [(start, end, module, room, seat)])]"""
+    program_id, program_name = program
+    files = []
+    for student_id, student_name, exams in students:
+        pdf = PdfWriter(f"Convocation - {student_name}")
+        pdf.heading("Convocation aux examens")
+        pdf.text(f"{session_name}", size=11)
+        pdf.text(f"Étudiant : {student_name} (n° {student_id})", size=11)
+        pdf.text(f"Formation : {program_name}", size=11)
+        pdf.space(12)
+        pdf.row(["Date", "Horaire", "Module", "Salle", "Place"], [70, 85, 200, 90, 50], bold=True)
+        for start, end, module, room, seat_index in exams:
+            day, hours = _slot(start, end)
+            pdf.row([day, hours, module, room, str(seat_index + 1) if seat_index is not None else "-"],
+                    [70, 85, 200, 90, 50])
+        pdf.space(16)
+        pdf.text("Présentez-vous 15 minutes avant le début de l'épreuve, muni(e) de votre carte d'étudiant.", size=9)
+        files.append((f"convocations/program_{program_id}/student_{student_id}.pdf", pdf.render()))
+    return files
+
+
+# --- Jobs ---
+
+JOB_COLUMNS = "job_id, session_id, kinds, status, total, done, error, created_at, finished_at, updated_at"
+
+
+def _job_dict(row) -> dict:
+    job = dict(zip([c.strip() for c in JOB_COLUMNS.split(",")], row))
+    job["kinds"] = job["kinds"].split(",")
+    idle = (datetime.utcnow() - job.pop("updated_at")).total_seconds()
+    if job["status"] in ("queued", "running") and idle > JOB_STALE_SECONDS:
+        job["status"], job["error"] = "failed", "Interrupted (worker restarted)"
+    return job
+
+
+async def read_job(db, job_id: str) -> Optional[dict]:
+    if not job_id.isalnum():
+        return None
+    result = await db.execute(sa.text(f"SELECT {JOB_COLUMNS} FROM document_jobs WHERE job_id = :job_id"),
+                              {"job_id": job_id})
+    row = result.fetchone()
+    return _job_dict(row) if row else None
+
+
+async def _update_job(db, job_id: str, **fields):
+    assignments = ", ".join(f"{name} = :{name}" for name in fields)
+    await db.execute(sa.text(f"UPDATE document_jobs SET {assignments}, updated_at = now() at time zone 'utc' "
+                             f"WHERE job_id = :job_id"), {"job_id": job_id, **fields})
+    await db.commit()
+
+
+async def create_job(db, session_id: int, kinds: Sequence[str]) -> dict:
+    job_id = uuid.uuid4().hex
+    await db.execute(sa.text("""
+        INSERT INTO document_jobs (job_id, session_id, kinds, status, done, created_at, updated_at)
+        VALUES (:job_id, :sid, :kinds, 'queued', 0, now() at time zone 'utc', now() at time zone 'utc')
+    """), {"job_id": job_id, "sid": session_id, "kinds": ",".join(kinds)})
+    await db.commit()
+    return await read_job(db, job_id)
+
+
+async def _room_groups(session, session_id: int):
+    """Yield (room, exams) per room from the streamed, room-ordered rows"""
+    result = await session.stream(
+        sa.text(ROOM_SHEETS_SQL).execution_options(yield_per=DOCUMENT_CHUNK), {"sid": session_id}
+    )
+    room, exams = None, []
+    async for chunk in result.partitions(DOCUMENT_CHUNK):
+        for (room_id, room_name, capacity, exam_id, module, start, end, supervisor,
+             seat_index, student, program) in chunk:
+            if room is None or room[0] != room_id:
+                if room is not None:
+                    yield room, exams
+                room, exams = (room_id, room_name, capacity), []
+            if not exams or exams[-1][0] != exam_id:
+                exams.append((exam_id, module, start, end, supervisor, []))
+            if seat_index is not None:
+                exams[-1][5].append((seat_index, student, program))
+    if room is not None:
+        yield room, exams
+
+
+async def _convocation_groups(session, session_id: int):
+    """Yield (program, students) batches of at most CONVOCATION_BATCH students"""
+    result = await session.stream(
+        sa.text(CONVOCATIONS_SQL).execution_options(yield_per=DOCUMENT_CHUNK), {"sid": session_id}
+    )
+    program, students = None, []
+    async for chunk in result.partitions(DOCUMENT_CHUNK):
+        for program_id, program_name, student_id, student_name, start, end, module, room, seat_index in chunk:
+            new_student = not students or students[-1][0] != student_id
+            if program is None or program[0] != program_id or (new_student and len(students) == CONVOCATION_BATCH):
+                if program is not None:
+                    yield program, students
+                program, students = (program_id, program_name), []
+                new_student = True
+            if new_student:
+                students.append((student_id, student_name, []))
+            students[-1][2].append((start, end, module, room, seat_index))
+    if program is not None:
+        yield program, students
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """One bounded pool per API process: concurrent jobs queue on it instead of adding workers"""
+    global _pool
+    if _pool is None:
+        # spawn: the API process holds DB connections and threads that must not be forked
+        _pool = ProcessPoolExecutor(max_workers=DOCUMENT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def run_document_job(session_factory, job_id: str):
+    """Background job: render the documents of the job's session into document_files"""
+    start = time.time()
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    # Groups waiting in the pool (and rendered files not yet stored) are the only ones held in memory
+    in_flight = asyncio.Semaphore(DOCUMENT_WORKERS * 2)
+    pending = set()
+    rendered: List[Tuple[str, bytes]] = []
+    done = 0
+    last_flush = 0.0
+
+    def task_done(future):
+        in_flight.release()
+        if not future.cancelled() and future.exception() is None:
+            rendered.extend(future.result())
+
+    async def flush(writer, force=False):
+        nonlocal done, last_flush
+        if not force and time.time() - last_flush < PROGRESS_INTERVAL:
+            return
+        last_flush = time.time()
+        files, rendered[:] = list(rendered), []
+        if files:
+            await writer.execute(
+                sa.text("INSERT INTO document_files (job_id, path, content) VALUES (:job_id, :path, :content)"),
+                [{"job_id": job_id, "path": path, "content": content} for path, content in files],
+            )
+            done += len(files)
+        await _update_job(writer, job_id, done=done)
+
+    async def submit(writer, fn, *args):
+        await in_flight.acquire()
+        future = loop.run_in_executor(pool, fn, *args)
+        future.add_done_callback(task_done)
+        pending.add(future)
+        await flush(writer)
+
+    # Two connections: one streams the rows, the other stores files and progress
+    async with session_factory() as session, session_factory() as writer:
+        job = await read_job(writer, job_id)
+        try:
+            await _update_job(writer, job_id, status="running")
+            name = await session.execute(sa.text("SELECT name FROM exam_sessions WHERE id = :sid"),
+                                         {"sid": job["session_id"]})
+            session_name = name.scalar() or f"Session {job['session_id']}"
+            total = 0
+            for kind in job["kinds"]:
+                count = await session.execute(sa.text(COUNT_SQL[kind]), {"sid": job["session_id"]})
+                total += count.scalar() or 0
+            await _update_job(writer, job_id, total=total)
+
+            if "rooms" in job["kinds"]:
+                async for room, exams in _room_groups(session, job["session_id"]):
+                    await submit(writer, render_room_sheet, session_name, room, exams)
+            if "convocations" in job["kinds"]:
+                async for program, students in _convocation_groups(session, job["session_id"]):
+                    await submit(writer, render_convocations, session_name, program, students)
+            if pending:
+                await asyncio.gather(*pending)
+            await flush(writer, force=True)
+            status, error = "done", None
+        except Exception as e:
+            print(f"Document job {job_id} failed: {e}")
+            await writer.rollback()
+            for future in pending:
+                future.cancel()
+            status, error = "failed", str(e)
+        await _update_job(writer, job_id, status=status, error=error,
+                          finished_at=datetime.utcnow())
+    print(f"Document job {job_id}: {done} documents, {status} in {time.time() - start:.2f}s "
+          f"({DOCUMENT_WORKERS} workers).")
+
+
+async def iter_bundle(session_factory, job_id: str) -> AsyncIterator[bytes]:
+    """Zip of the job's PDFs, produced while it is sent (PDF streams are already compressed: stored)"""
+    sink = StreamSink()
+    # Own connection: the response body outlives the request's dependencies
+    async with session_factory() as session:
+        result = await session.stream(
+            sa.text("SELECT path, content FROM document_files WHERE job_id = :job_id ORDER BY path")
+            .execution_options(yield_per=100), {"job_id": job_id}
+        )
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as bundle:
+            async for path, content in result:
+                bundle.writestr(path, bytes(content))
+                yield sink.drain()
+    yield sink.drain()
+
+
+async def delete_job(db, job_id: str):
+    """Remove a job and its files (document_files cascades)"""
+    await db.execute(sa.text("DELETE FROM document_jobs WHERE job_id = :job_id"), {"job_id": job_id})
+    await db.commit()
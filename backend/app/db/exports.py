@@ -0,0 +1,124 @@
+"""
+Bulk exports (timetable, student / professor lists, room sheets) as CSV or XLSX.
+
+Rows come from a server-side cursor EXPORT_CHUNK at a time and are encoded
+chunk by chunk, so an export of any size starts downloading at once and never
+holds more than one chunk in memory. Used by /exports and by export_lists.py.
+"""
+import csv
+import io
+from typing import AsyncIterator, Dict, Optional, Tuple
+import sqlalchemy as sa
+from app.core.xlsx import XlsxStreamWriter
+
+# Rows per server-side cursor fetch
+EXPORT_CHUNK = 2000
+
+# name -> (sheet title, header, query). Filters are appended as "AND ..." to the WHERE clause
+EXPORTS: Dict[str, Tuple[str, Tuple[str, ...], str]] = {
+    "timetable": ("Planning", (
+        "Entry ID", "Start", "End", "Module", "Program", "Department", "Room", "Supervisor", "Status",
+    ), """
+        SELECT t.id, t.start_time, t.end_time, m.name, p.name, d.name, r.name, u.full_name, t.status
+        FROM timetable_entries t
+        JOIN exams e ON e.id = t.exam_id
+        JOIN modules m ON m.id = e.module_id
+        JOIN programs p ON p.id = m.program_id
+        JOIN departments d ON d.id = p.department_id
+        LEFT JOIN rooms r ON r.id = t.room_id
+        LEFT JOIN professors pr ON pr.id = t.supervisor_id
+        LEFT JOIN users u ON u.id = pr.user_id
+        WHERE t.session_id = :session_id {filters}
+        ORDER BY t.start_time, t.id
+    """),
+    "students": ("Etudiants", ("ID", "Full Name", "Email", "Program", "Department"), """
+        SELECT u.id, u.full_name, u.email, p.name, d.name
+        FROM users u
+        JOIN students s ON u.id = s.user_id
+        JOIN programs p ON s.program_id = p.id
+        JOIN departments d ON p.department_id = d.id
+        WHERE u.role = 'student' {filters}
+        ORDER BY u.full_name, u.id
+    """),
+    "professors": ("Enseignants", ("ID", "Full Name", "Email", "Department"), """
+        SELECT u.id, u.full_name, u.email, d.name
+        FROM users u
+        JOIN professors pr ON u.id = pr.user_id
+        LEFT JOIN departments d ON pr.department_id = d.id
+        WHERE (u.role = 'professor' OR u.role = 'head') {filters}
+        ORDER BY u.full_name, u.id
+    """),
+    # One block of rows per room, in time order (the printed door sheets)
+    "rooms": ("Salles", ("Room", "Capacity", "Start", "End", "Module", "Program", "Supervisor"), """
+        SELECT r.name, r.capacity, t.start_time, t.end_time, m.name, p.name, u.full_name
+        FROM timetable_entries t
+        JOIN rooms r ON r.id = t.room_id
+        JOIN exams e ON e.id = t.exam_id
+        JOIN modules m ON m.id = e.module_id
+        JOIN programs p ON p.id = m.program_id
+        LEFT JOIN professors pr ON pr.id = t.supervisor_id
+        LEFT JOIN users u ON u.id = pr.user_id
+        WHERE t.session_id = :session_id {filters}
+        ORDER BY r.name, t.start_time, t.id
+    """),
+}
+# Exports scoped to an exam session (the others are reference lists)
+SESSION_EXPORTS = ("timetable", "rooms")
+# Filter name -> SQL condition, per export
+EXPORT_FILTERS = {
+    "timetable": {"department_id": "p.department_id = :department_id", "program_id": "p.id = :program_id"},
+    "students": {"department_id": "p.department_id = :department_id", "program_id": "p.id = :program_id"},
+    "professors": {"department_id": "pr.department_id = :department_id"},
+    "rooms": {"department_id": "p.department_id = :department_id", "room_id": "r.id = :room_id"},
+}
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def export_query(name: str, params: dict) -> str:
+    """Query of an export with the conditions of the non-null filters in params"""
+    _, _, query = EXPORTS[name]
+    conditions = [
+        f"AND {condition}" for key, condition in EXPORT_FILTERS[name].items() if params.get(key) is not None
+    ]
+    return query.format(filters=" ".join(conditions))
+
+
+async def _chunks(session, name: str, params: dict):
+    params = {key: value for key, value in params.items() if value is not None}
+    result = await session.stream(
+        sa.text(export_query(name, params)).execution_options(yield_per=EXPORT_CHUNK), params
+    )
+    async for chunk in result.partitions(EXPORT_CHUNK):
+        yield chunk
+
+
+async def stream_export(session, name: str, fmt: str, params: dict) -> AsyncIterator[bytes]:
+    """Encoded export, chunk by chunk (fmt: csv | xlsx)"""
+    title, header, _ = EXPORTS[name]
+    if fmt == "xlsx":
+        writer = XlsxStreamWriter(title, header)
+        yield writer.start()
+        async for chunk in _chunks(session, name, params):
+            data = writer.write_rows(chunk)
+            if data:
+                yield data
+        yield writer.close()
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue().encode("utf-8")
+    async for chunk in _chunks(session, name, params):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_filename(name: str, fmt: str, session_id: Optional[int] = None) -> str:
+    suffix = f"_s{session_id}" if name in SESSION_EXPORTS and session_id is not None else ""
+    return f"{name}{suffix}.{fmt}"
@@ -0,0 +1,119 @@
+"""
+Timetable generations.
+
+The engine never rewrites the live timetable: each run inserts a new
+generation into timetable_generations, and publishing moves
+exam_sessions.published_generation (a single-row UPDATE). Readers go through
+the timetable_entries view, so they keep seeing the previous generation until
+the flip commits and never wait on the optimizer. Superseded generations are
+deleted later by collect_generations (seat plans cascade).
+
+Writers of a session's generations (an optimization run and its publish, a
+rollback, the GC of unpublished shadows) serialize on a per-session advisory
+lock, so two runs can't publish over each other.
+"""
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+import sqlalchemy as sa
+
+# Generations kept per session, the published one included (1 = no rollback target)
+GENERATIONS_KEPT = max(1, int(os.getenv("TIMETABLE_GENERATIONS_KEPT", "2")))
+# First key of the per-session advisory lock (the second one is the session id)
+GENERATION_LOCK_NS = 7301
+
+
+class GenerationLocked(RuntimeError):
+    """Another run (or a rollback) is writing the session's timetable"""
+
+
+@asynccontextmanager
+async def session_run_lock(session_factory, session_id: int):
+    """
+    Hold the session's advisory lock for a whole optimization run, publish included.
+    Session-level lock on its own connection (no transaction left open for minutes);
+    raises GenerationLocked at once if another run has it.
+    """
+    async with session_factory() as session:
+        async with session.bind.connect() as conn:
+            result = await conn.execute(sa.text("SELECT pg_try_advisory_lock(:ns, :sid)"),
+                                        {"ns": GENERATION_LOCK_NS, "sid": session_id})
+            locked = result.scalar()
+            await conn.commit()
+            if not locked:
+                raise GenerationLocked(f"An optimization run is already in progress for session {session_id}")
+            try:
+                yield
+            finally:
+                await conn.execute(sa.text("SELECT pg_advisory_unlock(:ns, :sid)"),
+                                   {"ns": GENERATION_LOCK_NS, "sid": session_id})
+                await conn.commit()
+
+
+async def try_lock_session(session, session_id: int) -> bool:
+    """Take the session's lock until the caller's transaction ends; False while a run holds it"""
+    result = await session.execute(sa.text("SELECT pg_try_advisory_xact_lock(:ns, :sid)"),
+                                   {"ns": GENERATION_LOCK_NS, "sid": session_id})
+    return bool(result.scalar())
+
+
+async def next_generation(session) -> int:
+    result = await session.execute(sa.text("SELECT nextval('timetable_generation_seq')"))
+    return result.scalar()
+
+
+async def publish_generation(session, session_id: int, generation: int):
+    """Atomic pointer flip. The caller holds the session's lock and commits."""
+    await session.execute(
+        sa.text("UPDATE exam_sessions SET published_generation = :gen WHERE id = :sid"),
+        {"gen": generation, "sid": session_id},
+    )
+
+
+async def previous_generation(session, session_id: int) -> Optional[int]:
+    """Newest retained generation older than the published one (rollback target)"""
+    result = await session.execute(sa.text("""
+        SELECT MAX(t.generation)
+        FROM timetable_generations t
+        JOIN exam_sessions s ON s.id = t.session_id
+        WHERE t.session_id = :sid AND t.generation < s.published_generation
+    """), {"sid": session_id})
+    return result.scalar()
+
+
+async def collect_generations(session_factory, session_id: int, keep: int = GENERATIONS_KEPT) -> int:
+    """
+    Delete generations of a session older than the `keep` newest up to the published one.
+    When no run holds the session's lock, unpublished generations are deleted too:
+    shadows of failed / aborted runs, and the newer ones left by a rollback.
+    Meant to run in the background after a publish. Returns the number of rows deleted.
+    """
+    async with session_factory() as session:
+        # Held until the commit: no run can start writing a shadow meanwhile
+        idle = await try_lock_session(session, session_id)
+        result = await session.execute(sa.text("""
+            DELETE FROM timetable_generations t
+            USING exam_sessions s
+            WHERE t.session_id = :sid AND s.id = t.session_id
+              AND (
+                  t.generation < s.published_generation
+                  AND t.generation NOT IN (
+                      SELECT DISTINCT g.generation FROM timetable_generations g
+                      WHERE g.session_id = :sid AND g.generation <= s.published_generation
+                      ORDER BY g.generation DESC
+                      LIMIT :keep
+                  )
+                  OR CAST(:idle AS BOOLEAN)
+                     AND (s.published_generation IS NULL OR t.generation > s.published_generation)
+              )
+        """), {"sid": session_id, "keep": keep, "idle": idle})
+        # Changes logged before the latest publish are superseded by its 'reset' marker
+        await session.execute(sa.text("""
+            DELETE FROM timetable_changes
+            WHERE session_id = :sid
+              AND id < (SELECT MAX(id) FROM timetable_changes WHERE session_id = :sid AND op = 'reset')
+        """), {"sid": session_id})
+        await session.commit()
+    if result.rowcount:
+        print(f"Generation GC: removed {result.rowcount} superseded timetable rows (session {session_id}).")
+    return result.rowcount
@@ -0,0 +1,209 @@
+"""
+Static export of the final timetable for the Firebase-hosted frontend.
+
+Once every entry of a session's published generation is FINAL_APPROVED the
+timetable is read-only, so it can be served as files: one pre-rendered,
+gzip-compressed JSON shard per program, professor (supervisor) and room, plus
+a manifest per session listing them. firebase.json serves the shards with
+Content-Encoding: gzip and a long max-age (their path changes with every
+export), and the manifests with no-cache.
+
+This is a deploy step, not an API feature: export_static.py writes into the
+frontend's public/ directory, which the build copies into the hosted dist/
+(see the frontend's "deploy" npm script). The API server has no way to push
+files to the hosting.
+
+Layout under STATIC_EXPORT_DIR:
+    index.json                       sessions exported so far -> their manifest
+    s<session>/index.json            manifest of the session's live snapshot
+    s<session>/g<generation>-v<version>/{programs,professors,rooms}/<id>.json.gz
+
+A snapshot directory is written completely before its manifest is swapped in
+(atomic rename), and the previous snapshot is kept so clients holding the old
+manifest can still fetch their shards. Exporting a session merges it into the
+top-level index and leaves the other sessions untouched.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Optional
+import sqlalchemy as sa
+from app.core.cache import current_version
+
+STATIC_EXPORT_DIR = os.getenv(
+    "STATIC_EXPORT_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "frontend", "public", "timetable-static"),
+)
+# Snapshot directories kept per session (the live one included)
+SNAPSHOTS_KEPT = 2
+
+EXPORT_SQL = """
+    SELECT t.id, t.exam_id, t.start_time, t.end_time,
+           m.name, p.id, p.name,
+           r.id, r.name,
+           pr.id, u.full_name
+    FROM timetable_entries t
+    JOIN exams e ON e.id = t.exam_id
+    JOIN modules m ON m.id = e.module_id
+    JOIN programs p ON p.id = m.program_id
+    LEFT JOIN rooms r ON r.id = t.room_id
+    LEFT JOIN professors pr ON pr.id = t.supervisor_id
+    LEFT JOIN users u ON u.id = pr.user_id
+    WHERE t.session_id = :sid
+    ORDER BY t.start_time, t.id
+"""
+
+
+async def session_is_final(session, session_id: int) -> bool:
+    """True when the published generation exists and every entry is FINAL_APPROVED"""
+    result = await session.execute(sa.text("""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE status <> 'FINAL_APPROVED')
+        FROM timetable_entries WHERE session_id = :sid
+    """), {"sid": session_id})
+    total, pending = result.one()
+    return total > 0 and pending == 0
+
+
+def _write_shard(path: str, payload: dict) -> dict:
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    # mtime=0: identical content gives identical bytes (and hash) across exports
+    body = gzip.compress(raw, compresslevel=9, mtime=0)
+    with open(path, "wb") as f:
+        f.write(body)
+    return {"bytes": len(body), "sha256": hashlib.sha256(body).hexdigest()}
+
+
+def _write_json(path: str, data: dict):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def _merge_index(out_dir: str, session_dir: str, manifest: dict):
+    """Add / update the session in the top-level index, keeping the other sessions"""
+    path = os.path.join(out_dir, "index.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    sessions = index.get("sessions") if isinstance(index.get("sessions"), dict) else {}
+    sessions[str(manifest["session_id"])] = {
+        "session_name": manifest["session_name"],
+        "generation": manifest["generation"],
+        "version": manifest["version"],
+        "generated_at": manifest["generated_at"],
+        "manifest": f"{session_dir}/index.json",
+    }
+    _write_json(path, {"sessions": sessions})
+
+
+def _write_snapshot(out_dir: str, session_dir: str, snapshot: str, shards: Dict[str, Dict[int, dict]],
+                    manifest: dict) -> int:
+    """Blocking part of the export (compression + file IO), run in a worker thread"""
+    final_dir = os.path.join(out_dir, session_dir, snapshot)
+    tmp_dir = final_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    written = 0
+    for kind, by_id in shards.items():
+        os.makedirs(os.path.join(tmp_dir, kind), exist_ok=True)
+        listing = manifest["shards"][kind] = {}
+        for owner_id, payload in by_id.items():
+            info = _write_shard(os.path.join(tmp_dir, kind, f"{owner_id}.json.gz"), payload)
+            listing[str(owner_id)] = {
+                "name": payload["name"],
+                "exams": len(payload["exams"]),
+                "path": f"{session_dir}/{snapshot}/{kind}/{owner_id}.json.gz",
+                **info,
+            }
+            written += 1
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.rename(tmp_dir, final_dir)
+
+    _write_json(os.path.join(out_dir, session_dir, "index.json"), manifest)
+    _merge_index(out_dir, session_dir, manifest)
+
+    # Older snapshots of this session (names sort by generation, then version)
+    snapshots = sorted(
+        (name for name in os.listdir(os.path.join(out_dir, session_dir))
+         if name.startswith("g") and not name.endswith(".tmp")),
+        key=lambda name: tuple(int(part[1:]) for part in name.split("-")),
+    )
+    for name in snapshots[:-SNAPSHOTS_KEPT]:
+        shutil.rmtree(os.path.join(out_dir, session_dir, name), ignore_errors=True)
+    return written
+
+
+async def export_static_timetable(session_factory, session_id: int, out_dir: Optional[str] = None,
+                                  force: bool = False) -> Optional[dict]:
+    """
+    Write the shards + manifest of a session's published timetable.
+    Skipped (returns None) while some entries are not FINAL_APPROVED, unless force.
+    Returns the manifest.
+    """
+    out_dir = os.path.abspath(out_dir or STATIC_EXPORT_DIR)
+    start = time.time()
+    async with session_factory() as session:
+        if not force and not await session_is_final(session, session_id):
+            print(f"Static export skipped: session {session_id} is not fully FINAL_APPROVED.")
+            return None
+        meta = await session.execute(sa.text(
+            "SELECT name, published_generation FROM exam_sessions WHERE id = :sid"
+        ), {"sid": session_id})
+        session_name, generation = meta.one()
+        version = await current_version(session)
+        result = await session.execute(sa.text(EXPORT_SQL), {"sid": session_id})
+        rows = result.fetchall()
+
+    shards: Dict[str, Dict[int, dict]] = {"programs": {}, "professors": {}, "rooms": {}}
+    for (entry_id, exam_id, start_time, end_time, module_name, program_id, program_name,
+         room_id, room_name, professor_id, professor_name) in rows:
+        exam = {
+            "id": entry_id,
+            "exam_id": exam_id,
+            "exam_name": module_name,
+            "start_time": start_time.isoformat() if start_time else None,
+            "end_time": end_time.isoformat() if end_time else None,
+            "program_id": program_id,
+            "program_name": program_name,
+            "room_id": room_id,
+            "room_name": room_name or f"Room {room_id}",
+            "supervisor_id": professor_id,
+            "supervisor_name": professor_name or f"Prof {professor_id}",
+        }
+        for kind, owner_id, owner_name in (
+            ("programs", program_id, program_name),
+            ("professors", professor_id, professor_name),
+            ("rooms", room_id, room_name),
+        ):
+            if owner_id is None:
+                continue
+            shard = shards[kind].get(owner_id)
+            if shard is None:
+                shard = shards[kind][owner_id] = {
+                    "id": owner_id, "name": owner_name,
+                    "session_id": session_id, "generation": generation, "exams": [],
+                }
+            shard["exams"].append(exam)
+
+    manifest = {
+        "session_id": session_id,
+        "session_name": session_name,
+        "generation": generation,
+        "version": version,
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "shards": {},
+    }
+    written = await asyncio.to_thread(
+        _write_snapshot, out_dir, f"s{session_id}", f"g{generation}-v{version}", shards, manifest
+    )
+    print(f"Static export: {written} shards ({len(rows)} entries) for session {session_id} "
+          f"written to {out_dir} in {time.time() - start:.2f}s.")
+    return manifest
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Enum
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, DateTime, Date, Boolean, Enum, CheckConstraint, UniqueConstraint, ForeignKeyConstraint, Index, LargeBinary, text
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 import enum
@@ -61,6 +61,7 @@ class Professor(Base):
     modules = relationship("Module", back_populates="professor")
     # Supervising exams
     exams = relationship("TimetableEntry", back_populates="supervisor")
+    unavailability = relationship("ProfessorUnavailability", back_populates="professor")
 
 class Module(Base):
     __tablename__ = "modules"
@@ -97,18 +98,196 @@ class Exam(Base):
     duration_minutes = Column(Integer, default=90)
     
     module = relationship("Module", back_populates="exam")
-    timetable_entry = relationship("TimetableEntry", back_populates="exam", uselist=False)
+    # One entry per exam session
+    timetable_entries = relationship("TimetableEntry", back_populates="exam")
+
+class ExamSession(Base):
+    """An exam period (winter, resit, summer...). timetable_generations is partitioned by session."""
+    __tablename__ = "exam_sessions"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    kind = Column(String, nullable=False, default="summer") # winter, resit, summer
+    start_date = Column(Date, nullable=False)
+    is_current = Column(Boolean, nullable=False, default=False)
+    # Generation shown through the timetable_entries view (NULL = nothing published yet)
+    published_generation = Column(Integer, nullable=True)
+
+    entries = relationship("TimetableEntry", back_populates="session")
+
+class TimetableGeneration(Base):
+    """
+    Generation store written by the engine: each run inserts a new (shadow) generation,
+    published by moving exam_sessions.published_generation.
+    """
+    __tablename__ = "timetable_generations"
+    __table_args__ = (
+        UniqueConstraint("session_id", "generation", "exam_id", name="uq_timetable_generation_exam"),
+        {"postgresql_partition_by": "LIST (session_id)"},
+    )
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("exam_sessions.id"), primary_key=True)
+    generation = Column(Integer, nullable=False)
+    exam_id = Column(Integer, ForeignKey("exams.id"))
+    room_id = Column(Integer, ForeignKey("rooms.id"))
+    supervisor_id = Column(Integer, ForeignKey("professors.id"))
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    status = Column(String, default="DRAFT")
 
 class TimetableEntry(Base):
+    """Published generation of each session (updatable view over timetable_generations)"""
     __tablename__ = "timetable_entries"
     id = Column(Integer, primary_key=True, index=True)
-    exam_id = Column(Integer, ForeignKey("exams.id"), unique=True)
+    session_id = Column(Integer, ForeignKey("exam_sessions.id"), primary_key=True)
+    generation = Column(Integer)
+    exam_id = Column(Integer, ForeignKey("exams.id"))
     room_id = Column(Integer, ForeignKey("rooms.id"))
     supervisor_id = Column(Integer, ForeignKey("professors.id"))
     start_time = Column(DateTime)
     end_time = Column(DateTime)
     status = Column(String, default="DRAFT") # DRAFT, DEPT_APPROVED, FINAL_APPROVED
     
-    exam = relationship("Exam", back_populates="timetable_entry")
+    exam = relationship("Exam", back_populates="timetable_entries")
+    session = relationship("ExamSession", back_populates="entries")
     room = relationship("Room")
     supervisor = relationship("Professor", back_populates="exams")
+
+class ExamConflict(Base):
+    """Weighted conflict graph maintained by Postgres (see refresh_exam_conflicts / enrollment and exam triggers)"""
+    __tablename__ = "exam_conflicts"
+    __table_args__ = (CheckConstraint("exam_a < exam_b", name="ck_exam_conflicts_ordered"),)
+    exam_a = Column(Integer, ForeignKey("exams.id", ondelete="CASCADE"), primary_key=True)
+    exam_b = Column(Integer, ForeignKey("exams.id", ondelete="CASCADE"), primary_key=True, index=True)
+    weight = Column(Integer, nullable=False) # Number of shared students
+
+class TimetableConflict(Base):
+    """
+    Same-day pair of conflicting exams in one timetable generation. Written by the engine
+    in save_results, kept current on reschedules by the sync_timetable_conflicts trigger.
+    """
+    __tablename__ = "timetable_conflicts"
+    __table_args__ = (
+        CheckConstraint("exam_a < exam_b", name="ck_timetable_conflicts_ordered"),
+        ForeignKeyConstraint(
+            ["session_id", "generation", "exam_a"],
+            ["timetable_generations.session_id", "timetable_generations.generation", "timetable_generations.exam_id"],
+            ondelete="CASCADE",
+        ),
+        ForeignKeyConstraint(
+            ["session_id", "generation", "exam_b"],
+            ["timetable_generations.session_id", "timetable_generations.generation", "timetable_generations.exam_id"],
+            ondelete="CASCADE",
+        ),
+    )
+    session_id = Column(Integer, primary_key=True)
+    generation = Column(Integer, primary_key=True)
+    exam_a = Column(Integer, primary_key=True)
+    exam_b = Column(Integer, primary_key=True)
+    shared_students = Column(Integer, nullable=False)
+    conflict_date = Column(Date, nullable=False)
+    program_a = Column(Integer)
+    department_a = Column(Integer)
+    program_b = Column(Integer)
+    department_b = Column(Integer)
+
+class TimetableChange(Base):
+    """
+    Change log of the published timetable, written by triggers: 'update' / 'delete' of
+    an entry, 'reset' when another generation is published. The id is the change version
+    GET /timetable/changes syncs from.
+    """
+    __tablename__ = "timetable_changes"
+    id = Column(BigInteger, primary_key=True)
+    session_id = Column(Integer, ForeignKey("exam_sessions.id", ondelete="CASCADE"), nullable=False)
+    generation = Column(Integer, nullable=False)
+    op = Column(String(8), nullable=False) # update, delete, reset
+    entry_id = Column(Integer)
+    exam_id = Column(Integer)
+    changed_at = Column(DateTime, nullable=False)
+
+class StudentExamSchedule(Base):
+    """Per-student projection of a timetable generation (enrolled exams only, follows enrollment changes), backs /timetable/me"""
+    __tablename__ = "student_exam_schedule"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["session_id", "generation", "exam_id"],
+            ["timetable_generations.session_id", "timetable_generations.generation", "timetable_generations.exam_id"],
+            ondelete="CASCADE",
+        ),
+    )
+    session_id = Column(Integer, primary_key=True)
+    generation = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    start_time = Column(DateTime, primary_key=True)
+    exam_id = Column(Integer, primary_key=True)
+    end_time = Column(DateTime)
+    room_id = Column(Integer)
+    module_name = Column(String)
+    room_name = Column(String)
+
+class ProfessorUnavailability(Base):
+    __tablename__ = "professor_unavailability"
+    # COALESCE: slot is NULL for whole-day rows, which a plain unique constraint lets through
+    __table_args__ = (
+        Index("uq_professor_unavailability", "professor_id", "date", text("COALESCE(slot, -1)"), unique=True),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    professor_id = Column(Integer, ForeignKey("professors.id", ondelete="CASCADE"), index=True)
+    date = Column(Date, nullable=False)
+    slot = Column(Integer, nullable=True) # NULL = whole day
+
+    professor = relationship("Professor", back_populates="unavailability")
+
+class AppSetting(Base):
+    """Key/value scheduling rules shared by the engine and validate_timetable()"""
+    __tablename__ = "app_settings"
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+
+class SeatAssignment(Base):
+    """Seat of one student for one exam (generated after each optimization run)"""
+    __tablename__ = "seat_assignments"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["session_id", "generation", "exam_id"],
+            ["timetable_generations.session_id", "timetable_generations.generation", "timetable_generations.exam_id"],
+            ondelete="CASCADE",
+        ),
+    )
+    session_id = Column(Integer, primary_key=True)
+    generation = Column(Integer, primary_key=True)
+    exam_id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False)
+    seat_index = Column(Integer, nullable=False)
+
+class EngineCheckpoint(Base):
+    """Latest checkpoint of an optimization job (see app.algos.checkpoint), survives instance restarts"""
+    __tablename__ = "engine_checkpoints"
+    job_id = Column(String, primary_key=True)
+    fingerprint = Column(String(64), nullable=False) # sha256 of the solver inputs
+    phase = Column(String(16), nullable=False)
+    progress = Column(Integer, nullable=False, default=0)
+    payload = Column(LargeBinary, nullable=False) # Packed int32 solution rows
+    updated_at = Column(DateTime, nullable=False)
+
+class DocumentJob(Base):
+    """Background rendering of door sheets / convocations (see app.db.documents)"""
+    __tablename__ = "document_jobs"
+    job_id = Column(String(32), primary_key=True)
+    session_id = Column(Integer, ForeignKey("exam_sessions.id", ondelete="CASCADE"), nullable=False)
+    kinds = Column(String, nullable=False) # Comma-separated DOCUMENT_KINDS
+    status = Column(String(16), nullable=False, default="queued") # queued, running, done, failed
+    total = Column(Integer)
+    done = Column(Integer, nullable=False, default=0)
+    error = Column(String)
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, nullable=False) # Progress heartbeat, detects jobs lost in a restart
+
+class DocumentFile(Base):
+    """One rendered PDF of a document job, path inside the bundle"""
+    __tablename__ = "document_files"
+    job_id = Column(String(32), ForeignKey("document_jobs.job_id", ondelete="CASCADE"), primary_key=True)
+    path = Column(String, primary_key=True)
+    content = Column(LargeBinary, nullable=False)
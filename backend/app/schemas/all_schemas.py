@@ -30,8 +30,15 @@ class TimetableEntrySchema(BaseModel):
     class Config:
         orm_mode = True
 
+class TimetableEntryUpdate(BaseModel):
+    # Manual adjustment of a published entry (fields left out are unchanged)
+    start_time: Optional[datetime] = None
+    room_id: Optional[int] = None
+    supervisor_id: Optional[int] = None
+
 class OptimizationStats(BaseModel):
     total_exams: int
     conflicts_found: int
     success: bool
     execution_time: float
+    spread_cost: Optional[int] = None # Carter proximity cost (lower = exams better spread for students)
@@ -18,6 +18,7 @@ async def run_benchmark():
     # 2. Build Conflict Graph
     t2 = time.time()
     engine.build_conflict_graph()
+    engine.reduce_graph()
     t3 = time.time()
     print(f"Conflict graph building: {t3 - t2:.2f}s")
     
@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import sqlalchemy as sa
+from app.db.session import AsyncSessionLocal
+from app.db.static_export import export_static_timetable
+
+async def main(session_id=None, out_dir=None, force=False, all_sessions=False):
+    """Frontend deploy step: run before `npm run build` (see the frontend's deploy script)"""
+    async with AsyncSessionLocal() as session:
+        if all_sessions:
+            result = await session.execute(sa.text(
+                "SELECT id FROM exam_sessions WHERE published_generation IS NOT NULL ORDER BY id"
+            ))
+            session_ids = list(result.scalars().all())
+        elif session_id is None:
+            result = await session.execute(sa.text("SELECT id FROM exam_sessions WHERE is_current"))
+            session_ids = [sid for sid in [result.scalar()] if sid is not None]
+        else:
+            session_ids = [session_id]
+    if not session_ids:
+        print("No exam session to export.")
+        return
+    for sid in session_ids:
+        manifest = await export_static_timetable(AsyncSessionLocal, sid, out_dir, force=force)
+        if manifest:
+            print(f"Session {sid} manifest: generation {manifest['generation']}, version {manifest['version']}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the final timetable as static gzip JSON shards")
+    parser.add_argument("--session", type=int, default=None, help="Exam session id (default: current)")
+    parser.add_argument("--out", default=None, help="Output directory (default: STATIC_EXPORT_DIR)")
+    parser.add_argument("--force", action="store_true", help="Export even if not fully FINAL_APPROVED")
+    parser.add_argument("--all", action="store_true", help="Every session with a published timetable")
+    args = parser.parse_args()
+    asyncio.run(main(args.session, args.out, args.force, args.all))
@@ -2,6 +2,7 @@ import asyncio
 import time
 from app.algos.engine import OptimizationEngine
 from app.db.session import AsyncSessionLocal
+from app.db.generations import collect_generations
 
 async def main():
     print("Initializing Optimization Engine...")
@@ -13,6 +14,7 @@ async def main():
     print(f"Data Loaded in {load_time - start_time:.2f}s")
     
     engine.build_conflict_graph()
+    engine.reduce_graph()
     graph_time = time.time()
     print(f"Graph Built in {graph_time - load_time:.2f}s")
     
@@ -22,6 +24,8 @@ async def main():
     print(f"Success: {success}")
     
     await engine.save_results()
+    await engine.publish()
+    await collect_generations(AsyncSessionLocal, engine.session_id)
     save_time = time.time()
     print(f"Results saved in {save_time - solve_time:.2f}s")
     
@@ -0,0 +1,37 @@
+"""
+Shared fixtures. These tests only cover the pure-Python parts of the backend
+(engine passes, graph storage, writers): nothing here needs a database.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.algos.engine import OptimizationEngine
+
+
+def exam(exam_id, program_id=1, department_id=1):
+    program = SimpleNamespace(id=program_id, department_id=department_id)
+    return SimpleNamespace(id=exam_id, module=SimpleNamespace(program=program, program_id=program_id))
+
+
+def room(room_id, capacity):
+    return SimpleNamespace(id=room_id, name=f"R{room_id}", capacity=capacity)
+
+
+def professor(prof_id, department_id=1):
+    return SimpleNamespace(id=prof_id, department_id=department_id)
+
+
+@pytest.fixture
+def make_engine():
+    """Engine loaded from {exam_id: students} without a database (in-memory graph)"""
+    def make(enrollments, rooms=None, professors=None, extra_exams=()):
+        engine = OptimizationEngine(None, out_of_core=False, graph_source="python", max_exams_per_day=1)
+        engine.exams = [exam(exam_id) for exam_id in sorted(set(enrollments) | set(extra_exams))]
+        engine.rooms = rooms if rooms is not None else [room(i, 100) for i in range(1, 6)]
+        engine.profs = professors if professors is not None else [professor(i) for i in range(1, 6)]
+        engine.enrollments = {exam_id: set(students) for exam_id, students in enrollments.items() if students}
+        engine.exam_sizes = {exam_id: len(students) for exam_id, students in engine.enrollments.items()}
+        engine.build_conflict_graph()
+        return engine
+    return make
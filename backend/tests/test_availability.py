@@ -0,0 +1,53 @@
+from datetime import date, datetime
+
+from app.db.availability import AvailabilityIndex, slot_bounds
+
+DAY = date(2026, 6, 1)
+
+
+def _index():
+    index = AvailabilityIndex(session_id=1, version=1)
+    # Rooms by decreasing capacity, as build_index lays them out
+    for room_id, capacity in [(7, 300), (3, 120), (9, 120), (4, 40)]:
+        index.room_ids.append(room_id)
+        index.room_names.append(f"R{room_id}")
+        index.room_capacities.append(capacity)
+    index._neg_capacities = [-capacity for capacity in index.room_capacities]
+    for bit, (prof_id, department_id) in enumerate([(1, 10), (2, 10), (3, 20)]):
+        index.professor_ids.append(prof_id)
+        index.professor_names.append(f"P{prof_id}")
+        index.department_masks[department_id] = index.department_masks.get(department_id, 0) | (1 << bit)
+    return index
+
+
+def test_slot_bounds():
+    assert slot_bounds(DAY, 0) == (datetime(2026, 6, 1, 8, 30), datetime(2026, 6, 1, 10, 0))
+    assert slot_bounds(DAY, 1)[0] == datetime(2026, 6, 1, 10, 30)
+
+
+def test_free_rooms_by_capacity():
+    index = _index()
+    index._mark(index.busy_rooms, 1, *slot_bounds(DAY, 0))  # room 3 busy in slot 0
+    free = index.free_rooms(DAY, 0, min_capacity=100)
+    assert [r["id"] for r in index.rooms(free)] == [7, 9]
+    assert [r["id"] for r in index.rooms(index.free_rooms(DAY, 1, min_capacity=100))] == [7, 3, 9]
+    assert [r["id"] for r in index.rooms(index.free_rooms(DAY, 0))] == [7, 9, 4]
+    assert index.free_rooms(DAY, 0, min_capacity=500) == 0
+
+
+def test_off_grid_entry_marks_every_overlapping_slot():
+    index = _index()
+    index._mark(index.busy_rooms, 0, datetime(2026, 6, 1, 9, 30), datetime(2026, 6, 1, 11, 0))
+    assert index.busy_rooms == {(DAY, 0): 1, (DAY, 1): 1}
+    # No end time: one slot length from the start
+    index._mark(index.busy_rooms, 3, datetime(2026, 6, 2, 8, 30), None)
+    assert index.busy_rooms[(date(2026, 6, 2), 0)] == 1 << 3
+
+
+def test_free_supervisors_by_department():
+    index = _index()
+    index._mark(index.busy_supervisors, 0, *slot_bounds(DAY, 2))
+    assert [p["id"] for p in index.supervisors(index.free_supervisors(DAY, 2))] == [2, 3]
+    assert [p["id"] for p in index.supervisors(index.free_supervisors(DAY, 2, department_id=10))] == [2]
+    assert [p["id"] for p in index.supervisors(index.free_supervisors(DAY, 3, department_id=10))] == [1, 2]
+    assert index.free_supervisors(DAY, 2, department_id=99) == 0
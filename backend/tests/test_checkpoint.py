@@ -0,0 +1,60 @@
+import asyncio
+
+from app.algos import checkpoint
+
+SOLUTION = {101: (0, 1, 7, 3), 102: (4, 0, 8, 3), 250: (14, 3, 1, 12)}
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeDb:
+    """Stands for the AsyncSession: one stored engine_checkpoints row"""
+
+    def __init__(self, row):
+        self.row = row
+
+    async def execute(self, statement, params=None):
+        return FakeResult(self.row)
+
+
+def test_solution_round_trip():
+    assert checkpoint.decode_solution(checkpoint.encode_solution(SOLUTION)) == SOLUTION
+    assert checkpoint.decode_solution(checkpoint.encode_solution({})) == {}
+
+
+def test_truncated_or_foreign_payload_is_rejected():
+    payload = checkpoint.encode_solution(SOLUTION)
+    assert checkpoint.decode_solution(payload[:-1]) is None
+    assert checkpoint.decode_solution(payload[:3]) is None
+    other_version = checkpoint.HEADER.pack(checkpoint.MAGIC, checkpoint.VERSION + 1, len(SOLUTION))
+    assert checkpoint.decode_solution(other_version + payload[checkpoint.HEADER.size:]) is None
+    assert checkpoint.decode_solution(b"NOPE" + payload[4:]) is None
+
+
+def test_fingerprint_follows_every_input():
+    base = checkpoint.fingerprint("optimized", 3, [(1, 10)], [(1, 50)])
+    assert base == checkpoint.fingerprint("optimized", 3, [(1, 10)], [(1, 50)])
+    assert base != checkpoint.fingerprint("draft", 3, [(1, 10)], [(1, 50)])
+    assert base != checkpoint.fingerprint("optimized", 3, [(1, 10)], [(1, 49)])
+    # Part boundaries matter
+    assert checkpoint.fingerprint("ab", "c") != checkpoint.fingerprint("a", "bc")
+
+
+def test_load_checkpoint_checks_the_fingerprint():
+    fp = checkpoint.fingerprint("optimized", 3)
+    row = (fp, "optimize", 2, checkpoint.encode_solution(SOLUTION))
+
+    state = asyncio.run(checkpoint.load_checkpoint(FakeDb(row), "job", fp))
+    assert state == {"phase": "optimize", "progress": 2, "solution": SOLUTION}
+
+    other = checkpoint.fingerprint("optimized", 4)
+    assert asyncio.run(checkpoint.load_checkpoint(FakeDb(row), "job", other)) is None
+    assert asyncio.run(checkpoint.load_checkpoint(FakeDb(None), "job", fp)) is None
+    unknown_phase = (fp, "unknown", 0, row[3])
+    assert asyncio.run(checkpoint.load_checkpoint(FakeDb(unknown_phase), "job", fp)) is None
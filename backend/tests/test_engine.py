@@ -0,0 +1,105 @@
+from app.algos.engine import PROXIMITY_COST
+from tests.conftest import room
+
+
+def _place(engine, solution, mode="optimized"):
+    engine.solution = dict(solution)
+    engine._configure_grid(mode)
+    engine._rebuild_usage()
+
+
+def _slots_by_day(engine):
+    slots_by_day = {}
+    for day, slot in engine.slots:
+        slots_by_day.setdefault(day, []).append(slot)
+    return slots_by_day
+
+
+# ==================== reduce_graph ====================
+
+def test_reduce_graph_merges_identical_enrollments(make_engine):
+    engine = make_engine({1: {1, 2, 3}, 2: {1, 2, 3}, 3: {3, 4}, 4: {4, 5}})
+    engine.reduce_graph()
+    merged = [sorted(members) for members in engine.super_nodes.values() if len(members) > 1]
+    assert merged == [[1, 2]]
+
+
+def test_reduce_graph_defers_dominated_and_isolated_exams(make_engine):
+    # N(1) = N(2) = {10} and 1, 2 don't conflict: 1 can take 2's day. 5 and 6 conflict with nobody.
+    engine = make_engine({10: {1, 2}, 1: {1}, 2: {2}, 5: {99}}, extra_exams=[6])
+    engine.reduce_graph()
+    assert (1, 2) in engine.deferred
+    assert (5, None) in engine.deferred and (6, None) in engine.deferred
+    assert 1 not in engine.super_nodes and 5 not in engine.super_nodes
+    assert {10, 2} <= set(engine.super_nodes)
+
+
+def test_reduce_graph_hash_collision_does_not_merge(make_engine):
+    # Out-of-core / sql modes: no sets in memory, the same (size, hash) key for different students
+    engine = make_engine({1: {1, 2}, 2: {3, 4}, 3: {1, 2}})
+    students = engine.enrollments
+    engine.enrollments = {}
+    engine.enrollment_hashes = {1: (2, 42), 2: (2, 42), 3: (2, 42)}
+
+    engine.reduce_graph()
+    assert all(len(members) == 1 for members in engine.super_nodes.values())
+
+    engine.candidate_students = {exam_id: frozenset(s) for exam_id, s in students.items()}
+    engine.reduce_graph()
+    assert sorted(sorted(m) for m in engine.super_nodes.values() if len(m) > 1) == [[1, 3]]
+
+
+# ==================== spread_cost / _improve_exam ====================
+
+def test_spread_cost_weights_shared_students_by_gap(make_engine):
+    engine = make_engine({1: {1, 2, 3}, 2: {1, 2, 3, 4}, 3: {9}})
+    engine.solution = {1: (0, 0, 1, 1), 2: (2, 0, 1, 1), 3: (0, 1, 2, 2)}
+    assert engine.spread_cost() == 3 * PROXIMITY_COST[2]
+    engine.solution[2] = (len(PROXIMITY_COST), 0, 1, 1)
+    assert engine.spread_cost() == 0
+
+
+def test_improve_exam_moves_to_cheapest_feasible_day(make_engine):
+    engine = make_engine({1: {1, 2}, 2: {1, 2}})
+    _place(engine, {1: (0, 0, 1, 1), 2: (1, 0, 1, 1)})
+    assert engine._improve_exam(2, "optimized", _slots_by_day(engine), 2)
+
+    day, slot, room_id, prof_id = engine.solution[2]
+    assert day == len(PROXIMITY_COST)
+    assert engine.spread_cost() == 0
+    # Usage maps follow the move
+    assert room_id in engine.room_usage[(day, slot)] and 1 not in engine.room_usage[(1, 0)]
+    assert engine.prof_daily_counts[(1, 1)] == 0 and engine.prof_daily_counts[(day, 1)] == 1
+
+
+def test_improve_exam_respects_supervisor_unavailability(make_engine):
+    engine = make_engine({1: {1, 2}, 2: {1, 2}})
+    # The supervisor of exam 2 is away on every zero-cost day
+    engine.unavailability = [(1, d, None) for d in range(len(PROXIMITY_COST), 15)]
+    _place(engine, {1: (0, 0, 1, 1), 2: (1, 0, 1, 1)})
+    assert engine._improve_exam(2, "optimized", _slots_by_day(engine), 2)
+    assert engine.solution[2][0] == len(PROXIMITY_COST) - 1
+
+
+def test_improve_exam_keeps_a_free_exam(make_engine):
+    engine = make_engine({1: {1}, 2: {2}})
+    _place(engine, {1: (0, 0, 1, 1), 2: (0, 1, 2, 1)})
+    assert not engine._improve_exam(2, "optimized", _slots_by_day(engine), 2)
+    assert engine.solution[2] == (0, 1, 2, 1)
+
+
+# ==================== rebalance_rooms ====================
+
+def test_rebalance_rooms_minimises_unused_seats(make_engine):
+    rooms = [room(1, 30), room(2, 50), room(3, 100)]
+    engine = make_engine({1: set(range(25)), 2: set(range(100, 145))}, rooms=rooms)
+    # Same slot, both in rooms larger than needed
+    _place(engine, {1: (0, 0, 3, 1), 2: (0, 0, 2, 2)})
+    assert engine.unused_seats() == 75 + 5
+
+    engine.rebalance_rooms()
+    assert engine.solution[1] == (0, 0, 1, 1)
+    assert engine.solution[2] == (0, 0, 2, 2)
+    assert engine.unused_seats() == 5 + 5
+    assert engine.room_usage[(0, 0)] == {1, 2}
+    assert engine.check_solution("optimized") == []
@@ -0,0 +1,65 @@
+import itertools
+import random
+
+from app.algos.graph_store import CSRGraphBuilder
+
+
+def _expected(cliques, exam_ids):
+    expected = {exam_id: {} for exam_id in exam_ids}
+    for clique in cliques:
+        for u, v in itertools.permutations(clique, 2):
+            a, b = exam_ids[u], exam_ids[v]
+            expected[a][b] = expected[a].get(b, 0) + 1
+    return expected
+
+
+def test_spilled_runs_merge_to_the_in_memory_counts(tmp_path):
+    random.seed(7)
+    exam_ids = [10 * i for i in range(1, 31)]
+    cliques = [random.sample(range(len(exam_ids)), random.randint(1, 6)) for _ in range(300)]
+    builder = CSRGraphBuilder(exam_ids, workdir=str(tmp_path))
+    builder.max_pairs = 16  # Spill every few students
+    for clique in cliques:
+        builder.add_clique(clique)
+    assert len(builder.runs) > 1
+
+    graph = builder.finalize()
+    try:
+        expected = _expected(cliques, exam_ids)
+        assert graph.nnz == sum(len(n) for n in expected.values())
+        for exam_id in exam_ids:
+            assert graph.weights(exam_id) == expected[exam_id]
+            assert sorted(graph.get(exam_id)) == sorted(expected[exam_id])
+            assert graph.degree(exam_id) == len(expected[exam_id])
+        assert 999 not in graph and graph.get(999) == () and graph.weights(999) == {}
+        assert list(graph) == exam_ids
+    finally:
+        graph.close()
+    # Run files are removed once merged
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["conflicts.csr"]
+
+
+def test_add_edge_sums_weights_across_runs(tmp_path):
+    builder = CSRGraphBuilder([1, 2, 3], workdir=str(tmp_path))
+    builder.add_edge(0, 1, 4)
+    builder._spill()
+    builder.add_edge(1, 0, 3)
+    builder.add_edge(1, 2, 1)
+    graph = builder.finalize()
+    try:
+        assert graph.weights(1) == {2: 7}
+        assert graph.weights(2) == {1: 7, 3: 1}
+        assert graph.weights(3) == {2: 1}
+    finally:
+        graph.close()
+
+
+def test_repeated_exam_in_a_clique_is_not_a_self_loop(tmp_path):
+    builder = CSRGraphBuilder([1, 2], workdir=str(tmp_path))
+    builder.add_clique([0, 0, 1])
+    graph = builder.finalize()
+    try:
+        assert graph.weights(1) == {2: 2}
+        assert 1 not in graph.get(1)
+    finally:
+        graph.close()
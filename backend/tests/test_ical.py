@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from app.core import ical
+
+
+def test_feed_token_round_trip():
+    token = ical.feed_token("student", 42)
+    assert len(token) == 32 and int(token, 16) >= 0
+    assert token == ical.feed_token("student", 42)
+    assert ical.check_feed_token("student", 42, token)
+
+
+def test_feed_token_is_bound_to_kind_and_owner():
+    token = ical.feed_token("student", 42)
+    assert not ical.check_feed_token("student", 43, token)
+    assert not ical.check_feed_token("professor", 42, token)
+    assert not ical.check_feed_token("student", 42, token[:-1] + ("0" if token[-1] != "0" else "1"))
+    assert not ical.check_feed_token("student", 42, "")
+    assert not ical.check_feed_token("student", 42, None)
+
+
+def test_feed_token_changes_with_the_salt(monkeypatch):
+    token = ical.feed_token("room", 7)
+    monkeypatch.setattr(ical, "FEED_TOKEN_SALT", "ics-v2")
+    assert not ical.check_feed_token("room", 7, token)
+
+
+def test_vevent_escapes_and_folds():
+    event = ical.vevent(
+        "exam-1@test", datetime(2026, 6, 1, 8, 30), datetime(2026, 6, 1, 10, 0),
+        "Algèbre, partie 1; " + "x" * 100, "Amphi A", datetime(2026, 5, 1, 12, 0),
+    )
+    lines = event.split("\r\n")
+    assert lines[0] == "BEGIN:VEVENT" and lines[-1] == ""
+    assert all(len(line.encode()) <= 75 for line in lines)
+    assert "DTSTART:20260601T083000" in lines
+    unfolded = event.replace("\r\n ", "")
+    assert r"SUMMARY:Algèbre\, partie 1\; " + "x" * 100 in unfolded
@@ -0,0 +1,41 @@
+import re
+import zlib
+
+from app.core.pdf import PdfWriter
+
+
+def _objects(data):
+    return {int(m.group(1)): m.start() for m in re.finditer(rb"(\d+) 0 obj\n", data)}
+
+
+def test_render_structure_and_xref():
+    pdf = PdfWriter(title="Convocation (S1)")
+    pdf.heading("Convocation")
+    pdf.row(["Algèbre", "Amphi A", None], [200, 150, 100])
+    data = pdf.render()
+
+    assert data.startswith(b"%PDF-1.4") and data.endswith(b"%%EOF\n")
+    objects = _objects(data)
+    xref = int(re.search(rb"startxref\n(\d+)\n", data).group(1))
+    assert data[xref:xref + 4] == b"xref"
+    entries = re.findall(rb"(\d{10}) 00000 n ", data[xref:])
+    assert [int(offset) for offset in entries] == [objects[i] for i in sorted(objects)]
+    assert b"/Title (Convocation \\(S1\\))" in data
+
+
+def test_text_is_drawn_in_winansi():
+    pdf = PdfWriter()
+    pdf.text("Salle (B) : Algèbre")
+    data = pdf.render()
+    stream = re.search(rb"stream\n(.*?)\nendstream", data, re.S).group(1)
+    assert b"(Salle \\(B\\) : Alg\xe8bre) Tj" in zlib.decompress(stream)
+
+
+def test_long_documents_break_pages():
+    pdf = PdfWriter()
+    for i in range(200):
+        pdf.text(f"Etudiant {i}")
+    data = pdf.render()
+    pages = int(re.search(rb"/Count (\d+)", data).group(1))
+    assert pages > 1
+    assert data.count(b"/Type /Page ") == pages
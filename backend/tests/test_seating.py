@@ -0,0 +1,26 @@
+from app.algos.seating import SEATING_COLUMNS, interleave_programs, seat_exam
+
+
+def test_interleave_programs_round_robin_largest_first():
+    groups = [[20, 21], [10, 11, 12, 13], [30]]
+    assert interleave_programs(groups) == [10, 20, 30, 11, 21, 12, 13]
+
+
+def test_interleave_programs_edge_cases():
+    assert interleave_programs([]) == []
+    assert interleave_programs([[1, 2, 3]]) == [1, 2, 3]
+    assert interleave_programs([[], [4]]) == [4]
+
+
+def test_seat_exam_rows():
+    rows = list(seat_exam((3, 7), 42, 5, {1: [100, 101], 2: [200]}, alternate_programs=True))
+    assert [dict(zip(SEATING_COLUMNS, row)) for row in rows] == [
+        {"session_id": 3, "generation": 7, "exam_id": 42, "student_id": 100, "room_id": 5, "seat_index": 0},
+        {"session_id": 3, "generation": 7, "exam_id": 42, "student_id": 200, "room_id": 5, "seat_index": 1},
+        {"session_id": 3, "generation": 7, "exam_id": 42, "student_id": 101, "room_id": 5, "seat_index": 2},
+    ]
+
+
+def test_seat_exam_keeps_program_order_without_alternation():
+    rows = seat_exam((3, 7), 42, 5, {1: [100, 101], 2: [200]}, alternate_programs=False)
+    assert [(row[3], row[5]) for row in rows] == [(100, 0), (101, 1), (200, 2)]
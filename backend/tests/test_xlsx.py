@@ -0,0 +1,51 @@
+import io
+import zipfile
+from datetime import date, datetime
+from xml.etree import ElementTree
+
+from app.core.xlsx import XlsxStreamWriter
+
+NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _write(rows, chunk=2):
+    writer = XlsxStreamWriter("Planning", ["Exam", "Students", "Start"])
+    parts = [writer.start()]
+    for i in range(0, len(rows), chunk):
+        parts.append(writer.write_rows(rows[i:i + chunk]))
+    parts.append(writer.close())
+    return parts
+
+
+def _cells(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        assert workbook.testzip() is None
+        sheet = ElementTree.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+    return [row.findall("m:c", NS) for row in sheet.iterfind(".//m:row", NS)]
+
+
+def test_streamed_parts_form_a_valid_workbook():
+    rows = [["Algèbre <1> & co", 120, datetime(2026, 6, 1, 12, 0)], ["Bad\x01char", None, date(1900, 1, 1)]]
+    parts = _write(rows)
+    assert parts[0].startswith(b"PK")
+    data = b"".join(parts)
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        assert {"[Content_Types].xml", "xl/workbook.xml", "xl/styles.xml"} <= set(workbook.namelist())
+        assert b'name="Planning"' in workbook.read("xl/workbook.xml")
+
+    header, first, second = _cells(data)
+    assert [c.findtext("m:is/m:t", namespaces=NS) for c in header] == ["Exam", "Students", "Start"]
+    assert first[0].findtext("m:is/m:t", namespaces=NS) == "Algèbre <1> & co"
+    assert first[1].findtext("m:v", namespaces=NS) == "120"
+    # Dates are serial numbers with a date style
+    assert float(first[2].findtext("m:v", namespaces=NS)) == 46174.5 and first[2].get("s") == "1"
+    assert second[0].findtext("m:is/m:t", namespaces=NS) == "Badchar"
+    assert second[1].find("m:v", NS) is None
+    assert second[2].findtext("m:v", namespaces=NS) == "2" and second[2].get("s") == "2"
+
+
+def test_many_rows():
+    rows = [[f"E{i}", i, None] for i in range(5000)]
+    cells = _cells(b"".join(_write(rows, chunk=1000)))
+    assert len(cells) == 5001
+    assert cells[-1][1].findtext("m:v", namespaces=NS) == "4999"